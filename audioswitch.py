@@ -0,0 +1,169 @@
+"""
+Fast audio-track switching for playbin
+
+playbin decodes every audio track and picks one with an input-selector, but
+by default the selector drops what the inactive tracks produce, so after a
+switch the new track is only heard once fresh data reaches the selector.
+AudioSwitcher configures the selector to keep the inactive tracks warm:
+their buffers are cached and kept in sync with the running time, so a switch
+takes effect with the next buffer.
+
+It also measures each switch (time until the first buffer of the new track
+leaves the selector, which input-selector marks DISCONT) and what keeping
+the tracks warm costs: the rate at which inactive tracks deliver decoded
+data, and the CPU time of the streaming threads that decode them (each
+track is decoded in the thread that pushes it into the selector, whose
+CPU time Linux reports in /proc/self/task). Memory is only reported for
+the whole process.
+
+    switcher = AudioSwitcher(playbin, on_switched=lambda index, latency: ...)
+    switcher.switch(1)
+"""
+
+import os
+import resource
+import threading
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+SYNC_MODE_CLOCK = 1  # input-selector sync-mode: sync inactive pads to the clock
+
+
+def is_audio(pad):
+    caps = pad.get_current_caps()
+    return caps is not None and caps.get_structure(0).get_name().startswith("audio/")
+
+
+# CPU seconds used by a thread of this process, or None where unknown
+def thread_cpu_time(native_id):
+    try:
+        with open("/proc/self/task/%d/stat" % native_id) as f:
+            # Fields after the command name, which may contain spaces
+            fields = f.read().rsplit(")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+class SwitchStats:
+    def __init__(self):
+        self.latencies = []
+        self.inactive_bytes = 0
+        self.inactive_cpu = None  # CPU seconds spent decoding inactive tracks
+        self.started = time.monotonic()
+
+    def inactive_cpu_percent(self):
+        elapsed = time.monotonic() - self.started
+        if self.inactive_cpu is None or elapsed <= 0:
+            return None
+        return 100 * self.inactive_cpu / elapsed
+
+    def inactive_rate(self):
+        # Bytes per second decoded for tracks nobody is listening to
+        elapsed = time.monotonic() - self.started
+        return self.inactive_bytes / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        average = sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+        cpu = self.inactive_cpu_percent()
+        return ("%d switch(es), %.1fms average latency, warm tracks %.1f KiB/s and %s CPU, "
+                "process peak RSS %d KiB" %
+                (len(self.latencies), 1000 * average, self.inactive_rate() / 1024,
+                 "n/a" if cpu is None else "%.1f%%" % cpu,
+                 resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+
+
+class AudioSwitcher:
+    # With fast=False the selector is left alone and only measured.
+    # on_switched(index, latency) is called from a streaming thread once a
+    # switch is heard; a switch superseded before that is not reported.
+    def __init__(self, playbin, fast=True, on_switched=None):
+        self.playbin = playbin
+        self.fast = fast
+        self.on_switched = on_switched
+        self.stats = SwitchStats()
+        self._switching = None  # (index, time) of the switch not heard yet
+        self._selector = None
+        self._threads = {}  # streaming thread id -> selector sink pads it feeds
+        self._cpu_seen = {}  # streaming thread id -> CPU time at the last account_cpu()
+        self._lock = threading.Lock()
+        playbin.connect("element-setup", self._element_setup)
+
+    def _element_setup(self, playbin, element):
+        factory = element.get_factory()
+        if factory is None or factory.get_name() != "input-selector":
+            return
+        if self.fast:
+            for name, value in (("sync-streams", True), ("sync-mode", SYNC_MODE_CLOCK),
+                                ("cache-buffers", True)):
+                if element.find_property(name):
+                    element.set_property(name, value)
+        element.get_static_pad("src").add_probe(Gst.PadProbeType.BUFFER, self._src_probe)
+        element.connect("pad-added", self._selector_pad_added)
+
+    def _selector_pad_added(self, selector, pad):
+        pad.add_probe(Gst.PadProbeType.BUFFER, self._sink_probe)
+
+    # Count what inactive audio tracks deliver to the selector, and note
+    # which thread decodes each track
+    def _sink_probe(self, pad, info):
+        selector = pad.get_parent_element()
+        if selector is None or not is_audio(pad):
+            return Gst.PadProbeReturn.OK
+        thread = threading.get_native_id()
+        inactive = selector.get_property("active-pad") != pad
+        with self._lock:
+            self._selector = selector
+            pads = self._threads.setdefault(thread, set())
+            if pad not in pads:
+                pads.add(pad)
+                self._cpu_seen.setdefault(thread, thread_cpu_time(thread))
+            if inactive:
+                self.stats.inactive_bytes += info.get_buffer().get_size()
+        return Gst.PadProbeReturn.OK
+
+    def _src_probe(self, pad, info):
+        if not is_audio(pad):
+            return Gst.PadProbeReturn.OK
+        with self._lock:
+            if self._switching is None or not info.get_buffer().has_flags(Gst.BufferFlags.DISCONT):
+                return Gst.PadProbeReturn.OK
+            index, switched_at = self._switching
+            latency = time.monotonic() - switched_at
+            self.stats.latencies.append(latency)
+            self._switching = None
+        if self.on_switched:
+            self.on_switched(index, latency)
+        return Gst.PadProbeReturn.OK
+
+    def switch(self, index):
+        pad = self.playbin.emit("get-audio-pad", index)
+        if pad is None:
+            return False
+        self.account_cpu()
+        with self._lock:
+            self._switching = (index, time.monotonic())
+        self.playbin.set_property("current-audio", index)
+        return True
+
+    # Charge the CPU time the streaming threads used since the last call to
+    # the inactive tracks if they only fed inactive pads meanwhile. Called
+    # on every switch; call it before reading stats.inactive_cpu.
+    def account_cpu(self):
+        with self._lock:
+            if self._selector is None:
+                return
+            active = self._selector.get_property("active-pad")
+            for thread, pads in self._threads.items():
+                now, last = thread_cpu_time(thread), self._cpu_seen.get(thread)
+                self._cpu_seen[thread] = now
+                if now is None or last is None:
+                    continue
+                if self.stats.inactive_cpu is None:
+                    self.stats.inactive_cpu = 0.0
+                if active not in pads:
+                    self.stats.inactive_cpu += now - last
@@ -4,6 +4,8 @@ Basic tutorial 1: Hello world!
 https://gstreamer.freedesktop.org/documentation/tutorials/basic/hello-world.html
 """
 
+import sys
+
 import gi
 
 gi.require_version('Gst', '1.0')
@@ -13,10 +15,14 @@ from gi.repository import Gst
 def main():
     Gst.init(None)
 
-    # Build the pipeline
-    pipeline = Gst.parse_launch(
-        "playbin uri=https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_trailer-480p.webm"
-    )
+    # If a URI was provided, use it instead of the default one
+    uri = "https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_trailer-480p.webm"
+    if len(sys.argv) > 1:
+        uri = sys.argv[1]
+
+    # Build the pipeline. The URI is set as a property, so it may contain spaces
+    pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    pipeline.set_property("uri", uri)
 
     # Start playing
     pipeline.set_state(Gst.State.PLAYING)
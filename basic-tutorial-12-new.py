@@ -1,77 +1,95 @@
-#!/usr/bin/env python
-# -*- coding:utf-8 -*-
+#!/usr/bin/env python3
 """
 Basic tutorial 12: Streaming
-http://docs.gstreamer.com/display/GstSDK/Basic+tutorial+12%3A+Streaming
+https://gstreamer.freedesktop.org/documentation/tutorials/basic/streaming.html
 """
+
 import sys
-import pygst
-pygst.require("0.10")
-import gst
-import gobject
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from buffering import BufferingController
+from busdispatch import BusDispatcher
+
 
 class CustomData:
-    is_live = False
-    pipeline = None
-    loop = None
-
-def cb_message(bus, msg, data):
-    def error():
-        print >> sys.stderr, ("Error: {0}".format(err.message))
-        data.pipeline.set_state(gst.STATE_READY)
-        data.loop.quit()
-    def eos():
-        data.pipeline.set(gst.STATE_READY)
-        data.loop.quit()
-    def buffering():
-        percent = 0
-        #If the stream is live, we do not care about buffering.
-        if (data.is_live):
-            return
-        percent = msg.parse_buffering()
-        sys.stdout.write("\rBuffering ({0}%)".format(percent))
-        sys.stdout.flush()
-        #Wait until buffering is complete before start/resume playing
-        if (percent < 0):
-            data.pipeline.set_state(gst.STATE_PAUSED)
-        else:
-            data.pipeline.set_state(gst.STATE_PLAYING)
-    def clock_lost():
-        #Get a new clock
-        data.pipeline.set_state(gst.STATE_PAUSED)
-        data.pipeline.set_state(gst.STATE_PLAYING)
-    def default():
-        pass
-
-    handlers = dict({gst.MESSAGE_ERROR: error, 
-                     gst.MESSAGE_EOS: eos,
-                     gst.MESSAGE_BUFFERING: buffering,
-                     gst.MESSAGE_CLOCK_LOST: clock_lost
-                     })
-    if (handlers.has_key(msg.type)):
-        handlers[msg.type]()
-
-data = CustomData()
-pipeline = gst.parse_launch('playbin2 uri=http://docs.gstreamer.com/media/sintel_trailer-480p.webm')
-bus = pipeline.get_bus()
-
-#Start playing
-ret = pipeline.set_state(gst.STATE_PLAYING)
-if (ret == gst.STATE_CHANGE_FAILURE):
-    print >> sys.stderr, ("Unable to set pipeline to the playing state")
-    exit(-1)
-elif (ret == gst.STATE_CHANGE_NO_PREROLL):
-    data.is_live = True
-
-main_loop = gobject.MainLoop(None, False)
-data.loop = main_loop
-data.pipeline = pipeline
-
-bus.add_signal_watch()
-bus.connect("message", cb_message, data)
-data.loop.run()
-
-pipeline.set_state(gst.STATE_PLAYING)
+    def __init__(self):
+        self.pipeline = None
+        self.loop = None
+        self.buffering = None
+
+
+def on_error(msg, data):
+    err, debug_info = msg.parse_error()
+    print("Error: %s" % err, file=sys.stderr)
+    data.pipeline.set_state(Gst.State.READY)
+    data.loop.quit()
+
+
+def on_eos(msg, data):
+    data.pipeline.set_state(Gst.State.READY)
+    data.loop.quit()
+
+
+def on_buffering(msg, data):
+    # Pause below the low watermark, resume once the queue is full again
+    data.buffering.handle_message(msg)
+    sys.stdout.write("\rBuffering (%d%%)" % data.buffering.percent)
+    sys.stdout.flush()
+
+
+def on_clock_lost(msg, data):
+    # Get a new clock
+    data.pipeline.set_state(Gst.State.PAUSED)
+    data.pipeline.set_state(Gst.State.PLAYING)
+
+
+# Built once; types not listed here are dropped by the bus before reaching Python
+HANDLERS = {Gst.MessageType.ERROR: on_error,
+            Gst.MessageType.EOS: on_eos,
+            Gst.MessageType.BUFFERING: on_buffering,
+            Gst.MessageType.CLOCK_LOST: on_clock_lost}
+
+
+def main():
+    Gst.init(None)
+
+    data = CustomData()
+
+    # If a URI was provided, use it instead of the default one
+    uri = "https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_trailer-480p.webm"
+    if len(sys.argv) > 1:
+        uri = sys.argv[1]
+
+    # Build the pipeline. The URI is set as a property, so it may contain spaces
+    data.pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    data.pipeline.set_property("uri", uri)
+    data.buffering = BufferingController(data.pipeline)
+
+    # Start playing
+    ret = data.pipeline.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        print("Unable to set the pipeline to the playing state.", file=sys.stderr)
+        exit(-1)
+    elif ret == Gst.StateChangeReturn.NO_PREROLL:
+        data.buffering.set_live(True)
+
+    data.loop = GLib.MainLoop.new(None, False)
+
+    dispatcher = BusDispatcher(data.pipeline.get_bus(), HANDLERS, data)
+    dispatcher.attach()
+
+    data.loop.run()
 
+    # Free resources
+    dispatcher.detach()
+    data.pipeline.set_state(Gst.State.NULL)
+    print("\nBuffering: %s" % data.buffering.stats)
+    print("Bus messages:\n%s" % dispatcher.stats)
 
 
+if __name__ == '__main__':
+    main()
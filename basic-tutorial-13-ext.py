@@ -1,108 +1,150 @@
-#!/usr/bin/env python
-# -*- coding:utf-8 -*-
+#!/usr/bin/env python3
 """
 Basic tutorial 13: Playback speed
-http://docs.gstreamer.com/display/GstSDK/Basic+tutorial+13%3A+Playback+speed
+https://gstreamer.freedesktop.org/documentation/tutorials/basic/playback-speed.html
 """
-import sys, os
-import gobject, glib
-gobject.threads_init()
-import pygst
-pygst.require("0.10")
-import gst
+
+import sys
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from stepping import FrameStepper
+from trickmode import TrickModeEngine
+
 
 class CustomData:
-    pipeline = None
-    video_sink = None
-    loop = None
-    playing = False
-    rate = 1.0
+    def __init__(self):
+        self.pipeline = None
+        self.loop = None
+        self.trickmode = None
+        self.stepper = None
+        self.playing = False
+        self.resume_after_step = False
+        self.rate = 1.0
 
-def send_seek_event(data):
-    format = gst.FORMAT_TIME
 
-    (position, fmt) = data.pipeline.query_position(format)
-    if (not position):
-        print >> sys.stderr, ("Unable to retrieve current position.")
+# Change the rate. At high speeds the trick-mode engine only decodes
+# keyframes (or steps through them) instead of every frame, and forward
+# changes near 1x are applied without flushing the pipeline.
+def send_seek_event(data):
+    if not data.trickmode.set_rate(data.rate):
+        print("Unable to retrieve current position.", file=sys.stderr)
         return
 
-    seek_event = None
-    #Create the seek event
-    #http://gstreamer.freedesktop.org/data/doc/gstreamer/head/gstreamer/html/gstreamer-GstEvent.html#gst-event-new-seek
-    if (data.rate > 0.0):
-        seek_event = gst.event_new_seek(data.rate, gst.FORMAT_TIME, 
-                        (gst.SEEK_FLAG_FLUSH | gst.SEEK_FLAG_ACCURATE),
-                        gst.SEEK_TYPE_SET, position, gst.SEEK_TYPE_SET, -1)
-    else:
-        seek_event = gst.event_new_seek(data.rate, gst.FORMAT_TIME, 
-                        (gst.SEEK_FLAG_FLUSH | gst.SEEK_FLAG_ACCURATE),
-                        gst.SEEK_TYPE_SET, 0, gst.SEEK_TYPE_SET, position)
-    if (not data.video_sink):
-        data.video_sink = data.pipeline.get_property("video_sink")
-    data.video_sink.send_event(seek_event)
-    print ("Current rate: {0.rate}".format(data))
+    print("Current rate: %g (%s, %s)" % (data.rate, data.trickmode.mode, data.trickmode.last_change))
+
+
+# Go back to PLAYING if stepping paused playback and no step is left
+def resume_after_step(data):
+    if data.resume_after_step and not data.stepper.busy():
+        data.resume_after_step = False
+        data.playing = True
+        data.trickmode.set_playing(True)
+
+
+# Called by the stepper when a (possibly merged) step has completed
+def step_done(frames, latency, data):
+    print("Stepped %d frame%s in %.1fms" % (frames, "" if frames == 1 else "s", latency * 1000))
+    resume_after_step(data)
+
 
 def handle_keyboard(source, cond, data):
-    str = source.readline()
+    str = sys.stdin.readline()
+    if not str:
+        data.loop.quit()
+        return False
     x = str[0].lower()
-    if (x == 'p'):
+    if x == 'p':
         data.playing = not data.playing
-        data.pipeline.set_state(gst.STATE_PLAYING if data.playing else gst.STATE_PAUSED)
-        print ("Setting state to {0}".format("PLAYING" if data.playing else "PAUSE"))
-    elif (x == 's'):
-        if (str[0].isupper()):
+        data.trickmode.set_playing(data.playing)
+        print("Setting state to %s" % ("PLAYING" if data.playing else "PAUSE"))
+    elif x == 's':
+        if str[0].isupper():
             data.rate *= 2.0
         else:
             data.rate /= 2.0
         send_seek_event(data)
-    elif (x == 'd'):
+    elif x == 'd':
         data.rate *= -1.0
         send_seek_event(data)
-    elif (x == 'n'):
+    elif x == 'n':
         cntf = 1
-        if (len(str) > 2):
-            cntf = int(str[1:len(str)-1])
-        if (not data.video_sink):
-            #If we have not done so, obtain the sink through which we will send the step events
-            data.video_sink = data.pipeline.get_property("video_sink")
-        isplaying = data.playing
-        if (data.playing):
-            data.pipeline.set_state(gst.STATE_PAUSED)                        
-        data.video_sink.send_event(gst.event_new_step(gst.FORMAT_BUFFERS, cntf, data.rate, True, False))
-        if (isplaying):
-            data.pipeline.set_state(gst.STATE_PLAYING)
-        print ("Stepping {0} frame{1}".format(
-                                              "one" if (cntf == 1) else cntf,
-                                              "" if (cntf == 1) else "s"))
-    elif (x == 'q'):
+        if len(str.strip()) > 1:
+            cntf = int(str[1:])
+        # Step while paused, and only resume once the step is done. Through
+        # the engine, so no scrub seek cancels the step.
+        if data.playing:
+            data.resume_after_step = True
+            data.playing = False
+            data.trickmode.set_playing(False)
+        data.stepper.rate = data.rate
+        if not data.stepper.step(cntf):
+            print("Unable to step.", file=sys.stderr)
+            # No STEP_DONE will come to resume playback
+            resume_after_step(data)
+            return True
+        print("Stepping %s frame%s" % ("one" if cntf == 1 else cntf, "" if cntf == 1 else "s"))
+    elif x == 'q':
         data.loop.quit()
     return True
 
 
-print (
-    "USAGE: Choose one of the following options, then press enter:\n"
-    " 'P' to toggle between PAUSE and PLAY\n"
-    " 'S' to increase playback speed, 's' to decrease playback speed\n"
-    " 'D' to toggle playback direction\n"
-    " 'N<xxx>' to move to next xxx (default:1) frame(s)  (in the current direction, better in PAUSE)\n"
-    " 'Q' to quit\n");
+def main():
+    Gst.init(None)
+
+    # Print usage map
+    print(
+        "USAGE: Choose one of the following options, then press enter:\n"
+        " 'P' to toggle between PAUSE and PLAY\n"
+        " 'S' to increase playback speed, 's' to decrease playback speed\n"
+        " 'D' to toggle playback direction\n"
+        " 'N<xxx>' to move to next xxx (default:1) frame(s)  (in the current direction, better in PAUSE)\n"
+        " 'Q' to quit\n")
+
+    data = CustomData()
+
+    # If a URI was provided, use it instead of the default one
+    uri = "https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_trailer-480p.webm"
+    if len(sys.argv) > 1:
+        uri = sys.argv[1]
+
+    # Build the pipeline. The URI is set as a property, so it may contain spaces
+    data.pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    data.pipeline.set_property("uri", uri)
+    data.trickmode = TrickModeEngine(data.pipeline)
+    data.stepper = FrameStepper(data.pipeline,
+                                lambda frames, latency: step_done(frames, latency, data))
+
+    # Listen for STEP_DONE so we know when each step has finished
+    bus = data.pipeline.get_bus()
+    bus.add_signal_watch()
+    bus.connect("message::step-done", lambda bus, msg: data.stepper.handle_message(msg))
+
+    # Add a keyboard watch so we get notified of keystrokes
+    io_stdin = GLib.IOChannel.unix_new(sys.stdin.fileno())
+    GLib.io_add_watch(io_stdin, GLib.PRIORITY_DEFAULT, GLib.IOCondition.IN, handle_keyboard, data)
+
+    # Start playing
+    ret = data.pipeline.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        print("Unable to set the pipeline to the playing state.", file=sys.stderr)
+        exit(-1)
 
-data = CustomData()
-data.pipeline = gst.parse_launch('playbin2 uri=http://docs.gstreamer.com/media/sintel_trailer-480p.webm')
-io_stdin = glib.IOChannel(sys.stdin.fileno())
-io_stdin.add_watch(glib.IO_IN, handle_keyboard, data)
+    data.playing = True
+    data.rate = 1.0
 
-#Start playing
-ret = data.pipeline.set_state(gst.STATE_PLAYING)
-if (ret == gst.STATE_CHANGE_FAILURE):
-    print >> sys.stderr, ("Unable to set pipeline to the playing state")
-    exit(-1)
+    # Create a GLib Main Loop and set it to run
+    data.loop = GLib.MainLoop.new(None, False)
+    data.loop.run()
 
-data.playing = True
-data.rate = 1.0
+    # Free resources
+    print("Stepping: %s" % data.stepper.stats)
+    data.trickmode.stop()
+    data.pipeline.set_state(Gst.State.NULL)
 
-#Create a GLib Main Loop and set it to run 
-data.loop = gobject.MainLoop(None, False)
-data.loop.run()
-data.pipeline.set_state(gst.STATE_NULL)
 
+if __name__ == '__main__':
+    main()
@@ -1,95 +1,164 @@
-#!/usr/bin/env python
-# -*- coding:utf-8 -*-
+#!/usr/bin/env python3
 """
 Basic tutorial 13: Playback speed
-http://docs.gstreamer.com/display/GstSDK/Basic+tutorial+13%3A+Playback+speed
+https://gstreamer.freedesktop.org/documentation/tutorials/basic/playback-speed.html
 """
-import sys, os
-import gobject, glib
-gobject.threads_init()
-import pygst
-pygst.require("0.10")
-import gst
+
+import sys
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from reverse import ReversePlayer
+from trickmode import TrickModeEngine
+
 
 class CustomData:
-    pipeline = None
-    video_sink = None
-    loop = None
-    playing = False
-    rate = 1.0
+    def __init__(self):
+        self.uri = None
+        self.pipeline = None
+        self.video_sink = None
+        self.loop = None
+        self.trickmode = None
+        self.reverse = None
+        self.playing = False
+        self.rate = 1.0
+
+
+# Slow reverse rates, where every frame is shown, are played by a
+# ReversePlayer: it decodes each GOP once and shows its frames backwards,
+# in its own window while playbin waits paused. Fast reverse rates only
+# show keyframes, which the trick-mode engine already does cheaply.
+def start_reverse(data):
+    ret, position = data.trickmode.query_position()
+    if not ret:
+        return False
+    data.trickmode.stop()
+    data.pipeline.set_state(Gst.State.PAUSED)
+    data.reverse = ReversePlayer(data.uri, rate=data.rate)
+    data.reverse.start(position)
+    if not data.playing:
+        data.reverse.set_playing(False)
+    return True
+
+
+# Returns the position reverse playback reached, or None if it never started
+def stop_reverse(data):
+    position = data.reverse.position()
+    data.reverse.stop()
+    print("Reverse playback: %s" % data.reverse.stats)
+    data.reverse = None
+    return position
+
 
+# Change the rate. At high speeds the trick-mode engine only decodes
+# keyframes (or steps through them) instead of every frame, and forward
+# changes near 1x are applied without flushing the pipeline.
 def send_seek_event(data):
-    format = gst.FORMAT_TIME
-    (position, fmt) = data.pipeline.query_position(format)
-    if (not position):
-        print >> sys.stderr, ("Unable to retrieve current position.")
+    if data.rate < 0 and data.trickmode.mode_for_rate(data.rate) == TrickModeEngine.MODE_NORMAL:
+        if data.reverse is not None:
+            data.reverse.rate = abs(data.rate)
+        elif not start_reverse(data):
+            print("Unable to retrieve current position.", file=sys.stderr)
+            return
+        print("Current rate: %g (reverse, GOP cache)" % data.rate)
         return
 
-    seek_event = None
-    #Create the seek event
-    #http://gstreamer.freedesktop.org/data/doc/gstreamer/head/gstreamer/html/gstreamer-GstEvent.html#gst-event-new-seek
-    if (data.rate > 0.0):
-        seek_event = gst.event_new_seek(data.rate, gst.FORMAT_TIME, 
-                        (gst.SEEK_FLAG_FLUSH | gst.SEEK_FLAG_ACCURATE),
-                        gst.SEEK_TYPE_SET, position, gst.SEEK_TYPE_SET, -1)
-    else:
-        seek_event = gst.event_new_seek(data.rate, gst.FORMAT_TIME, 
-                        (gst.SEEK_FLAG_FLUSH | gst.SEEK_FLAG_ACCURATE),
-                        gst.SEEK_TYPE_SET, 0, gst.SEEK_TYPE_SET, position)
-    if (not data.video_sink):
-        data.video_sink = data.pipeline.get_property("video_sink")
-    data.video_sink.send_event(seek_event)
-    print ("Current rate: {0.rate}".format(data))
+    position = stop_reverse(data) if data.reverse is not None else None
+    if not data.trickmode.set_rate(data.rate, position):
+        print("Unable to retrieve current position.", file=sys.stderr)
+        return
+
+    print("Current rate: %g (%s, %s)" % (data.rate, data.trickmode.mode, data.trickmode.last_change))
+
 
 def handle_keyboard(source, cond, data):
-    str = source.readline()
+    str = sys.stdin.readline()
+    if not str:
+        data.loop.quit()
+        return False
     x = str[0].lower()
-    if (x == 'p'):
+    if x == 'p':
         data.playing = not data.playing
-        data.pipeline.set_state(gst.STATE_PLAYING if data.playing else gst.STATE_PAUSED)
-        print ("Setting state to {0}".format("PLAYING" if data.playing else "PAUSE"))
-    elif (x == 's'):
-        if (str[0].isupper()):
+        if data.reverse is not None:
+            data.reverse.set_playing(data.playing)
+            data.trickmode.playing = data.playing
+        else:
+            data.trickmode.set_playing(data.playing)
+        print("Setting state to %s" % ("PLAYING" if data.playing else "PAUSE"))
+    elif x == 's':
+        if str[0].isupper():
             data.rate *= 2.0
         else:
             data.rate /= 2.0
         send_seek_event(data)
-    elif (x == 'd'):
+    elif x == 'd':
         data.rate *= -1.0
         send_seek_event(data)
-    elif (x == 'n'):
-        if (not data.video_sink):
-            #If we have not done so, obtain the sink through which we will send the step events
-            data.video_sink = data.pipeline.get_property("video_sink")
-        data.video_sink.send_event(gst.event_new_step(gst.FORMAT_BUFFERS, 1, data.rate, True, False))
-        print ("Stepping one frame")
-    elif (x == 'q'):
+    elif x == 'n' and data.reverse is not None:
+        data.reverse.sink.send_event(Gst.Event.new_step(Gst.Format.BUFFERS, 1, abs(data.rate), True, False))
+        print("Stepping one frame")
+    elif x == 'n':
+        if not data.video_sink:
+            # If we have not done so, obtain the sink through which we will send the step events
+            data.video_sink = data.pipeline.get_property("video-sink")
+        data.video_sink.send_event(Gst.Event.new_step(Gst.Format.BUFFERS, 1, abs(data.rate), True, False))
+        print("Stepping one frame")
+    elif x == 'q':
         data.loop.quit()
     return True
 
 
-print (
-    "USAGE: Choose one of the following options, then press enter:\n"
-    " 'P' to toggle between PAUSE and PLAY\n"
-    " 'S' to increase playback speed, 's' to decrease playback speed\n"
-    " 'D' to toggle playback direction\n"
-    " 'N' to move to next frame(s)  (in the current direction, better in PAUSE)\n"
-    " 'Q' to quit\n");
+def main():
+    Gst.init(None)
+
+    # Print usage map
+    print(
+        "USAGE: Choose one of the following options, then press enter:\n"
+        " 'P' to toggle between PAUSE and PLAY\n"
+        " 'S' to increase playback speed, 's' to decrease playback speed\n"
+        " 'D' to toggle playback direction\n"
+        " 'N' to move to next frame (in the current direction, better in PAUSE)\n"
+        " 'Q' to quit\n")
+
+    data = CustomData()
+
+    # If a URI was provided, use it instead of the default one
+    uri = "https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_trailer-480p.webm"
+    if len(sys.argv) > 1:
+        uri = sys.argv[1]
+    data.uri = uri
+
+    # Build the pipeline. The URI is set as a property, so it may contain spaces
+    data.pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    data.pipeline.set_property("uri", uri)
+    data.trickmode = TrickModeEngine(data.pipeline)
+
+    # Add a keyboard watch so we get notified of keystrokes
+    io_stdin = GLib.IOChannel.unix_new(sys.stdin.fileno())
+    GLib.io_add_watch(io_stdin, GLib.PRIORITY_DEFAULT, GLib.IOCondition.IN, handle_keyboard, data)
+
+    # Start playing
+    ret = data.pipeline.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        print("Unable to set the pipeline to the playing state.", file=sys.stderr)
+        exit(-1)
 
-data = CustomData()
-data.pipeline = gst.parse_launch('playbin2 uri=http://docs.gstreamer.com/media/sintel_trailer-480p.webm')
-io_stdin = glib.IOChannel(sys.stdin.fileno())
-io_stdin.add_watch(glib.IO_IN, handle_keyboard, data)
+    data.playing = True
+    data.rate = 1.0
 
-ret = data.pipeline.set_state(gst.STATE_PLAYING)
-if (ret == gst.STATE_CHANGE_FAILURE):
-    print >> sys.stderr, ("Unable to set pipeline to the playing state")
-    exit(-1)
+    # Create a GLib Main Loop and set it to run
+    data.loop = GLib.MainLoop.new(None, False)
+    data.loop.run()
 
-data.playing = True
-data.rate = 1.0
-data.loop = gobject.MainLoop(None, False)
-data.loop.run()
-data.pipeline.set_state(gst.STATE_NULL)
+    # Free resources
+    if data.reverse is not None:
+        stop_reverse(data)
+    data.trickmode.stop()
+    data.pipeline.set_state(Gst.State.NULL)
 
 
+if __name__ == '__main__':
+    main()
@@ -11,6 +11,8 @@ import gi
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst
 
+from busdispatch import BusDispatcher
+
 
 class CustomData:
     def __init__(self):
@@ -44,19 +46,15 @@ def main():
         print("Unable to set the pipeline to the playing state.", file=sys.stderr)
         exit(-1)
 
-    # Listen to the bus
-    bus = data.playbin.get_bus()
+    # Listen to the bus; only the message types in the table are taken off it
+    dispatcher = BusDispatcher(data.playbin.get_bus(), {
+        Gst.MessageType.ERROR: on_error,
+        Gst.MessageType.EOS: on_eos,
+        Gst.MessageType.DURATION_CHANGED: on_duration_changed,
+        Gst.MessageType.STATE_CHANGED: on_state_changed,
+    }, data)
     while not data.terminate:
-        message = bus.timed_pop_filtered(100 * Gst.MSECOND,
-                                         Gst.MessageType.STATE_CHANGED |
-                                         Gst.MessageType.ERROR |
-                                         Gst.MessageType.EOS |
-                                         Gst.MessageType.DURATION_CHANGED)
-
-        # Parse message
-        if message:
-            handle_message(data, message)
-        else:
+        if not dispatcher.poll(100 * Gst.MSECOND):
             if data.playing:
                 fmt = Gst.Format.TIME
                 current = -1
@@ -85,42 +83,46 @@ def main():
 
     # Free resources
     data.playbin.set_state(Gst.State.NULL)
+    print("Bus messages:\n%s" % dispatcher.stats)
 
 
-def handle_message(data, msg):
-    if msg.type == Gst.MessageType.ERROR:
-        err, debug_info = msg.parse_error()
-        print("Error received from element %s: %s" % (msg.src.get_name(), err), file=sys.stderr)
-        print("Debugging information: %s" % debug_info, file=sys.stderr)
-        data.terminate = True
-    elif msg.type == Gst.MessageType.EOS:
-        print("End-Of-Stream reached.")
-        data.terminate = True
-    elif msg.type == Gst.MessageType.DURATION_CHANGED:
-        # The duration has changed, mark the current one as invalid
-        data.duration = Gst.CLOCK_TIME_NONE
-    elif msg.type == Gst.MessageType.STATE_CHANGED:
-        if msg.src == data.playbin:
-            old_state, new_state, pending_state = msg.parse_state_changed()
-            print("Pipeline state changed from %s to %s." %
-                  (old_state.value_nick, new_state.value_nick))
-
-            # Remember whether we are in the PLAYING state or not
-            data.playing = (new_state == Gst.State.PLAYING)
-            if data.playing:
-                # We just moved to PLAYING. Check if seeking is possible
-                query = Gst.Query.new_seeking(Gst.Format.TIME)
-                if data.playbin.query(query):
-                    (_, data.seek_enabled, start, end) = query.parse_seeking()
-                    if data.seek_enabled:
-                        print("Seeking is ENABLED from %s to %s" %
-                              (Gst.TIME_ARGS(start), Gst.TIME_ARGS(end)))
-                    else:
-                        print("Seeking is DISABLED for this stream.")
+def on_error(msg, data):
+    err, debug_info = msg.parse_error()
+    print("Error received from element %s: %s" % (msg.src.get_name(), err), file=sys.stderr)
+    print("Debugging information: %s" % debug_info, file=sys.stderr)
+    data.terminate = True
+
+
+def on_eos(msg, data):
+    print("End-Of-Stream reached.")
+    data.terminate = True
+
+
+def on_duration_changed(msg, data):
+    # The duration has changed, mark the current one as invalid
+    data.duration = Gst.CLOCK_TIME_NONE
+
+
+def on_state_changed(msg, data):
+    if msg.src == data.playbin:
+        old_state, new_state, pending_state = msg.parse_state_changed()
+        print("Pipeline state changed from %s to %s." %
+              (old_state.value_nick, new_state.value_nick))
+
+        # Remember whether we are in the PLAYING state or not
+        data.playing = (new_state == Gst.State.PLAYING)
+        if data.playing:
+            # We just moved to PLAYING. Check if seeking is possible
+            query = Gst.Query.new_seeking(Gst.Format.TIME)
+            if data.playbin.query(query):
+                (_, data.seek_enabled, start, end) = query.parse_seeking()
+                if data.seek_enabled:
+                    print("Seeking is ENABLED from %s to %s" %
+                          (Gst.TIME_ARGS(start), Gst.TIME_ARGS(end)))
                 else:
-                    print("Seeking query failed.", file=sys.stderr)
-    else:
-        print("Unexpected message received.", file=sys.stderr)
+                    print("Seeking is DISABLED for this stream.")
+            else:
+                print("Seeking query failed.", file=sys.stderr)
 
 
 if __name__ == '__main__':
@@ -13,6 +13,8 @@ gi.require_version('Gtk', '3.0')
 gi.require_version("GstVideo", "1.0")
 from gi.repository import Gst, Gtk, GLib, GstVideo
 
+from busdispatch import BusDispatcher
+
 
 # Class to contain all our information, so we can pass it around
 class CustomData:
@@ -164,7 +166,7 @@ def tags_cb(playbin, stream, data):
 
 
 # This function is called when an error message is posted on the bus
-def error_cb(bus, msg, data):
+def error_cb(msg, data):
     # Print error details on the screen
     err, debug_info = msg.parse_error()
     print("Error received from element %s: %s" % (msg.src.get_name(), err), file=sys.stderr)
@@ -176,14 +178,14 @@ def error_cb(bus, msg, data):
 
 # This function is called when an End-Of-Stream message is posted on the bus.
 # We just set the pipeline to READY (which stops playback) */
-def eos_cb(bus, msg, data):
+def eos_cb(msg, data):
     print("End-Of-Stream reached.")
     data.playbin.set_state(Gst.State.READY)
 
 
 # This function is called when the pipeline changes states. We use it to
 # keep track of the current state.
-def state_changed_cb(bus, msg, data):
+def state_changed_cb(msg, data):
     old_state, new_state, pending_state = msg.parse_state_changed()
     if msg.src == data.playbin:
         data.state = new_state
@@ -237,7 +239,7 @@ def analyze_streams(data):
 
 # This function is called when an "application" message is posted on the bus.
 # Here we retrieve the message posted by the tags_cb callback
-def application_cb(bus, msg, data):
+def application_cb(msg, data):
     if msg.get_structure().get_name() == "tags-changed":
         analyze_streams(data)
 
@@ -269,13 +271,14 @@ def main():
     # Create the GUI
     create_ui(data)
 
-    # Instruct the bus to emit signals for each received message, and connect to the interesting signals
-    bus = data.playbin.get_bus()
-    bus.add_signal_watch()
-    bus.connect("message::error", error_cb, data)
-    bus.connect("message::eos", eos_cb, data)
-    bus.connect("message::state-changed", state_changed_cb, data)
-    bus.connect("message::application", application_cb, data)
+    # Dispatch the interesting message types from the main loop; the others never reach Python
+    dispatcher = BusDispatcher(data.playbin.get_bus(), {
+        Gst.MessageType.ERROR: error_cb,
+        Gst.MessageType.EOS: eos_cb,
+        Gst.MessageType.STATE_CHANGED: state_changed_cb,
+        Gst.MessageType.APPLICATION: application_cb,
+    }, data)
+    dispatcher.attach()
 
     # Start playing
     ret = data.playbin.set_state(Gst.State.PLAYING)
@@ -290,7 +293,9 @@ def main():
     Gtk.main()
 
     # Free resources
+    dispatcher.detach()
     data.playbin.set_state(Gst.State.NULL)
+    print("Bus messages:\n%s" % dispatcher.stats)
 
 
 if __name__ == '__main__':
@@ -2,8 +2,14 @@
 """
 Basic tutorial 7: Multithreading and Pad Availability
 https://gstreamer.freedesktop.org/documentation/tutorials/basic/multithreading-and-pad-availability.html
+
+    basic-tutorial-7.py [--profile single|threaded|direct]
+
+The visualization branch (wavescope to the video sink) is laid out by a
+VideoChainProfile (see videoprofile.py).
 """
 
+import argparse
 import sys
 
 import gi
@@ -11,8 +17,16 @@ import gi
 gi.require_version('Gst', '1.0')
 from gi.repository import Gst
 
+from sinkbins import SinkBinFactory
+from videoprofile import PROFILES
+
 
 def main():
+    parser = argparse.ArgumentParser(description="Multithreading and pad availability")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="direct",
+                        help="threading and conversion layout of the video branch")
+    args = parser.parse_args()
+
     Gst.init(None)
 
     # Create the elements
@@ -23,35 +37,34 @@ def main():
     audio_resample = Gst.ElementFactory.make("audioresample", "audio_resample")
     audio_sink = Gst.ElementFactory.make("autoaudiosink", "audio_sink")
     video_queue = Gst.ElementFactory.make("queue", "video_queue")
-    visual = Gst.ElementFactory.make("wavescope", "visual")
-    video_convert = Gst.ElementFactory.make("videoconvert", "csp")
-    video_sink = Gst.ElementFactory.make("autovideosink", "video_sink")
+    try:
+        # wavescope, then conversion and the video sink as the profile lays them out
+        video_branch = SinkBinFactory("video_branch", PROFILES[args.profile].chain(
+            "wavescope", {"shader": 0, "style": 1}, visualization=True)).build()
+    except ValueError as e:
+        print("Not all elements could be created: %s" % e, file=sys.stderr)
+        exit(-1)
 
     # Create the empty pipeline
     pipeline = Gst.Pipeline.new("test-pipeline")
 
     if (not audio_source or not tee or not audio_queue or not audio_convert or not audio_resample
-            or not audio_sink or not video_queue or not visual or not video_convert
-            or not video_sink or not pipeline):
+            or not audio_sink or not video_queue or not pipeline):
         print("Not all elements could be created.", file=sys.stderr)
         exit(-1)
 
     # Configure elements
     audio_source.set_property("freq", 215.0)
-    visual.set_property("shader", 0)
-    visual.set_property("style", 1)
 
     # Link all elements that can be automatically linked because they have "Always" pads
 
     pipeline.add(audio_source, tee, audio_queue, audio_convert, audio_resample,
-                 audio_sink, video_queue, visual, video_convert, video_sink)
+                 audio_sink, video_queue, video_branch)
     ret = audio_source.link(tee)
     ret = ret and audio_queue.link(audio_convert)
     ret = ret and audio_convert.link(audio_resample)
     ret = ret and audio_resample.link(audio_sink)
-    ret = ret and video_queue.link(visual)
-    ret = ret and visual.link(video_convert)
-    ret = ret and video_convert.link(video_sink)
+    ret = ret and video_queue.link(video_branch)
     if not ret:
         print("Elements could not be linked.", file=sys.stderr)
         exit(-1)
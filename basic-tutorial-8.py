@@ -1,9 +1,16 @@
-#!/usr/bin/env python
+#!/usr/bin/env python3
 """
 Basic tutorial 8: Short-cutting the pipeline
 https://gstreamer.freedesktop.org/documentation/tutorials/basic/short-cutting-the-pipeline.html
+
+    python3 basic-tutorial-8.py [RAW_FILE]
+
+Without RAW_FILE a synthetic waveform is generated. With it, the file
+(signed 16-bit mono samples at 44100 Hz) is fed from a memory mapping
+without copying, see mmapfeeder.py.
 """
 
+import argparse
 import sys
 from array import array
 
@@ -14,6 +21,8 @@ gi.require_version('GLib', '2.0')
 gi.require_version('GstAudio', '1.0')
 from gi.repository import Gst, GLib, GstAudio
 
+from mmapfeeder import MappedFileFeeder
+
 CHUNK_SIZE = 1024  # Amount of bytes we are sending in each buffer
 SAMPLE_RATE = 44100  # Samples per second we are sending
 
@@ -42,6 +51,7 @@ class CustomData:
         self.d = 1
         self.sourceid = 0
         self.main_loop = None
+        self.feeder = None
 
 
 # This method is called by the idle GSource in the mainloop, to feed CHUNK_SIZE bytes into appsrc.
@@ -61,7 +71,7 @@ def push_data(data):
         data.b -= data.a / freq
         a5 = (int(500 * data.a)) % 65535
         raw.append(a5)
-    b_data = raw.tostring()
+    b_data = raw.tobytes()
 
     data.num_samples += num_samples
     buffer = Gst.Buffer.new_wrapped(b_data)
@@ -114,7 +124,17 @@ def error_cb(bus, msg, data):
     data.main_loop.quit()
 
 
+# This function is called when an End-Of-Stream message is posted on the bus
+def eos_cb(bus, msg, data):
+    print("\nEnd-Of-Stream reached.")
+    data.main_loop.quit()
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Basic tutorial 8: Short-cutting the pipeline")
+    parser.add_argument("raw_file", nargs="?", help="raw S16 mono 44100 Hz samples to play")
+    args = parser.parse_args()
+
     Gst.init(None)
 
     data = CustomData()
@@ -154,10 +174,15 @@ def main():
     info = GstAudio.AudioInfo.new()
     info.set_format(GstAudio.AudioFormat.S16, SAMPLE_RATE, 1, None)
     audio_caps = info.to_caps()
-    data.app_source.set_property("caps", audio_caps)
-    data.app_source.set_property("format", Gst.Format.TIME)
-    data.app_source.connect("need-data", start_feed, data)
-    data.app_source.connect("enough-data", stop_feed, data)
+    if args.raw_file:
+        # Slices of the mapped file go downstream as they are, timestamped from their offset
+        data.feeder = MappedFileFeeder(data.app_source, args.raw_file, caps=audio_caps,
+                                       bytes_per_second=info.bpf * SAMPLE_RATE, frame_size=info.bpf)
+    else:
+        data.app_source.set_property("caps", audio_caps)
+        data.app_source.set_property("format", Gst.Format.TIME)
+        data.app_source.connect("need-data", start_feed, data)
+        data.app_source.connect("enough-data", stop_feed, data)
 
     # Configure appsink
     data.app_sink.set_property("emit-signals", True)
@@ -203,6 +228,7 @@ def main():
     bus = data.pipeline.get_bus()
     bus.add_signal_watch()
     bus.connect("message::error", error_cb, data)
+    bus.connect("message::eos", eos_cb, data)
 
     # Start playing the pipeline
     ret = data.pipeline.set_state(Gst.State.PLAYING)
@@ -213,6 +239,9 @@ def main():
 
     # Free resources
     data.pipeline.set_state(Gst.State.NULL)
+    if data.feeder:
+        print("Fed %d bytes in %d buffers" % (data.feeder.bytes, data.feeder.buffers))
+        data.feeder.close()
 
 
 if __name__ == '__main__':
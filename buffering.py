@@ -0,0 +1,220 @@
+"""
+Buffering controller for network playback
+
+Pauses a pipeline when the buffering level drops below a low watermark and
+only resumes it once the level is back above a high watermark and the
+pipeline has stayed paused for a minimum dwell time. This keeps flaky links
+from toggling PAUSED/PLAYING on every BUFFERING message.
+
+Usage from a bus callback:
+
+    controller = BufferingController(pipeline)
+    ...
+    elif msg.type == Gst.MessageType.BUFFERING:
+        controller.handle_message(msg)
+"""
+
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from rangeset import RangeSet
+
+
+# Rebuffer statistics gathered by the controller. All times are in seconds.
+class BufferingStats:
+    def __init__(self):
+        self.startup_time = None
+        self.rebuffer_count = 0
+        self.total_stall_time = 0.0
+        self.resume_times = []  # From the level reaching the high watermark to resuming
+
+    def average_time_to_resume(self):
+        if not self.resume_times:
+            return 0.0
+        return sum(self.resume_times) / len(self.resume_times)
+
+    def __str__(self):
+        startup = "n/a" if self.startup_time is None else "%.3fs" % self.startup_time
+        return ("startup %s, %d rebuffer(s), %.3fs stalled, %.3fs average time to resume" %
+                (startup, self.rebuffer_count, self.total_stall_time,
+                 self.average_time_to_resume()))
+
+
+class BufferingController:
+    def __init__(self, pipeline, low_watermark=10, high_watermark=100,
+                 min_dwell=1.0, clock=time.monotonic):
+        if not 0 <= low_watermark < high_watermark <= 100:
+            raise ValueError("watermarks must satisfy 0 <= low < high <= 100")
+
+        self.pipeline = pipeline
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.min_dwell = min_dwell
+        self.clock = clock
+        self.is_live = False
+        self.percent = 0
+        self.stats = BufferingStats()
+
+        # The state the application wants; we only ever hold it back
+        self._target_state = Gst.State.PLAYING
+        self._buffering = False
+        self._started = self.clock()
+        self._stall_started = self._started
+        self._full_since = None
+        self._has_played = False
+        self._resume_source = 0
+
+    # Set the state the application wants the pipeline to be in. While we are
+    # buffering, a request for PLAYING is deferred until buffering completes.
+    def set_target_state(self, state):
+        self._target_state = state
+        if state != Gst.State.PLAYING or not self._buffering:
+            return self.pipeline.set_state(state)
+        return self.pipeline.set_state(Gst.State.PAUSED)
+
+    # Mark the stream as live (set_state returned NO_PREROLL). Live streams
+    # cannot be paused to buffer, so BUFFERING messages are ignored.
+    def set_live(self, is_live):
+        self.is_live = is_live
+        if is_live:
+            self._buffering = False
+            self._cancel_resume()
+
+    def is_buffering(self):
+        return self._buffering
+
+    def handle_message(self, msg):
+        if msg.type != Gst.MessageType.BUFFERING:
+            return False
+        self.update(msg.parse_buffering())
+        return True
+
+    # Feed a new buffering level (0-100)
+    def update(self, percent):
+        self.percent = percent
+        if self.is_live:
+            return
+
+        if self._buffering:
+            if percent >= self.high_watermark:
+                if self._full_since is None:
+                    self._full_since = self.clock()
+                self._schedule_resume()
+            else:
+                self._full_since = None
+                self._cancel_resume()
+        elif percent < (self.low_watermark if self._has_played else self.high_watermark):
+            # Until playback has started once, wait for a full buffer
+            self._stall()
+        elif not self._has_played:
+            # Full from the first message on: playback starts without a stall
+            self.stats.startup_time = self.clock() - self._started
+            self._has_played = True
+
+    def _stall(self):
+        self._buffering = True
+        self._stall_started = self.clock()
+        self._full_since = None
+        if self._has_played:
+            self.stats.rebuffer_count += 1
+        if self._target_state == Gst.State.PLAYING:
+            self.pipeline.set_state(Gst.State.PAUSED)
+
+    def _schedule_resume(self):
+        remaining = self.min_dwell - (self.clock() - self._stall_started)
+        # The dwell time only guards against thrashing, never delay startup
+        if remaining <= 0 or not self._has_played:
+            self._resume()
+        elif self._resume_source == 0:
+            self._resume_source = GLib.timeout_add(int(remaining * 1000) + 1, self._on_dwell_expired)
+
+    def _cancel_resume(self):
+        if self._resume_source != 0:
+            GLib.source_remove(self._resume_source)
+            self._resume_source = 0
+
+    def _on_dwell_expired(self):
+        self._resume_source = 0
+        if self._buffering and self.percent >= self.high_watermark:
+            self._resume()
+        return False
+
+    def _resume(self):
+        self._cancel_resume()
+        now = self.clock()
+        stalled = now - self._stall_started
+        if self._has_played:
+            self.stats.total_stall_time += stalled
+            self.stats.resume_times.append(now - self._full_since)
+        else:
+            self.stats.startup_time = now - self._started
+            self._has_played = True
+        self._buffering = False
+        self._full_since = None
+        if self._target_state == Gst.State.PLAYING:
+            self.pipeline.set_state(Gst.State.PLAYING)
+
+
+# Tracks the downloaded regions reported by the buffering query, as a
+# RangeSet in Gst.FORMAT_PERCENT_MAX units. BUFFERING messages only
+# carry a percentage, not the ranges, so the query cannot be avoided; it is
+# only re-run when BUFFERING messages have arrived since the last one, at
+# most every max_age seconds however fast they come, and it is sent
+# straight to the queue that posted them instead of being forwarded to
+# every element. Each result replaces the previous ranges: with a ring
+# buffer the queue drops old data, so a region downloaded earlier may be
+# gone by now.
+class BufferingRanges:
+    def __init__(self, pipeline, max_age=1.0, clock=time.monotonic):
+        self.pipeline = pipeline
+        self.max_age = max_age
+        self.clock = clock
+        self.ranges = RangeSet()
+        self.queries = 0
+        self._source = None
+        self._dirty = True
+        self._refreshed = None
+
+    def reset(self):
+        self.ranges.clear()
+        self._source = None
+        self._dirty = True
+        self._refreshed = None
+
+    def handle_message(self, msg):
+        if msg.type != Gst.MessageType.BUFFERING:
+            return False
+        self._source = msg.src
+        self._dirty = True
+        return True
+
+    def refresh(self, force=False):
+        now = self.clock()
+        due = self._refreshed is None or now - self._refreshed >= self.max_age
+        if not (self._dirty and due or force):
+            return self.ranges
+
+        query = Gst.Query.new_buffering(Gst.Format.PERCENT)
+        result = self._source is not None and self._source.query(query)
+        if not result:
+            result = self.pipeline.query(query)
+        self.queries += 1
+        self._refreshed = now
+        if not result:
+            return self.ranges
+
+        self.ranges.clear()
+        for i in range(query.get_n_buffering_ranges()):
+            ret, start, stop = query.parse_nth_buffering_range(i)
+            if ret and start < stop:
+                self.ranges.add(start, stop)
+        self._dirty = False
+        return self.ranges
+
+    # Fraction of the stream that has been downloaded, between 0 and 1
+    def coverage(self):
+        return self.ranges.total() / Gst.FORMAT_PERCENT_MAX
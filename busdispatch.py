@@ -0,0 +1,111 @@
+"""
+Shared bus message dispatcher
+
+BusDispatcher takes a table of message type -> handler once, and only lets
+those types reach Python. A sync handler written in Python would itself be
+called from C for every message, so the filtering is done by the bus: the
+table's types are OR-ed into one GstMessageType mask and messages are
+popped with gst_bus_pop_filtered(), which discards every other type in C
+without creating a Python object for it. Handlers are then found with one
+dict lookup.
+
+The dispatcher can drive itself from the GLib main loop (attach(), which
+watches the bus's poll fd) or be polled (poll(timeout)). It counts messages
+and handler time per type.
+
+    dispatcher = BusDispatcher(pipeline.get_bus(), {
+        Gst.MessageType.ERROR: on_error,
+        Gst.MessageType.EOS: on_eos,
+    }, data)
+    dispatcher.attach()
+"""
+
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+
+class TypeStats:
+    def __init__(self):
+        self.count = 0
+        self.handler_time = 0.0
+
+
+class DispatchStats:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.started = clock()
+        self.types = {}
+
+    def record(self, type, elapsed):
+        stats = self.types.get(type)
+        if stats is None:
+            stats = self.types[type] = TypeStats()
+        stats.count += 1
+        stats.handler_time += elapsed
+
+    def __str__(self):
+        elapsed = max(self.clock() - self.started, 1e-9)
+        lines = ["%-18s %8s %9s %10s" % ("type", "messages", "per sec", "handler")]
+        for type, stats in sorted(self.types.items(), key=lambda item: -item[1].count):
+            lines.append("%-18s %8d %9.1f %8.2fms" %
+                         (Gst.MessageType.get_name(type), stats.count, stats.count / elapsed,
+                          1000 * stats.handler_time))
+        return "\n".join(lines)
+
+
+class BusDispatcher:
+    # handlers maps Gst.MessageType to handler(msg, user_data)
+    def __init__(self, bus, handlers, user_data=None):
+        self.bus = bus
+        self.handlers = dict(handlers)
+        self.user_data = user_data
+        self.mask = Gst.MessageType(0)
+        for type in self.handlers:
+            self.mask |= type
+        self.stats = DispatchStats()
+        self._source_id = None
+
+    def dispatch(self, msg):
+        handler = self.handlers.get(msg.type)
+        if handler is None:
+            return
+        started = time.perf_counter()
+        handler(msg, self.user_data)
+        self.stats.record(msg.type, time.perf_counter() - started)
+
+    # Dispatch everything waiting on the bus; returns how many were handled
+    def dispatch_pending(self):
+        handled = 0
+        while True:
+            msg = self.bus.pop_filtered(self.mask)
+            if msg is None:
+                return handled
+            self.dispatch(msg)
+            handled += 1
+
+    # Wait up to timeout (nanoseconds) for one wanted message and dispatch it
+    def poll(self, timeout):
+        msg = self.bus.timed_pop_filtered(timeout, self.mask)
+        if msg is None:
+            return False
+        self.dispatch(msg)
+        return True
+
+    # Dispatch from the GLib main loop whenever the bus has messages
+    def attach(self, priority=GLib.PRIORITY_DEFAULT):
+        pollfd = self.bus.get_pollfd()
+        self._source_id = GLib.unix_fd_add_full(priority, pollfd.fd, GLib.IOCondition.IN,
+                                                self._fd_ready)
+
+    def _fd_ready(self, fd, condition):
+        self.dispatch_pending()
+        return True
+
+    def detach(self):
+        if self._source_id is not None:
+            GLib.source_remove(self._source_id)
+            self._source_id = None
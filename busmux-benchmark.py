@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Bus multiplexer benchmark: runs many short videotestsrc pipelines at once
+and waits for all of them, either with one thread per pipeline blocked in
+timed_pop_filtered() (the tutorials' pattern) or with a BusMultiplexer on
+a single GLib or asyncio loop. Reports wall time, CPU, threads and wakeups
+(returns from a blocking pop, or fd callbacks of the multiplexer).
+
+    python3 busmux-benchmark.py [--pipelines 500] [--buffers 90] [--modes threads glib asyncio]
+"""
+
+import argparse
+import asyncio
+import resource
+import threading
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from busmux import BusMultiplexer
+from pipelinetemplate import PipelineTemplate
+
+WATCHED = Gst.MessageType.EOS | Gst.MessageType.ERROR | Gst.MessageType.STATE_CHANGED
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def make_pipelines(count, buffers):
+    template = PipelineTemplate("videotestsrc num-buffers={buffers} ! "
+                                "video/x-raw,width=64,height=48,framerate=30/1 ! fakesink sync=true")
+    return [template.instantiate(buffers=buffers) for i in range(count)]
+
+
+def run_threads(pipelines):
+    wakeups = [0]
+    lock = threading.Lock()
+
+    def wait(pipeline):
+        bus = pipeline.get_bus()
+        while True:
+            msg = bus.timed_pop_filtered(Gst.CLOCK_TIME_NONE, WATCHED)
+            with lock:
+                wakeups[0] += 1
+            if msg.type in (Gst.MessageType.EOS, Gst.MessageType.ERROR):
+                return
+
+    threads = [threading.Thread(target=wait, args=(p,)) for p in pipelines]
+    for thread in threads:
+        thread.start()
+    for pipeline in pipelines:
+        pipeline.set_state(Gst.State.PLAYING)
+    peak = threading.active_count()
+    for thread in threads:
+        thread.join()
+    return wakeups[0], peak
+
+
+def on_done(pipeline, msg, done):
+    done(pipeline)
+
+
+def on_state_changed(pipeline, msg, done):
+    pass
+
+
+def run_glib(pipelines):
+    loop = GLib.MainLoop.new(None, False)
+    remaining = set(pipelines)
+
+    def done(pipeline):
+        remaining.discard(pipeline)
+        if not remaining:
+            loop.quit()
+
+    mux = BusMultiplexer({Gst.MessageType.EOS: on_done, Gst.MessageType.ERROR: on_done,
+                          Gst.MessageType.STATE_CHANGED: on_state_changed}, done)
+    for pipeline in pipelines:
+        mux.add(pipeline)
+        pipeline.set_state(Gst.State.PLAYING)
+    peak = threading.active_count()
+    loop.run()
+    mux.close()
+    return mux.wakeups, peak
+
+
+def run_asyncio(pipelines):
+    loop = asyncio.new_event_loop()
+    finished = loop.create_future()
+    remaining = set(pipelines)
+
+    def done(pipeline):
+        remaining.discard(pipeline)
+        if not remaining and not finished.done():
+            finished.set_result(None)
+
+    mux = BusMultiplexer({Gst.MessageType.EOS: on_done, Gst.MessageType.ERROR: on_done,
+                          Gst.MessageType.STATE_CHANGED: on_state_changed}, done, loop=loop)
+    for pipeline in pipelines:
+        mux.add(pipeline)
+        pipeline.set_state(Gst.State.PLAYING)
+    peak = threading.active_count()
+    loop.run_until_complete(finished)
+    mux.close()
+    loop.close()
+    return mux.wakeups, peak
+
+
+MODES = {"threads": run_threads, "glib": run_glib, "asyncio": run_asyncio}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bus multiplexer scaling benchmark")
+    parser.add_argument("--pipelines", type=int, default=500)
+    parser.add_argument("--buffers", type=int, default=90, help="frames per pipeline (30 fps)")
+    parser.add_argument("--modes", nargs="+", choices=sorted(MODES), default=["threads", "glib", "asyncio"])
+    args = parser.parse_args()
+
+    # Every bus poll fd counts against the descriptor limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    Gst.init(None)
+
+    print("%-8s %8s %8s %8s %14s %10s" % ("mode", "wall", "CPU", "CPU%", "Python threads", "wakeups"))
+    for mode in args.modes:
+        pipelines = make_pipelines(args.pipelines, args.buffers)
+        cpu, wall = cpu_time(), time.monotonic()
+        wakeups, threads = MODES[mode](pipelines)
+        cpu, wall = cpu_time() - cpu, time.monotonic() - wall
+        for pipeline in pipelines:
+            pipeline.set_state(Gst.State.NULL)
+        print("%-8s %7.2fs %7.2fs %7.1f%% %14d %10d" %
+              (mode, wall, cpu, 100 * cpu / wall, threads, wakeups))
+
+
+if __name__ == '__main__':
+    main()
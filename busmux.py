@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Bus multiplexer: many pipelines, one loop
+
+Instead of a thread blocked in timed_pop_filtered() per pipeline,
+BusMultiplexer watches the poll fd of every pipeline's bus from a single
+loop, either the GLib main loop or an asyncio event loop, and calls
+handler(pipeline, msg, user_data) for the message types in its table
+(typically EOS, ERROR and STATE_CHANGED). As in busdispatch.py, other types are
+dropped by gst_bus_pop_filtered() without reaching Python. A wakeup drains
+everything waiting on that bus, so the number of wakeups can be much lower
+than the number of messages.
+
+    mux = BusMultiplexer({Gst.MessageType.EOS: on_eos, Gst.MessageType.ERROR: on_error})
+    for pipeline in pipelines:
+        mux.add(pipeline)
+
+    python3 busmux.py URI [URI ...]
+"""
+
+import sys
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from busdispatch import DispatchStats
+
+
+class BusMultiplexer:
+    # handlers maps Gst.MessageType to handler(pipeline, msg, user_data).
+    # With an asyncio loop the fds are watched by it, otherwise by GLib.
+    def __init__(self, handlers, user_data=None, loop=None, priority=GLib.PRIORITY_DEFAULT):
+        self.handlers = dict(handlers)
+        self.user_data = user_data
+        self.loop = loop
+        self.priority = priority
+        self.mask = Gst.MessageType(0)
+        for type in self.handlers:
+            self.mask |= type
+        self.stats = DispatchStats()
+        self.wakeups = 0
+        self._watches = {}  # fd -> (pipeline, bus, GLib source id or None)
+        self._fds = {}  # pipeline -> fd
+
+    def __len__(self):
+        return len(self._watches)
+
+    def add(self, pipeline):
+        bus = pipeline.get_bus()
+        fd = bus.get_pollfd().fd
+        if self.loop is not None:
+            self.loop.add_reader(fd, self._ready, fd)
+            source_id = None
+        else:
+            source_id = GLib.unix_fd_add_full(self.priority, fd, GLib.IOCondition.IN,
+                                              self._glib_ready)
+        self._watches[fd] = (pipeline, bus, source_id)
+        self._fds[pipeline] = fd
+        return fd
+
+    def remove(self, pipeline):
+        fd = self._fds.pop(pipeline, None)
+        if fd is None:
+            return False
+        source_id = self._watches.pop(fd)[2]
+        if source_id is None:
+            self.loop.remove_reader(fd)
+        else:
+            GLib.source_remove(source_id)
+        return True
+
+    def _glib_ready(self, fd, condition):
+        self._ready(fd)
+        return True
+
+    def _ready(self, fd):
+        self.wakeups += 1
+        watch = self._watches.get(fd)
+        if watch is None:
+            return
+        pipeline, bus = watch[0], watch[1]
+        while fd in self._watches:
+            msg = bus.pop_filtered(self.mask)
+            if msg is None:
+                break
+            started = time.perf_counter()
+            self.handlers[msg.type](pipeline, msg, self.user_data)
+            self.stats.record(msg.type, time.perf_counter() - started)
+
+    def close(self):
+        for pipeline in list(self._fds):
+            self.remove(pipeline)
+
+
+def main():
+    Gst.init(None)
+
+    if len(sys.argv) < 2:
+        print("Usage: %s URI [URI ...]" % sys.argv[0], file=sys.stderr)
+        exit(-1)
+
+    loop = GLib.MainLoop.new(None, False)
+
+    def on_done(pipeline, msg, loop):
+        if msg.type == Gst.MessageType.ERROR:
+            err, debug_info = msg.parse_error()
+            print("%s: error: %s" % (pipeline.get_name(), err), file=sys.stderr)
+        else:
+            print("%s: End-Of-Stream reached." % pipeline.get_name())
+        pipeline.set_state(Gst.State.NULL)
+        mux.remove(pipeline)
+        if not len(mux):
+            loop.quit()
+
+    def on_state_changed(pipeline, msg, loop):
+        if msg.src == pipeline:
+            old_state, new_state, pending_state = msg.parse_state_changed()
+            print("%s: %s -> %s" % (pipeline.get_name(), old_state.value_nick, new_state.value_nick))
+
+    mux = BusMultiplexer({Gst.MessageType.EOS: on_done,
+                          Gst.MessageType.ERROR: on_done,
+                          Gst.MessageType.STATE_CHANGED: on_state_changed}, loop)
+    for i, uri in enumerate(sys.argv[1:]):
+        pipeline = Gst.ElementFactory.make("playbin", "player%d" % i)
+        pipeline.set_property("uri", uri)
+        mux.add(pipeline)
+        pipeline.set_state(Gst.State.PLAYING)
+
+    loop.run()
+    mux.close()
+    print("%d wakeup(s)\n%s" % (mux.wakeups, mux.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Color-balance benchmark: frames per second of the videobalance element
+against the NumPy balance of numpybalance.py, on 1080p raw video pulled from
+an appsink. Both runs read the same videotestsrc frames through the same
+appsink loop, and a run with no balance at all gives the cost of the harness
+itself. The largest per-byte difference from videobalance's output is
+printed too.
+
+    python3 colorbalance-benchmark.py [--frames N] [--formats I420 NV12 RGB]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from numpybalance import SoftwareColorBalance
+
+SETTINGS = dict(brightness=0.1, contrast=1.2, hue=0.2, saturation=1.3)
+CAPS = "video/x-raw,format=%s,width=1920,height=1080,framerate=30/1"
+
+
+def make_pipeline(fmt, frames, balance):
+    return Gst.parse_launch(
+        "videotestsrc num-buffers=%d pattern=smpte ! %s ! %s"
+        "appsink name=sink sync=false max-buffers=4" %
+        (frames, CAPS % fmt,
+         "videobalance %s ! " % " ".join("%s=%g" % item for item in SETTINGS.items())
+         if balance else ""))
+
+
+# Pull every frame, optionally running the NumPy balance on it; returns fps
+def run(fmt, frames, element, software):
+    pipeline = make_pipeline(fmt, frames, element)
+    sink = pipeline.get_by_name("sink")
+    pipeline.set_state(Gst.State.PLAYING)
+    count = 0
+    started = time.perf_counter()
+    while True:
+        sample = sink.emit("pull-sample")
+        if sample is None:
+            break
+        if software:
+            software.process_sample(sample)
+        count += 1
+    elapsed = time.perf_counter() - started
+    pipeline.set_state(Gst.State.NULL)
+    return count / elapsed
+
+
+def first_frame(fmt, element):
+    pipeline = make_pipeline(fmt, 1, element)
+    sink = pipeline.get_by_name("sink")
+    pipeline.set_state(Gst.State.PLAYING)
+    sample = sink.emit("pull-sample")
+    pipeline.set_state(Gst.State.NULL)
+    return sample
+
+
+def max_difference(fmt):
+    reference = first_frame(fmt, True)
+    ok, mapinfo = reference.get_buffer().map(Gst.MapFlags.READ)
+    expected = np.frombuffer(mapinfo.data, dtype=np.uint8).copy()
+    reference.get_buffer().unmap(mapinfo)
+    result = SoftwareColorBalance(**SETTINGS).process_sample(first_frame(fmt, False))
+    return int(np.abs(result.astype(np.int16) - expected).max())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Software color balance benchmark")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--formats", nargs="+", default=["I420", "NV12", "RGB"])
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    print("%-6s %10s %12s %10s %9s" % ("format", "no balance", "videobalance", "numpy", "max diff"))
+    for fmt in args.formats:
+        baseline = run(fmt, args.frames, False, None)
+        element = run(fmt, args.frames, True, None)
+        software = run(fmt, args.frames, False, SoftwareColorBalance(**SETTINGS))
+        print("%-6s %6.1f fps %8.1f fps %6.1f fps %9d" %
+              (fmt, baseline, element, software, max_difference(fmt)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Color-balance controller with smooth ramps
+
+Looks the color-balance channels up once and keeps the handles, instead of
+listing and searching them on every change. Changes are not applied as one
+jump: each channel ramps to its target over ramp_time, driven by a single
+GLib timeout shared by all channels. A change requested while a ramp is
+running moves that ramp's target, so fast key repeats end up as one ramp
+rather than one property write per key press.
+
+    controller = ColorBalanceController(playbin)
+    controller.nudge("CONTRAST", +1)
+"""
+
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+gi.require_version('GstVideo', '1.0')
+from gi.repository import GstVideo, GLib
+
+
+class BalanceStats:
+    def __init__(self):
+        self.requests = 0
+        self.ramps = 0
+        self.writes = 0
+
+    def __str__(self):
+        return "%d change(s) as %d ramp(s), %d value write(s)" % (self.requests, self.ramps, self.writes)
+
+
+class ColorBalanceController:
+    # on_settled() is called whenever all ramps have finished
+    def __init__(self, balance, step=0.1, ramp_time=0.25, interval=16, on_settled=None,
+                 clock=time.monotonic):
+        self.balance = balance
+        self.step = step
+        self.ramp_time = ramp_time
+        self.interval = interval
+        self.on_settled = on_settled
+        self.clock = clock
+        self.stats = BalanceStats()
+        self._channels = {}
+        self._values = {}
+        self._ramps = {}  # label -> (start value, start time, target)
+        self._timeout_id = None
+
+    # The channels are only known once the video sink exists
+    def channels(self):
+        if not self._channels:
+            for channel in GstVideo.ColorBalance.list_channels(self.balance):
+                self._channels[channel.label] = channel
+                self._values[channel.label] = GstVideo.ColorBalance.get_value(self.balance, channel)
+        return self._channels
+
+    # Value of each channel as a fraction of its range
+    def fractions(self):
+        return [(label, (self._values[label] - c.min_value) / (c.max_value - c.min_value))
+                for label, c in self.channels().items()]
+
+    # Move a channel's target by direction steps of its range
+    def nudge(self, label, direction):
+        channel = self.channels().get(label)
+        if channel is None:
+            return False
+        self.stats.requests += 1
+        ramp = self._ramps.get(label)
+        target = ramp[2] if ramp else self._values[label]
+        target += direction * self.step * (channel.max_value - channel.min_value)
+        self.set_target(label, target)
+        return True
+
+    def set_target(self, label, target):
+        channel = self.channels()[label]
+        target = int(round(min(max(target, channel.min_value), channel.max_value)))
+        if label not in self._ramps:
+            self.stats.ramps += 1
+        # Start from where the ramp currently is, so a merged change stays smooth
+        self._ramps[label] = (self._values[label], self.clock(), target)
+        if self._timeout_id is None:
+            self._timeout_id = GLib.timeout_add(self.interval, self._tick)
+
+    def _tick(self):
+        now = self.clock()
+        for label, (start, started, target) in list(self._ramps.items()):
+            progress = min(1.0, (now - started) / self.ramp_time) if self.ramp_time > 0 else 1.0
+            value = int(round(start + (target - start) * progress))
+            if value != self._values[label]:
+                GstVideo.ColorBalance.set_value(self.balance, self._channels[label], value)
+                self._values[label] = value
+                self.stats.writes += 1
+            if progress >= 1.0:
+                del self._ramps[label]
+        if self._ramps:
+            return True
+        self._timeout_id = None
+        if self.on_settled:
+            self.on_settled()
+        return False
+
+    def stop(self):
+        if self._timeout_id is not None:
+            GLib.source_remove(self._timeout_id)
+            self._timeout_id = None
+        self._ramps.clear()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+FFT equalizer benchmark: real-time factor (seconds of audio processed per
+second of wall time) of the Python fftequalizer against the native
+equalizer-3bands, both cutting band1 and band2 by 24 dB as in
+playback-tutorial-7. Several streams can run at once, to see how the
+Python element scales when it shares the interpreter.
+
+    python3 fftequalizer-benchmark.py [--seconds N] [--streams 1 4 16]
+"""
+
+import argparse
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+import fftequalizer
+
+SAMPLE_RATE = 44100
+SAMPLES_PER_BUFFER = 1024
+FILTERS = {
+    "none": "identity",
+    "equalizer-3bands": "equalizer-3bands band1=-24 band2=-24",
+    "fftequalizer": "fftequalizer band1=-24 band2=-24",
+}
+
+
+# Run streams pipelines at once through the filter; returns the real-time
+# factor of one stream
+def run(description, seconds, streams):
+    buffers = int(seconds * SAMPLE_RATE / SAMPLES_PER_BUFFER)
+    pipelines = [Gst.parse_launch(
+        "audiotestsrc wave=pink-noise num-buffers=%d samplesperbuffer=%d ! "
+        "audio/x-raw,format=F32LE,rate=%d,channels=2 ! %s ! fakesink sync=false" %
+        (buffers, SAMPLES_PER_BUFFER, SAMPLE_RATE, description)) for i in range(streams)]
+    started = time.perf_counter()
+    for pipeline in pipelines:
+        pipeline.set_state(Gst.State.PLAYING)
+    for pipeline in pipelines:
+        msg = pipeline.get_bus().timed_pop_filtered(Gst.CLOCK_TIME_NONE,
+                                                    Gst.MessageType.ERROR | Gst.MessageType.EOS)
+        if msg.type == Gst.MessageType.ERROR:
+            err, debug_info = msg.parse_error()
+            raise RuntimeError("%s: %s" % (description, err))
+    elapsed = time.perf_counter() - started
+    for pipeline in pipelines:
+        pipeline.set_state(Gst.State.NULL)
+    return buffers * SAMPLES_PER_BUFFER / SAMPLE_RATE / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FFT equalizer real-time factor benchmark")
+    parser.add_argument("--seconds", type=float, default=60.0, help="audio length per stream")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    Gst.init(None)
+    fftequalizer.register()
+
+    print("%-18s %s" % ("filter", " ".join("%9s" % ("%d stream(s)" % n) for n in args.streams)))
+    for name, description in FILTERS.items():
+        factors = [run(description, args.seconds, n) for n in args.streams]
+        print("%-18s %s" % (name, " ".join("%8.1fx" % f for f in factors)))
+    print("(real-time factor per stream; below 1x a stream cannot keep up)")
+
+
+if __name__ == '__main__':
+    main()
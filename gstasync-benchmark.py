@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+asyncio adapter benchmark. First the per-message cost of getting bus
+messages into Python: N application messages are posted on a pipeline's bus
+and then consumed by a plain pop_filtered() loop, a BusDispatcher, a GLib
+signal watch (the tutorials' pattern) and "async for msg in bus" of
+gstasync.AsyncPipeline. Then orchestration: many short videotestsrc
+pipelines are each driven with set_state_async() and eos() from one event
+loop.
+
+    python3 gstasync-benchmark.py [--messages 100000] [--pipelines 1000] [--buffers 30]
+"""
+
+import argparse
+import asyncio
+import resource
+import threading
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from busdispatch import BusDispatcher
+from gstasync import AsyncPipeline, INTERNAL_TYPES
+from pipelinetemplate import PipelineTemplate
+
+DONE = Gst.MessageType.APPLICATION | Gst.MessageType.EOS
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+# A pipeline whose bus holds count application messages followed by EOS
+def filled_pipeline(count):
+    pipeline = Gst.Pipeline.new("messages")
+    bus = pipeline.get_bus()
+    for i in range(count):
+        bus.post(Gst.Message.new_application(pipeline, Gst.Structure.new_empty("tick")))
+    bus.post(Gst.Message.new_eos(pipeline))
+    return pipeline
+
+
+def consume_pop(pipeline):
+    bus = pipeline.get_bus()
+    received = 0
+    while True:
+        msg = bus.pop_filtered(DONE)
+        if msg.type == Gst.MessageType.EOS:
+            return received
+        received += 1
+
+
+def on_tick(msg, counter):
+    counter[0] += 1
+
+
+def consume_dispatcher(pipeline):
+    counter = [0]
+    dispatcher = BusDispatcher(pipeline.get_bus(), {Gst.MessageType.APPLICATION: on_tick,
+                                                    Gst.MessageType.EOS: on_tick}, counter)
+    dispatcher.dispatch_pending()
+    return counter[0] - 1
+
+
+def consume_signal(pipeline):
+    loop = GLib.MainLoop.new(None, False)
+    counter = [0]
+
+    def on_message(bus, msg):
+        if msg.type == Gst.MessageType.EOS:
+            loop.quit()
+        elif msg.type == Gst.MessageType.APPLICATION:
+            counter[0] += 1
+
+    bus = pipeline.get_bus()
+    bus.add_signal_watch()
+    handler_id = bus.connect("message", on_message)
+    loop.run()
+    bus.disconnect(handler_id)
+    bus.remove_signal_watch()
+    return counter[0]
+
+
+def consume_async(pipeline):
+    async def consume():
+        adapter = AsyncPipeline(pipeline, DONE, asyncio.get_running_loop())
+        received = 0
+        async for msg in adapter.bus:
+            if msg.type == Gst.MessageType.APPLICATION:
+                received += 1
+        adapter.close()
+        return received
+
+    return asyncio.run(consume())
+
+
+CONSUMERS = {"pop": consume_pop, "dispatcher": consume_dispatcher,
+             "signal": consume_signal, "async-for": consume_async}
+
+
+async def orchestrate(count, buffers):
+    loop = asyncio.get_running_loop()
+    template = PipelineTemplate("videotestsrc num-buffers={buffers} ! "
+                                "video/x-raw,width=64,height=48,framerate=30/1 ! fakesink sync=true")
+    pipelines = [AsyncPipeline(template.instantiate(buffers=buffers), INTERNAL_TYPES, loop)
+                 for i in range(count)]
+
+    async def run(pipeline):
+        await pipeline.set_state_async(Gst.State.PLAYING)
+        await pipeline.eos()
+        pipeline.close()
+
+    await asyncio.gather(*(run(pipeline) for pipeline in pipelines))
+    return threading.active_count()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio adapter benchmark")
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--pipelines", type=int, default=1000)
+    parser.add_argument("--buffers", type=int, default=30, help="frames per pipeline (30 fps)")
+    args = parser.parse_args()
+
+    # Every bus poll fd counts against the descriptor limit
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    Gst.init(None)
+
+    print("%-10s %10s %12s" % ("consumer", "messages", "per message"))
+    for name, consume in CONSUMERS.items():
+        pipeline = filled_pipeline(args.messages)
+        started = time.perf_counter()
+        received = consume(pipeline)
+        elapsed = time.perf_counter() - started
+        print("%-10s %10d %10.2fus" % (name, received, 1e6 * elapsed / max(received, 1)))
+
+    cpu, wall = cpu_time(), time.monotonic()
+    threads = asyncio.run(orchestrate(args.pipelines, args.buffers))
+    cpu, wall = cpu_time() - cpu, time.monotonic() - wall
+    print("\n%d pipelines of %d frames from one event loop: %.2fs wall, %.2fs CPU, "
+          "%d Python thread(s)" % (args.pipelines, args.buffers, wall, cpu, threads))
+
+
+if __name__ == '__main__':
+    main()
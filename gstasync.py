@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+asyncio adapter for pipelines and their bus
+
+AsyncPipeline lets a coroutine drive a pipeline without a GLib main loop or
+a thread blocked on the bus: the bus's poll fd is registered with the
+asyncio event loop (add_reader), and when it becomes readable every waiting
+message is popped (filtered in C by type, as in busdispatch.py) and handed
+to whoever waits for it:
+
+    pipeline = AsyncPipeline(playbin)
+    await pipeline.set_state_async(Gst.State.PLAYING)
+    async for msg in pipeline.bus:
+        ...
+    await pipeline.eos()
+
+Each "async for" gets its own queue of messages. The bus only holds weak
+references to them, so leaving the loop early (break) stops the queueing;
+subscribe() gives a subscription that can also be closed explicitly or
+used with "async with".
+
+Errors posted on the bus make set_state_async() and eos() raise
+PipelineError. Since no thread is involved, thousands of pipelines can be
+awaited from one event loop.
+
+Bus messages do not need the GLib main context, but GLib timeouts and idle
+callbacks (used by e.g. buffering.py) do; GLibContextPump dispatches them
+from the event loop. It wakes up when the next GLib timeout is due, so
+timeouts fire on time. PyGObject does not hand out the context's poll fds,
+so sources without a deadline (fd watches, and idle callbacks added from
+outside a GLib callback) are only picked up every interval seconds; call
+wakeup() after adding one to run it at once.
+
+    python3 gstasync.py URI [URI ...]
+"""
+
+import asyncio
+import collections
+import sys
+import weakref
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+INTERNAL_TYPES = (Gst.MessageType.EOS | Gst.MessageType.ERROR |
+                  Gst.MessageType.STATE_CHANGED | Gst.MessageType.ASYNC_DONE)
+
+
+class PipelineError(Exception):
+    def __init__(self, msg):
+        err, debug_info = msg.parse_error()
+        super().__init__("%s: %s" % (msg.src.get_name(), err))
+        self.debug_info = debug_info
+
+
+class AsyncBus:
+    def __init__(self, pipeline):
+        self._pipeline = pipeline
+        self._subscribers = weakref.WeakSet()
+
+    def subscribe(self):
+        return BusSubscription(self)
+
+    def __aiter__(self):
+        return self.subscribe()
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def _deliver(self, msg):
+        for subscription in list(self._subscribers):
+            subscription._push(msg)
+
+
+# One "async for msg in bus"; ends after EOS or ERROR, or when closed
+class BusSubscription:
+    def __init__(self, bus):
+        self._bus = bus
+        self._queue = collections.deque()
+        self._waiter = None
+        self._done = False
+        bus._subscribers.add(self)
+
+    def _push(self, msg):
+        self._queue.append(msg)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._queue:
+            if self._done:
+                raise StopAsyncIteration
+            self._waiter = self._bus._pipeline.loop.create_future()
+            await self._waiter
+            self._waiter = None
+        msg = self._queue.popleft()
+        if msg.type in (Gst.MessageType.EOS, Gst.MessageType.ERROR):
+            self.close()
+        return msg
+
+    # Stop queueing messages; those already queued are dropped
+    def close(self):
+        self._done = True
+        self._queue.clear()
+        self._bus._subscribers.discard(self)
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def aclose(self):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+
+class AsyncPipeline:
+    # types: the message types "async for msg in bus" sees
+    def __init__(self, pipeline, types=Gst.MessageType.ANY, loop=None):
+        self.pipeline = pipeline
+        self.loop = loop or asyncio.get_running_loop()
+        self.bus = AsyncBus(self)
+        self.mask = types | INTERNAL_TYPES
+        self._gst_bus = pipeline.get_bus()
+        self._fd = self._gst_bus.get_pollfd().fd
+        self._eos = self.loop.create_future()
+        self._state_waiters = []  # (target state, future)
+        self._last_error = None
+        self.loop.add_reader(self._fd, self._ready)
+
+    def _ready(self):
+        while True:
+            msg = self._gst_bus.pop_filtered(self.mask)
+            if msg is None:
+                return
+            self._handle(msg)
+
+    def _handle(self, msg):
+        if msg.type == Gst.MessageType.ERROR:
+            self._last_error = PipelineError(msg)
+            self._fail(self._last_error)
+        elif msg.type == Gst.MessageType.EOS:
+            if not self._eos.done():
+                self._eos.set_result(msg)
+        elif msg.type == Gst.MessageType.ASYNC_DONE or (
+                msg.type == Gst.MessageType.STATE_CHANGED and msg.src == self.pipeline):
+            self._check_state()
+        self.bus._deliver(msg)
+
+    def _check_state(self):
+        if not self._state_waiters:
+            return
+        ret, current, pending = self.pipeline.get_state(0)
+        for waiter in list(self._state_waiters):
+            target, future = waiter
+            if current == target and pending == Gst.State.VOID_PENDING:
+                self._state_waiters.remove(waiter)
+                if not future.done():
+                    future.set_result(Gst.StateChangeReturn.SUCCESS)
+
+    def _fail(self, error):
+        for target, future in self._state_waiters:
+            if not future.done():
+                future.set_exception(error)
+        self._state_waiters = []
+        if not self._eos.done():
+            self._eos.set_exception(error)
+            # Retrieved here so an unawaited eos() does not log it again
+            self._eos.exception()
+
+    async def set_state_async(self, state):
+        self._last_error = None
+        ret = self.pipeline.set_state(state)
+        if ret == Gst.StateChangeReturn.FAILURE:
+            # The element that failed usually posted an error explaining why;
+            # everything before it still goes to the waiters and subscribers
+            self._ready()
+            if self._last_error is not None:
+                raise self._last_error
+            raise RuntimeError("%s: unable to set the state to %s" %
+                               (self.pipeline.get_name(), state.value_nick))
+        if ret != Gst.StateChangeReturn.ASYNC:
+            return ret
+        future = self.loop.create_future()
+        self._state_waiters.append((state, future))
+        # The state may have been reached before the waiter was registered
+        self._check_state()
+        return await future
+
+    # Resolves with the EOS message; raises PipelineError on error
+    def eos(self):
+        return asyncio.shield(self._eos)
+
+    def close(self):
+        self.loop.remove_reader(self._fd)
+        self.pipeline.set_state(Gst.State.NULL)
+        for target, future in self._state_waiters:
+            future.cancel()
+        self._state_waiters = []
+        if not self._eos.done():
+            self._eos.cancel()
+
+
+# Dispatches pending GLib sources (timeouts, idle callbacks) from the
+# asyncio loop, when the next GLib timeout is due and at least every
+# interval seconds
+class GLibContextPump:
+    def __init__(self, loop=None, interval=0.1, context=None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.interval = interval
+        self.context = context or GLib.MainContext.default()
+        self._handle = None
+
+    def start(self):
+        self._handle = self.loop.call_soon(self._pump)
+
+    # Dispatch now, e.g. after adding an idle callback or fd watch
+    def wakeup(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = self.loop.call_soon(self._pump)
+
+    def _pump(self):
+        while self.context.iteration(False):
+            pass
+        self._handle = self.loop.call_later(self._next_delay(), self._pump)
+
+    # Seconds until GLib has something to dispatch, at most interval
+    def _next_delay(self):
+        if not self.context.acquire():
+            return self.interval
+        try:
+            ready, priority = self.context.prepare()
+            timeout = self.context.query(priority)[1]
+        finally:
+            self.context.release()
+        if ready:
+            return 0
+        if timeout < 0:
+            return self.interval
+        return min(timeout / 1000, self.interval)
+
+    def stop(self):
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+
+async def play(pipeline):
+    name = pipeline.pipeline.get_name()
+    try:
+        await pipeline.set_state_async(Gst.State.PLAYING)
+        print("%s: playing" % name)
+        await pipeline.eos()
+        print("%s: End-Of-Stream reached." % name)
+    except (PipelineError, RuntimeError) as e:
+        print("%s: error: %s" % (name, e), file=sys.stderr)
+    finally:
+        pipeline.close()
+
+
+async def play_all(uris):
+    loop = asyncio.get_running_loop()
+    pipelines = []
+    for i, uri in enumerate(uris):
+        playbin = Gst.ElementFactory.make("playbin", "player%d" % i)
+        playbin.set_property("uri", uri)
+        pipelines.append(AsyncPipeline(playbin, INTERNAL_TYPES, loop))
+    await asyncio.gather(*(play(pipeline) for pipeline in pipelines))
+
+
+def main():
+    Gst.init(None)
+
+    if len(sys.argv) < 2:
+        print("Usage: %s URI [URI ...]" % sys.argv[0], file=sys.stderr)
+        exit(-1)
+
+    asyncio.run(play_all(sys.argv[1:]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Local throttled HTTP media server
+
+Serves files from a directory over HTTP with configurable bandwidth, latency,
+jitter, byte-range support and injected stalls, so the streaming tutorials
+can be exercised offline against a reproducible "bad network".
+
+    with ThrottledMediaServer("media", bandwidth=256 * 1024, latency=0.1) as server:
+        uri = server.uri("sintel_trailer-480p.webm")
+
+It can also be run on its own:
+
+    python3 mediaserver.py media --bandwidth 256k --latency 0.1 --stall 1M:3
+"""
+
+import argparse
+import email.utils
+import os
+import random
+import re
+import sys
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote, urlsplit
+
+CHUNK_SIZE = 16 * 1024  # Amount of bytes written per throttling step
+
+RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+# Counters shared by all connections of a server
+class ServerStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.range_requests = 0
+        self.bytes_sent = 0
+        self.stall_time = 0.0
+        self.first_request_time = None
+        self.last_byte_time = None
+
+    def throughput(self):
+        # Average payload rate in bytes per second while data was flowing
+        with self.lock:
+            if self.first_request_time is None or self.last_byte_time is None:
+                return 0.0
+            elapsed = self.last_byte_time - self.first_request_time
+            return self.bytes_sent / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return ("%d request(s) (%d ranged), %d bytes sent, %.1f KiB/s, %.3fs stalled" %
+                (self.requests, self.range_requests, self.bytes_sent,
+                 self.throughput() / 1024, self.stall_time))
+
+
+class ThrottledRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.send_media(head=True)
+
+    def do_GET(self):
+        self.send_media(head=False)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def send_media(self, head):
+        server = self.server
+        stats = server.stats
+        with stats.lock:
+            stats.requests += 1
+            if stats.first_request_time is None:
+                stats.first_request_time = time.monotonic()
+
+        path = self.translate_path()
+        if path is None or not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+
+        st = os.stat(path)
+        size = st.st_size
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+
+        range_header = self.headers.get("Range")
+        if range_header and server.ranges:
+            match = RANGE_RE.match(range_header.strip())
+            if not match or not (match.group(1) or match.group(2)):
+                self.send_error(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                return
+            if match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    end = min(int(match.group(2)), size - 1)
+            else:
+                # Suffix range: the last N bytes
+                start = max(0, size - int(match.group(2)))
+            if start >= size or start > end:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", "bytes */%d" % size)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = HTTPStatus.PARTIAL_CONTENT
+            with stats.lock:
+                stats.range_requests += 1
+
+        # Time to first byte
+        server.delay()
+
+        self.send_response(status)
+        self.send_header("Content-Type", server.guess_type(path))
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Last-Modified", email.utils.formatdate(st.st_mtime, usegmt=True))
+        self.send_header("ETag", '"%x-%x"' % (int(st.st_mtime), size))
+        if server.ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start, end, size))
+        self.end_headers()
+
+        if head:
+            return
+
+        try:
+            with open(path, "rb") as f:
+                f.seek(start)
+                self.copy_throttled(f, start, end + 1)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away (seek, shutdown...), nothing to report
+            pass
+
+    def copy_throttled(self, f, offset, stop):
+        server = self.server
+        started = time.monotonic()
+        sent = 0
+        while offset < stop:
+            stall = server.take_stall(offset, min(stop, offset + CHUNK_SIZE))
+            if stall:
+                time.sleep(stall)
+                started += stall
+                with server.stats.lock:
+                    server.stats.stall_time += stall
+
+            chunk = f.read(min(CHUNK_SIZE, stop - offset))
+            if not chunk:
+                break
+            self.wfile.write(chunk)
+            offset += len(chunk)
+            sent += len(chunk)
+            with server.stats.lock:
+                server.stats.bytes_sent += len(chunk)
+                server.stats.last_byte_time = time.monotonic()
+
+            # Sleep until this connection is back under its bandwidth budget
+            if server.bandwidth:
+                ahead = sent / server.bandwidth - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def translate_path(self):
+        path = unquote(urlsplit(self.path).path)
+        parts = [p for p in path.split("/") if p and p not in (".", "..")]
+        if not parts:
+            return None
+        return os.path.join(self.server.root, *parts)
+
+
+class ThrottledMediaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    # bandwidth is per connection in bytes per second (None for unlimited),
+    # latency and jitter are in seconds and delay every response, and stalls
+    # is a list of (byte offset, seconds) pairs. Each stall fires once, the
+    # first time any response crosses its offset.
+    def __init__(self, root, host="127.0.0.1", port=0, bandwidth=None, latency=0.0,
+                 jitter=0.0, ranges=True, stalls=(), seed=None, verbose=False):
+        super().__init__((host, port), ThrottledRequestHandler)
+        self.root = os.path.abspath(root)
+        self.bandwidth = bandwidth
+        self.latency = latency
+        self.jitter = jitter
+        self.ranges = ranges
+        self.verbose = verbose
+        self.stats = ServerStats()
+        self._stalls = sorted(stalls)
+        self._stall_lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="mediaserver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def uri(self, name):
+        host, port = self.server_address[:2]
+        return "http://%s:%d/%s" % (host, port, quote(name))
+
+    def delay(self):
+        with self._stall_lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def take_stall(self, start, stop):
+        with self._stall_lock:
+            for i, (offset, seconds) in enumerate(self._stalls):
+                if start <= offset < stop:
+                    del self._stalls[i]
+                    return seconds
+        return 0.0
+
+    @staticmethod
+    def guess_type(path):
+        ext = os.path.splitext(path)[1].lower()
+        return {".webm": "video/webm", ".mkv": "video/x-matroska", ".mp4": "video/mp4",
+                ".ogg": "application/ogg", ".srt": "application/x-subrip",
+                ".vtt": "text/vtt"}.get(ext, "application/octet-stream")
+
+
+# Parse sizes such as 512, 64k or 1.5M into bytes
+def parse_size(text):
+    match = re.match(r"^\s*([\d.]+)\s*([kKmMgG]?)\s*$", text)
+    if not match:
+        raise argparse.ArgumentTypeError("invalid size: %r" % text)
+    scale = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}[match.group(2).lower()]
+    return int(float(match.group(1)) * scale)
+
+
+def parse_stall(text):
+    offset, _, seconds = text.partition(":")
+    try:
+        return parse_size(offset), float(seconds)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid stall %r, expected OFFSET:SECONDS" % text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("root", help="directory to serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--bandwidth", type=parse_size, default=None,
+                        help="per-connection bytes per second, e.g. 256k")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random +/- seconds on latency")
+    parser.add_argument("--no-ranges", dest="ranges", action="store_false",
+                        help="ignore Range headers")
+    parser.add_argument("--stall", type=parse_stall, action="append", default=[],
+                        help="pause OFFSET:SECONDS once, e.g. 1M:3 (repeatable)")
+    args = parser.parse_args()
+
+    server = ThrottledMediaServer(args.root, args.host, args.port, args.bandwidth, args.latency,
+                                  args.jitter, args.ranges, args.stall, verbose=True)
+    print("Serving %s on http://%s:%d/" % (server.root, args.host, server.server_address[1]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    print(server.stats, file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+mmap feeder benchmark: throughput of feeding a large raw PCM file into
+appsrc with read() into new buffers, with MappedFileFeeder copying slices
+of a Python mmap (its fallback), and with MappedFileFeeder wrapping the
+file zero-copy. Downstream is a fakesink that never looks at the data, or
+an audioconvert to F32LE that reads every sample. The file is written just
+before, so it is served from the page cache.
+
+    python3 mmapfeeder-benchmark.py [RAW_FILE] [--megabytes 512] [--chunk 65536]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from mmapfeeder import MappedFileFeeder, GstAllocators
+
+RATE, CHANNELS, FRAME_SIZE = 48000, 2, 4
+CAPS = "audio/x-raw,format=S16LE,layout=interleaved,rate=%d,channels=%d" % (RATE, CHANNELS)
+SINKS = {"fakesink": "fakesink sync=false",
+         "convert": "audioconvert ! audio/x-raw,format=F32LE ! fakesink sync=false"}
+
+
+# The usual feeder: read() each chunk into a new buffer
+class ReadFeeder:
+    def __init__(self, appsrc, path, chunk_size):
+        self.file = open(path, "rb")
+        self.chunk_size = chunk_size
+        self.offset = 0
+        appsrc.set_property("caps", Gst.Caps.from_string(CAPS))
+        appsrc.set_property("format", Gst.Format.TIME)
+        appsrc.connect("need-data", self._need_data)
+
+    def _need_data(self, appsrc, length):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            appsrc.emit("end-of-stream")
+            return
+        buffer = Gst.Buffer.new_wrapped(chunk)
+        buffer.pts = Gst.util_uint64_scale(self.offset, Gst.SECOND, RATE * FRAME_SIZE)
+        self.offset += len(chunk)
+        buffer.duration = Gst.util_uint64_scale(self.offset, Gst.SECOND, RATE * FRAME_SIZE) - buffer.pts
+        appsrc.emit("push-buffer", buffer)
+
+    def close(self):
+        self.file.close()
+
+
+def mapped_feeder(zero_copy):
+    def make(appsrc, path, chunk_size):
+        return MappedFileFeeder(appsrc, path, caps=Gst.Caps.from_string(CAPS), chunk_size=chunk_size,
+                                bytes_per_second=RATE * FRAME_SIZE, frame_size=FRAME_SIZE,
+                                zero_copy=zero_copy)
+    return make
+
+
+FEEDERS = {"read": ReadFeeder, "mmap-copy": mapped_feeder(False), "mmap": mapped_feeder(True)}
+
+
+# Bytes per second through appsrc ! sink
+def run(feeder_type, sink, path, chunk_size):
+    pipeline = Gst.parse_launch("appsrc name=src ! %s" % sink)
+    feeder = feeder_type(pipeline.get_by_name("src"), path, chunk_size)
+    started = time.perf_counter()
+    pipeline.set_state(Gst.State.PLAYING)
+    msg = pipeline.get_bus().timed_pop_filtered(Gst.CLOCK_TIME_NONE,
+                                                Gst.MessageType.ERROR | Gst.MessageType.EOS)
+    elapsed = time.perf_counter() - started
+    pipeline.set_state(Gst.State.NULL)
+    feeder.close()
+    if msg.type == Gst.MessageType.ERROR:
+        err, debug_info = msg.parse_error()
+        raise RuntimeError(str(err))
+    return os.path.getsize(path) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mmap appsrc feeder throughput benchmark")
+    parser.add_argument("raw_file", nargs="?", help="raw S16LE stereo file (default: generate one)")
+    parser.add_argument("--megabytes", type=int, default=512, help="size of the generated file")
+    parser.add_argument("--chunk", type=int, default=64 * 1024, help="bytes per buffer")
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    if GstAllocators is None:
+        print("GstAllocators is not available, \"mmap\" copies like \"mmap-copy\"")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.raw_file
+        if not path:
+            path = os.path.join(tmp, "test.raw")
+            block = os.urandom(1024 * 1024)
+            with open(path, "wb") as f:
+                for i in range(args.megabytes):
+                    f.write(block)
+
+        print("%-10s %12s %12s" % ("feeder", *SINKS))
+        for name, feeder_type in FEEDERS.items():
+            rates = [run(feeder_type, sink, path, args.chunk) for sink in SINKS.values()]
+            print("%-10s %s" % (name, " ".join("%7.0f MB/s" % (rate / 1e6) for rate in rates)))
+
+
+if __name__ == '__main__':
+    main()
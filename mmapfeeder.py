@@ -0,0 +1,138 @@
+"""
+Memory-mapped file feeder for appsrc
+
+MappedFileFeeder answers appsrc's need-data with slices of a file without
+copying them. The whole file is wrapped once in a GstFdMemory (from the
+GstAllocators library), which mmaps it the first time it is mapped and
+keeps the mapping; each buffer holds a shared sub-memory of it
+(gst_memory_share()), so the mapping lives until downstream has freed
+the last buffer, and is then unmapped and the file closed by GStreamer.
+Shared memory is read-only: an element that wants to write into a buffer
+gets a copy, the file is never modified.
+
+Reading a Python mmap and wrapping the slices would copy each one again
+(PyGObject copies arrays passed to Gst.Buffer.new_wrapped_full(), it
+cannot hand the mapping over), so that is only the fallback when
+GstAllocators is not available.
+
+Files are fed in bytes (format BYTES, seekable or random-access as
+decoders and parsers pull them) or, given bytes_per_second, in time, as
+raw audio or video with the buffers timestamped from their offsets:
+
+    caps = Gst.Caps.from_string("audio/x-raw,format=S16LE,channels=1,rate=44100,layout=interleaved")
+    feeder = MappedFileFeeder(appsrc, "speech.raw", caps=caps, bytes_per_second=88200, frame_size=2)
+"""
+
+import mmap
+import os
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+try:
+    gi.require_version('GstAllocators', '1.0')
+    from gi.repository import GstAllocators
+except (ValueError, ImportError):
+    GstAllocators = None
+
+STREAM_SEEKABLE = 1       # GST_APP_STREAM_TYPE_SEEKABLE
+STREAM_RANDOM_ACCESS = 2  # GST_APP_STREAM_TYPE_RANDOM_ACCESS
+
+
+class MappedFile:
+    # Slices of the file as buffers; zero-copy with GstAllocators
+    def __init__(self, path, zero_copy=True):
+        self.size = os.path.getsize(path)
+        self.zero_copy = zero_copy and GstAllocators is not None and self.size > 0
+        self._memory = None
+        self._map = None
+        if self.zero_copy:
+            fd = os.open(path, os.O_RDONLY)
+            # The memory owns fd from now on and closes it when the last buffer is freed
+            self._memory = GstAllocators.FdAllocator.alloc(GstAllocators.FdAllocator.new(), fd, self.size,
+                                                           GstAllocators.FdMemoryFlags.KEEP_MAPPED)
+        elif self.size > 0:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def buffer(self, offset, size):
+        size = min(size, self.size - offset)
+        if self.zero_copy:
+            buffer = Gst.Buffer.new()
+            buffer.append_memory(self._memory.share(offset, size))
+        else:
+            buffer = Gst.Buffer.new_wrapped(self._map[offset:offset + size])
+        buffer.offset = offset
+        buffer.offset_end = offset + size
+        return buffer
+
+    # Buffers already handed out keep the file mapped until they are freed
+    def close(self):
+        self._memory = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+
+class MappedFileFeeder:
+    # With bytes_per_second the stream is fed in TIME format, otherwise in
+    # BYTES. frame_size keeps buffers and seek positions on frame boundaries.
+    def __init__(self, appsrc, path, caps=None, chunk_size=64 * 1024, bytes_per_second=None,
+                 frame_size=1, random_access=False, zero_copy=True):
+        if random_access and bytes_per_second:
+            raise ValueError("random access is only possible in bytes")
+        self.appsrc = appsrc
+        self.file = MappedFile(path, zero_copy)
+        self.chunk_size = max(chunk_size - chunk_size % frame_size, frame_size)
+        self.bytes_per_second = bytes_per_second
+        self.frame_size = frame_size
+        self.random_access = random_access
+        self.buffers = 0
+        self.bytes = 0
+        self._offset = 0
+        if caps is not None:
+            appsrc.set_property("caps", caps)
+        if bytes_per_second:
+            appsrc.set_property("format", Gst.Format.TIME)
+        else:
+            appsrc.set_property("format", Gst.Format.BYTES)
+            appsrc.set_property("size", self.file.size)
+        appsrc.set_property("stream-type", STREAM_RANDOM_ACCESS if random_access else STREAM_SEEKABLE)
+        appsrc.connect("need-data", self._need_data)
+        appsrc.connect("seek-data", self._seek_data)
+
+    def time_at(self, offset):
+        return Gst.util_uint64_scale(offset, Gst.SECOND, self.bytes_per_second)
+
+    def offset_at(self, position):
+        offset = Gst.util_uint64_scale(position, self.bytes_per_second, Gst.SECOND)
+        return offset - offset % self.frame_size
+
+    # position is in bytes, or in nanoseconds when feeding in time
+    def _seek_data(self, appsrc, position):
+        offset = self.offset_at(position) if self.bytes_per_second else position
+        if offset > self.file.size:
+            return False
+        self._offset = offset
+        return True
+
+    def _need_data(self, appsrc, length):
+        if self._offset >= self.file.size:
+            appsrc.emit("end-of-stream")
+            return
+        # In random-access mode length is what the downstream element asked for;
+        # in push mode it is only appsrc's blocksize
+        size = length if self.random_access and length > 0 else self.chunk_size
+        buffer = self.file.buffer(self._offset, size)
+        if self.bytes_per_second:
+            buffer.pts = self.time_at(buffer.offset)
+            buffer.duration = self.time_at(buffer.offset_end) - buffer.pts
+        self._offset = buffer.offset_end
+        self.buffers += 1
+        self.bytes += buffer.offset_end - buffer.offset
+        appsrc.emit("push-buffer", buffer)
+
+    def close(self):
+        self.file.close()
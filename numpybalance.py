@@ -0,0 +1,157 @@
+"""
+Vectorized software color balance
+
+Applies brightness, contrast, hue and saturation to raw frames pulled from an
+appsink, with NumPy instead of a per-pixel element. The parameters mean the
+same as videobalance's, and so do the tables:
+
+  - Y goes through a 256-entry lookup table,
+  - U and V each go through a 256x256 table indexed by the (U, V) pair,
+    which folds hue rotation and saturation into one gather per plane,
+  - packed RGB is balanced by one 3x3 matrix and offset (RGB -> YCbCr,
+    the balance, YCbCr -> RGB), applied to all pixels in one product.
+
+The tables are only rebuilt when a parameter changes.
+
+    balance = SoftwareColorBalance(contrast=1.2, saturation=1.5)
+    frame = balance.process_sample(appsink.emit("pull-sample"))
+"""
+
+import math
+
+import numpy as np
+
+import gi
+
+gi.require_version('Gst', '1.0')
+gi.require_version('GstVideo', '1.0')
+from gi.repository import Gst, GstVideo
+
+VF = GstVideo.VideoFormat
+
+# Packed RGB formats: bytes per pixel and the positions of R, G and B
+RGB_LAYOUTS = {
+    VF.RGB: (3, [0, 1, 2]), VF.BGR: (3, [2, 1, 0]),
+    VF.RGBX: (4, [0, 1, 2]), VF.RGBA: (4, [0, 1, 2]),
+    VF.BGRX: (4, [2, 1, 0]), VF.BGRA: (4, [2, 1, 0]),
+    VF.XRGB: (4, [1, 2, 3]), VF.ARGB: (4, [1, 2, 3]),
+    VF.XBGR: (4, [3, 2, 1]), VF.ABGR: (4, [3, 2, 1]),
+}
+YUV_FORMATS = (VF.I420, VF.YV12, VF.NV12, VF.NV21)
+FORMATS = YUV_FORMATS + tuple(RGB_LAYOUTS)
+
+# BT.601 studio range, on Y - 16, U - 128 and V - 128
+RGB_TO_YUV = np.array([[0.257, 0.504, 0.098],
+                       [-0.148, -0.291, 0.439],
+                       [0.439, -0.368, -0.071]])
+YUV_TO_RGB = np.array([[1.164, 0.0, 1.596],
+                       [1.164, -0.392, -0.813],
+                       [1.164, 2.017, 0.0]])
+
+
+class SoftwareColorBalance:
+    def __init__(self, brightness=0.0, contrast=1.0, hue=0.0, saturation=1.0):
+        self._info = None
+        self._caps = None
+        self._out = None
+        self.set(brightness, contrast, hue, saturation)
+
+    def set(self, brightness=None, contrast=None, hue=None, saturation=None):
+        if brightness is not None:
+            self.brightness = brightness
+        if contrast is not None:
+            self.contrast = contrast
+        if hue is not None:
+            self.hue = hue
+        if saturation is not None:
+            self.saturation = saturation
+        self._update_tables()
+
+    def _update_tables(self):
+        i = np.arange(256, dtype=np.float64)
+        self.table_y = np.clip(np.rint(16 + (i - 16) * self.contrast + self.brightness * 255),
+                               0, 255).astype(np.uint8)
+
+        cos, sin = math.cos(math.pi * self.hue), math.sin(math.pi * self.hue)
+        u, v = np.meshgrid(i - 128, i - 128, indexing="ij")
+        table_u = 128 + (u * cos + v * sin) * self.saturation
+        table_v = 128 + (-u * sin + v * cos) * self.saturation
+        # Flattened, so the (U, V) pair indexes them as U * 256 + V
+        self.table_u = np.clip(np.rint(table_u), 0, 255).astype(np.uint8).ravel()
+        self.table_v = np.clip(np.rint(table_v), 0, 255).astype(np.uint8).ravel()
+
+        balance = np.array([[self.contrast, 0.0, 0.0],
+                            [0.0, self.saturation * cos, self.saturation * sin],
+                            [0.0, -self.saturation * sin, self.saturation * cos]])
+        self.matrix = (YUV_TO_RGB @ balance @ RGB_TO_YUV).T.astype(np.float32)
+        # + 0.5 so that truncating to uint8 rounds
+        self.offset = (YUV_TO_RGB @ np.array([self.brightness * 255, 0.0, 0.0]) + 0.5).astype(np.float32)
+
+    # Balance the frame in a sample. Returns a uint8 array with the same
+    # layout as the sample's buffer; it is reused by the next call.
+    def process_sample(self, sample):
+        caps = sample.get_caps()
+        if self._info is None or not caps.is_equal(self._caps):
+            self._caps = caps
+            self._info = GstVideo.VideoInfo.new_from_caps(caps)
+            if self._info.finfo.format not in FORMATS:
+                raise ValueError("unsupported format %s" % self._info.finfo.name)
+        buffer = sample.get_buffer()
+        ok, mapinfo = buffer.map(Gst.MapFlags.READ)
+        if not ok:
+            raise RuntimeError("could not map buffer")
+        try:
+            data = np.frombuffer(mapinfo.data, dtype=np.uint8)
+            if self._out is None or self._out.size != data.size:
+                self._out = np.empty_like(data)
+            self.apply(data, self._out, self._info)
+        finally:
+            buffer.unmap(mapinfo)
+        return self._out
+
+    def apply(self, data, out, info):
+        fmt = info.finfo.format
+        if fmt in RGB_LAYOUTS:
+            self._apply_rgb(data, out, info)
+            return
+        np.copyto(out, data)
+        y_in, y_out = plane(data, info, 0), plane(out, info, 0)
+        y_out[...] = self.table_y[y_in]
+        if fmt in (VF.I420, VF.YV12):
+            u, v = (1, 2) if fmt == VF.I420 else (2, 1)
+            self._apply_uv(plane(data, info, u), plane(data, info, v),
+                           plane(out, info, u), plane(out, info, v))
+        else:
+            uv_in, uv_out = plane(data, info, 1, 2), plane(out, info, 1, 2)
+            u, v = (0, 1) if fmt == VF.NV12 else (1, 0)
+            self._apply_uv(uv_in[..., u], uv_in[..., v], uv_out[..., u], uv_out[..., v])
+
+    def _apply_uv(self, u_in, v_in, u_out, v_out):
+        index = (u_in.astype(np.intp) << 8) | v_in
+        u_out[...] = self.table_u[index]
+        v_out[...] = self.table_v[index]
+
+    def _apply_rgb(self, data, out, info):
+        size, channels = RGB_LAYOUTS[info.finfo.format]
+        pixels_in, pixels_out = plane(data, info, 0, size), plane(out, info, 0, size)
+        if size == 4:
+            # Keep alpha / padding
+            np.copyto(pixels_out, pixels_in)
+        rgb = pixels_in[..., channels].astype(np.float32)
+        result = rgb @ self.matrix
+        result += self.offset
+        np.clip(result, 0, 255, out=result)
+        pixels_out[..., channels] = result.astype(np.uint8)
+
+
+# A view on plane index of a frame, shaped (height, width) or
+# (height, width, components) for interleaved planes
+def plane(data, info, index, components=1):
+    height, width = info.height, info.width
+    if index > 0 and info.finfo.format in YUV_FORMATS:
+        # 4:2:0 chroma
+        height, width = (height + 1) // 2, (width + 1) // 2
+    stride = info.stride[index]
+    rows = data[info.offset[index]:info.offset[index] + stride * height].reshape(height, stride)
+    view = rows[:, :width * components]
+    return view.reshape(height, width, components) if components > 1 else view
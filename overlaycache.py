@@ -0,0 +1,147 @@
+"""
+Pre-rendered subtitle overlays
+
+textoverlay lays the subtitle text out with Pango again every time a cue is
+shown. SubtitleOverlayCache renders each distinct cue once into an ARGB
+overlay composition, keyed by text, font and video resolution, and hands the
+cached composition to an overlaycomposition element for every frame the cue
+is on screen, including when it is shown again after a seek.
+
+Every render is timed, so each time a cue is shown from the cache the stats
+count the layout time that was not spent, and report it per hour of video.
+
+    cache = SubtitleOverlayCache(SubtitleStore.open("movie.srt"), "Sans, 18")
+    playbin.set_property("video-filter", cache.make_element())
+"""
+
+import sys
+import time
+from collections import OrderedDict
+
+import cairo
+import gi
+
+gi.require_version('Gst', '1.0')
+gi.require_version('GstVideo', '1.0')
+gi.require_version('Pango', '1.0')
+gi.require_version('PangoCairo', '1.0')
+from gi.repository import Gst, GstVideo, Pango, PangoCairo
+
+# cairo's ARGB32 is native-endian, premultiplied ARGB
+OVERLAY_FORMAT = GstVideo.VideoFormat.BGRA if sys.byteorder == "little" else GstVideo.VideoFormat.ARGB
+REFERENCE_HEIGHT = 480  # Font sizes are given for this height and scaled with the video
+OUTLINE = 2
+
+
+class OverlayStats:
+    def __init__(self):
+        self.renders = 0
+        self.hits = 0
+        self.render_time = 0.0
+        self.saved_time = 0.0
+        self.video_time = 0  # Nanoseconds of video the overlays were drawn on
+
+    def saved_per_hour(self):
+        hours = self.video_time / (3600 * Gst.SECOND)
+        return self.saved_time / hours if hours > 0 else 0.0
+
+    def __str__(self):
+        return ("%d cue render(s) in %.1fms, %d shown from cache, %.1fms layout saved "
+                "(%.1fms per hour of video)" %
+                (self.renders, 1000 * self.render_time, self.hits, 1000 * self.saved_time,
+                 1000 * self.saved_per_hour()))
+
+
+class SubtitleOverlayCache:
+    def __init__(self, index, font_desc="Sans, 18", max_entries=256):
+        self.index = index
+        self.font_desc = font_desc
+        self.max_entries = max_entries
+        self.stats = OverlayStats()
+        self.width = 0
+        self.height = 0
+        self._entries = OrderedDict()  # key -> (composition, render time)
+        self._shown_key = None
+        self._shown = None
+
+    # An overlaycomposition element drawing the active cues on each frame
+    def make_element(self, name="subtitle-overlay"):
+        overlay = Gst.ElementFactory.make("overlaycomposition", name)
+        if overlay is None:
+            return None
+        overlay.connect("caps-changed", self._caps_changed)
+        overlay.connect("draw", self._draw)
+        return overlay
+
+    def _caps_changed(self, overlay, caps, window_width, window_height):
+        info = GstVideo.VideoInfo.new_from_caps(caps)
+        self.width, self.height = info.width, info.height
+
+    def _draw(self, overlay, sample):
+        buffer = sample.get_buffer()
+        if buffer.duration != Gst.CLOCK_TIME_NONE:
+            self.stats.video_time += buffer.duration
+        position = sample.get_segment().to_stream_time(Gst.Format.TIME, buffer.pts)
+        return self.composition_at(position)
+
+    def composition_at(self, position):
+        cues = self.index.active_indices(position)
+        if not cues or not self.width:
+            self._shown_key = self._shown = None
+            return None
+        key = ("\n".join(self.index.text(i) for i in cues), self.font_desc, self.width, self.height)
+        if key == self._shown_key:
+            # Still the same cue(s) as the last frame
+            return self._shown
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            self.stats.saved_time += entry[1]
+        else:
+            started = time.perf_counter()
+            composition = self.render(*key)
+            elapsed = time.perf_counter() - started
+            entry = (composition, elapsed)
+            self.stats.renders += 1
+            self.stats.render_time += elapsed
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        self._shown_key, self._shown = key, entry[0]
+        return self._shown
+
+    # Lay out the Pango markup and draw it, outlined, centered at the bottom
+    @staticmethod
+    def render(markup, font_desc, width, height):
+        description = Pango.FontDescription.from_string(font_desc)
+        description.set_size(description.get_size() * height // REFERENCE_HEIGHT)
+
+        layout = PangoCairo.create_layout(cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1)))
+        layout.set_font_description(description)
+        layout.set_width(int(width * 0.9) * Pango.SCALE)
+        layout.set_wrap(Pango.WrapMode.WORD_CHAR)
+        layout.set_alignment(Pango.Alignment.CENTER)
+        layout.set_markup(markup, -1)
+        ink, logical = layout.get_pixel_extents()
+
+        w = logical.width + 2 * OUTLINE
+        h = logical.height + 2 * OUTLINE
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, w, h)
+        context = cairo.Context(surface)
+        context.move_to(OUTLINE - logical.x, OUTLINE - logical.y)
+        PangoCairo.layout_path(context, layout)
+        context.set_source_rgba(0, 0, 0, 1)
+        context.set_line_width(2 * OUTLINE)
+        context.stroke_preserve()
+        context.set_source_rgba(1, 1, 1, 1)
+        context.fill()
+        surface.flush()
+
+        buffer = Gst.Buffer.new_wrapped(bytes(surface.get_data()))
+        GstVideo.buffer_add_video_meta(buffer, GstVideo.VideoFrameFlags.NONE, OVERLAY_FORMAT, w, h)
+        rectangle = GstVideo.VideoOverlayRectangle.new_raw(
+            buffer, (width - w) // 2, max(0, height - h - height // 20), w, h,
+            GstVideo.VideoOverlayFormatFlags.PREMULTIPLIED_ALPHA)
+        return GstVideo.VideoOverlayComposition.new(rectangle)
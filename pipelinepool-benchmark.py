@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Pipeline pool benchmark: latency from a play request to the first rendered
+video buffer for a playbin built from scratch (as the tutorials do), taken
+from a PipelinePool in READY, and prerolled in PAUSED by prepare() ahead of
+the request. The pool is refilled and the next preroll started between
+requests, outside the measured time, as a server would do while idle.
+
+    python3 pipelinepool-benchmark.py [MEDIA_FILE] [--requests N]
+
+Without MEDIA_FILE a short clip is generated.
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from pipelinepool import PipelinePool
+from testmedia import make_test_media
+
+
+class FirstBuffer:
+    def __init__(self):
+        self.event = threading.Event()
+
+    def on_handoff(self, sink, buffer, pad):
+        self.event.set()
+
+
+# playbin with fake sinks; handoff is only emitted for rendered buffers, not for the preroll
+def build_playbin(waiters):
+    playbin = Gst.ElementFactory.make("playbin", None)
+    video_sink = Gst.ElementFactory.make("fakesink", None)
+    video_sink.set_property("sync", True)
+    video_sink.set_property("signal-handoffs", True)
+    waiter = FirstBuffer()
+    video_sink.connect("handoff", waiter.on_handoff)
+    waiters[playbin.get_name()] = waiter
+    playbin.set_property("video-sink", video_sink)
+    playbin.set_property("audio-sink", Gst.ElementFactory.make("fakesink", None))
+    return playbin
+
+
+# Seconds from the request (get_pipeline) to the first rendered buffer
+def request(get_pipeline, waiters):
+    started = time.perf_counter()
+    pipeline = get_pipeline()
+    waiter = waiters[pipeline.get_name()]
+    waiter.event.clear()
+    if pipeline.set_state(Gst.State.PLAYING) == Gst.StateChangeReturn.FAILURE:
+        raise RuntimeError("unable to start playing")
+    if not waiter.event.wait(10):
+        raise RuntimeError("no buffer rendered")
+    return time.perf_counter() - started, pipeline
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    return "%7.1fms median %7.1fms worst" % (1000 * latencies[len(latencies) // 2], 1000 * latencies[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline pool start latency benchmark")
+    parser.add_argument("media", nargs="?", help="media file to play (default: generate one)")
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    waiters = {}
+    context = GLib.MainContext.default()
+
+    def idle():
+        while context.iteration(False):
+            pass
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = args.media
+        if not media:
+            media = os.path.join(tmp, "test.webm")
+            print("Generating test media %s" % media)
+            make_test_media(media, seconds=5)
+        uri = Gst.filename_to_uri(os.path.abspath(media))
+
+        def cold_pipeline():
+            playbin = build_playbin(waiters)
+            playbin.set_property("uri", uri)
+            return playbin
+
+        cold = []
+        for i in range(args.requests):
+            elapsed, pipeline = request(cold_pipeline, waiters)
+            pipeline.set_state(Gst.State.NULL)
+            del waiters[pipeline.get_name()]
+            cold.append(elapsed)
+
+        pool = PipelinePool(lambda: build_playbin(waiters), size=2)
+        ready = []
+        for i in range(args.requests):
+            elapsed, pipeline = request(lambda: pool.acquire(uri), waiters)
+            pool.release(pipeline)
+            idle()
+            ready.append(elapsed)
+
+        prerolled = []
+        prepared = pool.prepare(uri)
+        for i in range(args.requests):
+            # Wait for the preroll to finish, as a pipeline prepared well before the request would have
+            prepared.get_state(10 * Gst.SECOND)
+            elapsed, pipeline = request(lambda: pool.acquire(uri), waiters)
+            pool.release(pipeline)
+            idle()
+            prepared = pool.prepare(uri)
+            prerolled.append(elapsed)
+        pool.close()
+
+        print("cold:      %s" % summary(cold))
+        print("READY:     %s" % summary(ready))
+        print("prerolled: %s  (%s)" % (summary(prerolled), pool.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Pool of warm pipelines
+
+For playbin (and uridecodebin) nearly all of the start-up cost is in
+READY -> PAUSED: that is where the source element is made, the stream
+typefound, decoders and sinks plugged, the sinks opened and the first
+buffers prerolled. A pipeline in READY has little more than playbin itself
+made and its plugin loaded. A PipelinePool keeps pipelines of one topology
+in READY, which only saves building them, and can preroll pipelines in
+PAUSED ahead of time with prepare(). That is what makes PLAYING start at
+once, so use it for the sources that are known to be requested often.
+
+A pipeline is pointed at its source by configure(pipeline, source), by
+default setting playbin's "uri". On release it is reset to READY, which
+flushes its data and running time, and the messages left on its bus are
+dropped before it is handed out again. Bus watches and signal handlers
+added by the user must be removed before release.
+
+    pool = PipelinePool(lambda: Gst.ElementFactory.make("playbin", None), size=4)
+    pool.prepare(intro_uri)                 # prerolled in PAUSED
+    pipeline = pool.acquire(uri)
+    pipeline.set_state(Gst.State.PLAYING)
+    ...
+    pool.release(pipeline)
+"""
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from sinkbins import PoolStats
+
+
+def set_uri(pipeline, uri):
+    pipeline.set_property("uri", uri)
+
+
+class PipelinePoolStats(PoolStats):
+    def __init__(self):
+        super().__init__()
+        self.prerolled = 0
+
+    def __str__(self):
+        return "%d prerolled, %s" % (self.prerolled, super().__str__())
+
+
+class PipelinePool:
+    # build() returns a new pipeline; configure(pipeline, source) points it
+    # at a source while it is in READY
+    def __init__(self, build, size=2, configure=set_uri):
+        self.build = build
+        self.size = size
+        self.configure = configure
+        self.stats = PipelinePoolStats()
+        self._ready = []
+        self._prerolled = {}  # source -> [pipeline in PAUSED]
+        self._refill_id = None
+        self.fill()
+
+    def _warm(self, pipeline):
+        if pipeline.set_state(Gst.State.READY) == Gst.StateChangeReturn.FAILURE:
+            pipeline.set_state(Gst.State.NULL)
+            return False
+        # Drop whatever the previous user left on the bus
+        bus = pipeline.get_bus()
+        bus.set_flushing(True)
+        bus.set_flushing(False)
+        self._ready.append(pipeline)
+        return True
+
+    # Build pipelines until size of them wait in READY
+    def fill(self):
+        while len(self._ready) < self.size:
+            if not self._warm(self.build()):
+                break
+
+    def _refill(self):
+        # One pipeline per idle callback, so the main loop is never held up for long
+        if len(self._ready) < self.size and self._warm(self.build()):
+            return len(self._ready) < self.size
+        self._refill_id = None
+        return False
+
+    def _take(self, source):
+        if self._ready:
+            pipeline = self._ready.pop()
+            self.stats.warm += 1
+        else:
+            pipeline = self.build()
+            self.stats.cold += 1
+        if self._refill_id is None:
+            self._refill_id = GLib.idle_add(self._refill)
+        self.configure(pipeline, source)
+        return pipeline
+
+    # Start prerolling a pipeline for source, which acquire(source) will
+    # hand out. Prerolling goes on in the pipeline's streaming threads.
+    # Returns the pipeline, or None if it failed to start.
+    def prepare(self, source):
+        pipeline = self._take(source)
+        if pipeline.set_state(Gst.State.PAUSED) == Gst.StateChangeReturn.FAILURE:
+            self.release(pipeline)
+            return None
+        self._prerolled.setdefault(source, []).append(pipeline)
+        return pipeline
+
+    # A pipeline for source in PAUSED if one was prepared, otherwise in READY
+    def acquire(self, source):
+        prerolled = self._prerolled.get(source)
+        if prerolled:
+            pipeline = prerolled.pop()
+            if not prerolled:
+                del self._prerolled[source]
+            self.stats.prerolled += 1
+            return pipeline
+        return self._take(source)
+
+    # Reset a pipeline and keep it if the pool has room, otherwise shut it down
+    def release(self, pipeline):
+        if len(self._ready) < self.size and self._warm(pipeline):
+            self.stats.reused += 1
+        else:
+            pipeline.set_state(Gst.State.NULL)
+
+    def close(self):
+        if self._refill_id is not None:
+            GLib.source_remove(self._refill_id)
+            self._refill_id = None
+        for pipeline in self._ready:
+            pipeline.set_state(Gst.State.NULL)
+        for pipelines in self._prerolled.values():
+            for pipeline in pipelines:
+                pipeline.set_state(Gst.State.NULL)
+        self._ready = []
+        self._prerolled = {}
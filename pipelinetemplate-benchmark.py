@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Pipeline template benchmark: pipelines constructed per second by
+Gst.parse_launch() with the values formatted into the description, and by
+PipelineTemplate.instantiate() from a template compiled once. Pipelines
+are only built, not started.
+
+    python3 pipelinetemplate-benchmark.py [--seconds N]
+"""
+
+import argparse
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from pipelinetemplate import PipelineTemplate
+
+DESCRIPTIONS = {
+    "playbin": ("playbin uri={uri}",
+                {"uri": "file:///tmp/clip.webm"}),
+    "chain": ("videotestsrc num-buffers={buffers} pattern=ball ! "
+              "video/x-raw,width=320,height=240,framerate=30/1 ! videoconvert ! "
+              "videoscale ! fakesink sync=true",
+              {"buffers": 90}),
+    "decode": ("filesrc location={location} ! decodebin name=dec dec. ! queue ! audioconvert ! "
+               "audioresample ! fakesink dec. ! queue ! videoconvert ! fakesink",
+               {"location": "/tmp/clip.webm"}),
+    "tee": ("audiotestsrc wave=ticks ! tee name=t t. ! queue ! audioconvert ! fakesink "
+            "t. ! queue ! wavescope ! videoconvert ! fakesink t. ! queue ! fakesink",
+            {}),
+}
+
+
+# Pipelines built per second by build() over the given time
+def rate(build, seconds):
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        build()
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline construction rate benchmark")
+    parser.add_argument("--seconds", type=float, default=2.0, help="time per measurement")
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    print("%-8s %14s %14s %8s" % ("pipeline", "parse_launch", "template", "speedup"))
+    for name, (description, params) in DESCRIPTIONS.items():
+        launch = rate(lambda: Gst.parse_launch(description.format(**params)), args.seconds)
+        template = PipelineTemplate(description)
+        instantiated = rate(lambda: template.instantiate(**params), args.seconds)
+        print("%-8s %12.0f/s %12.0f/s %7.2fx" % (name, launch, instantiated, instantiated / launch))
+
+
+if __name__ == '__main__':
+    main()
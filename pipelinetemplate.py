@@ -0,0 +1,253 @@
+"""
+Pipeline descriptions compiled once, instantiated cheaply
+
+Gst.parse_launch() tokenizes and parses its description, looks up every
+factory in the registry and converts every property value from its string
+form again for each pipeline it builds. A PipelineTemplate does all of
+that once: it parses a gst-launch style description, resolves the element
+factories, converts literal property values to their types and records
+the link plan. instantiate() then only creates, configures, adds and
+links.
+
+Property values may contain {placeholders}, filled in by keyword
+arguments to instantiate():
+
+    template = PipelineTemplate("uridecodebin uri={uri} ! audioconvert ! autoaudiosink")
+    pipeline = template.instantiate(uri=uri)
+
+Only braces around a Python identifier are placeholders; anything else in
+braces, such as the caps list in "video/x-raw,format={I420,NV12}", is
+left as it is. A one-value caps list that is also an identifier ({I420})
+would be taken for a placeholder, so write it without the braces.
+
+The supported syntax is the part of gst-launch the tutorials use:
+elements with properties, "!" links (with or without spaces around them),
+caps filters (spaces after their commas are allowed, as in "video/x-raw,
+format=I420"), quoted values, and named references such as "t. ! queue"
+or "! mux.sink_%u". Bins in parentheses are not supported. As with
+parse_launch(), a description of one element gives that element instead
+of a pipeline. Links from sometimes pads (decodebin and the like) are
+made when the pad appears.
+"""
+
+import re
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GObject
+
+PROPERTY_RE = re.compile(r"^([A-Za-z_][\w-]*)=(.*)$", re.DOTALL)
+REFERENCE_RE = re.compile(r"^([\w-]+)\.([\w%-]*)$")
+PLACEHOLDER_RE = re.compile(r"\{([A-Za-z_]\w*)\}")
+
+
+# Split a description into elements, properties, caps and "!" the way
+# gst-launch does: "!" needs no spaces around it, quotes and backslashes
+# work as in a shell, and a caps token goes on across spaces next to its
+# commas and inside {} [] () lists
+def tokenize(description):
+    tokens = []
+    token, quoted = "", False  # quoted: token has quotes, so "" is a token
+    quote, depth = None, 0
+    i = 0
+    while i < len(description):
+        char = description[i]
+        i += 1
+        if quote:
+            if char == quote:
+                quote = None
+            elif char == "\\" and quote == '"' and i < len(description):
+                token += description[i]
+                i += 1
+            else:
+                token += char
+        elif char in "\"'":
+            quote, quoted = char, True
+        elif char == "\\":
+            if i == len(description):
+                raise ValueError("description ends with a backslash")
+            token += description[i]
+            i += 1
+        elif char in "{[(":
+            depth += 1
+            token += char
+        elif char in "}])" and depth:
+            depth -= 1
+            token += char
+        elif char == "!" and not depth:
+            if token or quoted:
+                tokens.append(token)
+            tokens.append("!")
+            token, quoted = "", False
+        elif char.isspace():
+            rest = description[i:].lstrip()
+            if depth or is_caps(token) and (token.endswith(",") or rest.startswith(",")):
+                token += char
+            elif token or quoted:
+                tokens.append(token)
+                token, quoted = "", False
+        else:
+            token += char
+    if quote:
+        raise ValueError("unterminated %s quote" % quote)
+    if depth:
+        raise ValueError("unbalanced brackets in '%s'" % token)
+    if token or quoted:
+        tokens.append(token)
+    return tokens
+
+
+def is_caps(token):
+    return "/" in token.split(",")[0] and not PROPERTY_RE.match(token)
+
+
+def placeholders(value):
+    return set(PLACEHOLDER_RE.findall(value))
+
+
+def fill(value, params):
+    return PLACEHOLDER_RE.sub(lambda match: str(params[match.group(1)]), value)
+
+
+# True if a link from pad_name (None for any) of factory can only be made
+# once a sometimes pad has been added
+def delayed_link(factory, pad_name):
+    templates = [template for template in factory.get_static_pad_templates()
+                 if template.direction == Gst.PadDirection.SRC]
+    if pad_name is not None:
+        templates = [template for template in templates
+                     if template.name_template == pad_name or
+                     ("%" in template.name_template and
+                      pad_name.startswith(template.name_template.split("%")[0]))]
+    presences = {template.presence for template in templates}
+    return Gst.PadPresence.SOMETIMES in presences and Gst.PadPresence.ALWAYS not in presences \
+        and Gst.PadPresence.REQUEST not in presences
+
+
+def pad_added(src, pad, link):
+    dst, src_pad_name, dst_pad_name, handler_id = link
+    if src_pad_name is not None and pad.get_name() != src_pad_name:
+        return
+    if src.link_pads(pad.get_name(), dst, dst_pad_name):
+        src.disconnect(handler_id[0])
+
+
+class PipelineTemplate:
+    # Raises ValueError if the description cannot be parsed or names
+    # factories or properties that do not exist
+    def __init__(self, description):
+        self.description = description
+        self.placeholders = set()
+        self._elements = []  # (factory, name, [(property, value)], [(property, template)])
+        self._links = []     # (src index, src pad, dst index, dst pad, delayed)
+        elements, links = self._parse(tokenize(description))
+        names = {name: i for i, (factory_name, name, properties) in enumerate(elements) if name}
+        prototypes = {}
+        for factory_name, name, properties in elements:
+            factory = Gst.ElementFactory.find(factory_name)
+            if factory is None:
+                raise ValueError("no element factory '%s'" % factory_name)
+            if factory_name not in prototypes:
+                prototypes[factory_name] = factory.create(None)
+            self._elements.append((factory,) + self._convert(prototypes[factory_name], name, properties))
+        for (src, src_pad), (dst, dst_pad) in links:
+            src, dst = self._resolve(src, names), self._resolve(dst, names)
+            delayed = delayed_link(self._elements[src][0], src_pad)
+            self._links.append((src, src_pad, dst, dst_pad, delayed))
+
+    # Tokens to [(factory name, element name, {property: string})] and
+    # [((src, pad), (dst, pad))], where src and dst are indices or names
+    @staticmethod
+    def _parse(tokens):
+        elements, links = [], []
+        current = None  # (element index or name, pad name) of the last item
+        source = None   # set after "!": the item to link from
+        for token in tokens:
+            if token == "!":
+                if current is None or source is not None:
+                    raise ValueError("'!' without an element before it")
+                source = current
+                continue
+            match = PROPERTY_RE.match(token)
+            if match:
+                if current is None or not isinstance(current[0], int) or source is not None:
+                    raise ValueError("property '%s' without an element" % token)
+                prop, value = match.groups()
+                if prop == "name":
+                    elements[current[0]][1] = value
+                else:
+                    elements[current[0]][2][prop] = value
+                continue
+            match = REFERENCE_RE.match(token)
+            if match:
+                item = (match.group(1), match.group(2) or None)
+            elif token.startswith("("):
+                raise ValueError("bins are not supported")
+            elif is_caps(token):
+                elements.append(["capsfilter", None, {"caps": token}])
+                item = (len(elements) - 1, None)
+            else:
+                elements.append([token, None, {}])
+                item = (len(elements) - 1, None)
+            if source is not None:
+                links.append((source, item))
+                source = None
+            current = item
+        if source is not None:
+            raise ValueError("'!' without an element after it")
+        if not elements:
+            raise ValueError("empty description")
+        return elements, links
+
+    @staticmethod
+    def _resolve(ref, names):
+        if isinstance(ref, int):
+            return ref
+        if ref not in names:
+            raise ValueError("no element named '%s'" % ref)
+        return names[ref]
+
+    # Convert literal values through a prototype element, as parse_launch would
+    def _convert(self, prototype, name, properties):
+        literals, deferred = [], []
+        for prop, value in properties.items():
+            pspec = prototype.find_property(prop)
+            if pspec is None:
+                raise ValueError("%s has no property '%s'" % (prototype.get_factory().get_name(), prop))
+            fields = placeholders(value)
+            if fields or not pspec.flags & GObject.ParamFlags.READABLE:
+                self.placeholders |= fields
+                deferred.append((prop, value))
+            else:
+                Gst.util_set_object_arg(prototype, prop, value)
+                literals.append((prop, prototype.get_property(prop)))
+        return name, literals, deferred
+
+    def instantiate(self, name=None, **params):
+        missing = self.placeholders - params.keys()
+        if missing:
+            raise ValueError("no value for %s" % ", ".join(sorted(missing)))
+        elements = []
+        for factory, element_name, literals, deferred in self._elements:
+            element = factory.create(element_name)
+            for prop, value in literals:
+                element.set_property(prop, value)
+            for prop, value in deferred:
+                Gst.util_set_object_arg(element, prop, fill(value, params))
+            elements.append(element)
+        if len(elements) == 1 and not self._links:
+            return elements[0]
+
+        pipeline = Gst.Pipeline.new(name)
+        for element in elements:
+            pipeline.add(element)
+        for src, src_pad, dst, dst_pad, delayed in self._links:
+            if delayed:
+                handler_id = []
+                handler_id.append(elements[src].connect("pad-added", pad_added,
+                                                        (elements[dst], src_pad, dst_pad, handler_id)))
+            elif not elements[src].link_pads(src_pad, elements[dst], dst_pad):
+                raise RuntimeError("could not link %s to %s" % (elements[src].get_name(),
+                                                                elements[dst].get_name()))
+        return pipeline
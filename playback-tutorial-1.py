@@ -1,18 +1,31 @@
-#!/usr/bin/env python
-# -*- coding:utf-8 -*-
+#!/usr/bin/env python3
 """
-Playback tutorial 1: Playbin2 usage
-http://docs.gstreamer.com/display/GstSDK/Playback+tutorial+1%3A+Playbin2+usage
+Playback tutorial 1: Playbin usage
+https://gstreamer.freedesktop.org/documentation/tutorials/playback/playbin-usage.html
+
+    playback-tutorial-1.py [URI] [--slow-switch]
+
+Audio tracks are switched through AudioSwitcher, which keeps the inactive
+tracks warm so a switch is heard right away. --slow-switch leaves playbin's
+selector at its defaults, for comparison. Each switch's latency is printed
+as soon as the new track is heard.
 """
+
+import argparse
 import sys
-import pygst
-pygst.require("0.10")
-import gst
-import glib, gobject
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from audioswitch import AudioSwitcher
+
 
 class CustomData:
     def __init__(self):
-        self.playbin2 = None
+        self.playbin = None
+        self.switcher = None
         self.n_video = 0
         self.n_audio = 0
         self.n_text = 0
@@ -21,125 +34,161 @@ class CustomData:
         self.current_text = 0
         self.main_loop = None
 
+
 class GstPlayFlags:
-    GST_PLAY_FLAG_VIDEO = 1 << 0 # We want video output 
-    GST_PLAY_FLAG_AUDIO = 1 << 1 # We want audio output 
-    GST_PLAY_FLAG_TEXT = 1 << 3 # We want subtitle output
+    GST_PLAY_FLAG_VIDEO = 1 << 0  # We want video output
+    GST_PLAY_FLAG_AUDIO = 1 << 1  # We want audio output
+    GST_PLAY_FLAG_TEXT = 1 << 2  # We want subtitle output
+
 
 def analyze_streams(data):
-    #Read some properties
-    data.n_video = data.playbin2.get_property("n-video")
-    data.n_audio = data.playbin2.get_property("n-audio")
-    data.n_text = data.playbin2.get_property("n-text")
-
-    print ("{0.n_video} video stream(s), {0.n_audio} audio stream(s), {0.n_text} text streams".format(data))
-    for i in xrange(data.n_video):
-         #Retrieve the stream's video tags
-        tags = data.playbin2.emit("get-video-tags", i)
-        str = tags[gst.TAG_VIDEO_CODEC]
-        print ("  codec: {0}".format(str if str else "unknown"))
-
-    print ""
-    for i in xrange(data.n_audio):
-        # Retrieve the stream's audio tags 
-        tags = data.playbin2.emit("get-audio-tags", i)
-        if (tags):
-            print ("audio stream {0}:".format(i))
-            if (gst.TAG_AUDIO_CODEC in tags):
-                str = tags[gst.TAG_AUDIO_CODEC]
-                print ("  codec: {0}".format(str))
-            if (gst.TAG_LANGUAGE_CODE in tags):
-                str = tags[gst.TAG_LANGUAGE_CODE]
-                print ("  language: {0}".format(str))
-            if (gst.TAG_BITRATE in tags):
-                rate = tags[gst.TAG_BITRATE]
-                print ("  bitrate: {0}".format(rate))
-
-    print ""
-    for i in xrange(data.n_text):
-        #Retrieve the stream's subtitle tags 
-        tags = data.playbin2.emit("get-text-tags", i)
-        if (tags):
-            print ("subtitle stream {0}".format(i))
-            if (gst.TAG_LANGUAGE_CODE in tags):
-                str = tags[gst.TAG_LANGUAGE_CODE]
-                print ("  language: {0}".format(str))
-
-    data.current_video = data.playbin2.get_property("current-video")
-    data.current_audio = data.playbin2.get_property("current-audio")
-    data.current_text = data.playbin2.get_property("current-text")
-    print ("Currently playing video stream {0.current_video}, audio stream {0.current_audio} and text stream {0.current_text}".format(data))
+    # Read some properties
+    data.n_video = data.playbin.get_property("n-video")
+    data.n_audio = data.playbin.get_property("n-audio")
+    data.n_text = data.playbin.get_property("n-text")
+
+    print("%d video stream(s), %d audio stream(s), %d text stream(s)" %
+          (data.n_video, data.n_audio, data.n_text))
+    for i in range(data.n_video):
+        # Retrieve the stream's video tags
+        tags = data.playbin.emit("get-video-tags", i)
+        if tags:
+            print("video stream %d:" % i)
+            ret, str = tags.get_string(Gst.TAG_VIDEO_CODEC)
+            print("  codec: %s" % (str if ret else "unknown"))
+
+    print("")
+    for i in range(data.n_audio):
+        # Retrieve the stream's audio tags
+        tags = data.playbin.emit("get-audio-tags", i)
+        if tags:
+            print("audio stream %d:" % i)
+            ret, str = tags.get_string(Gst.TAG_AUDIO_CODEC)
+            if ret:
+                print("  codec: %s" % str)
+            ret, str = tags.get_string(Gst.TAG_LANGUAGE_CODE)
+            if ret:
+                print("  language: %s" % str)
+            ret, rate = tags.get_uint(Gst.TAG_BITRATE)
+            if ret:
+                print("  bitrate: %d" % rate)
+
+    print("")
+    for i in range(data.n_text):
+        # Retrieve the stream's subtitle tags
+        tags = data.playbin.emit("get-text-tags", i)
+        if tags:
+            print("subtitle stream %d:" % i)
+            ret, str = tags.get_string(Gst.TAG_LANGUAGE_CODE)
+            if ret:
+                print("  language: %s" % str)
+
+    data.current_video = data.playbin.get_property("current-video")
+    data.current_audio = data.playbin.get_property("current-audio")
+    data.current_text = data.playbin.get_property("current-text")
+    print("Currently playing video stream %d, audio stream %d and text stream %d" %
+          (data.current_video, data.current_audio, data.current_text))
+
 
 def handle_message(bus, msg, data):
-    if (msg.type == gst.MESSAGE_ERROR):
+    if msg.type == Gst.MessageType.ERROR:
         err, debug_info = msg.parse_error()
-        print >> sys.stderr, "Error received from element {0} : {1}".format(msg.src.get_name(), err.message)
-        print >> sys.stderr, "Debugging information: {0}".format(debug_info if debug_info else "none")
+        print("Error received from element %s: %s" % (msg.src.get_name(), err), file=sys.stderr)
+        print("Debugging information: %s" % (debug_info or "none"), file=sys.stderr)
         data.main_loop.quit()
-    elif (msg.type == gst.MESSAGE_EOS):
-        print ("End of Stream reached.")
+    elif msg.type == Gst.MessageType.EOS:
+        print("End-Of-Stream reached.")
         data.main_loop.quit()
-    elif (msg.type == gst.MESSAGE_STATE_CHANGED):
+    elif msg.type == Gst.MessageType.STATE_CHANGED:
         old_state, new_state, pending_state = msg.parse_state_changed()
-        if (msg.src == data.playbin2):
-            if (new_state == gst.STATE_PLAYING):
+        if msg.src == data.playbin:
+            if new_state == Gst.State.PLAYING:
                 analyze_streams(data)
     return True
 
+
+# Called from a streaming thread once a switch is heard; print from the main loop
+def switched_cb(index, latency):
+    GLib.idle_add(report_switch, index, latency)
+
+
+def report_switch(index, latency):
+    print("Switch to audio stream %d took %.1fms" % (index, latency * 1000))
+    return False
+
+
 def handle_keyboard(source, cond, data):
-    str = source.readline()
-    x = str[0];
-    if (x == 'q' or x == 'Q'):
+    str = sys.stdin.readline()
+    if not str or str[0] in ('q', 'Q'):
         data.main_loop.quit()
         return True
-    index = int(str)
-    if (index < 0 or index >= data.n_audio):
-        print >> sys.stderr, "Index out of bounds"
+    try:
+        index = int(str)
+    except ValueError:
+        index = -1
+    if index < 0 or index >= data.n_audio:
+        print("Index out of bounds", file=sys.stderr)
     else:
-        #If the input was a valid audio stream index, set the current audio stream
-        print ("Setting current audio stream to {0}".format(index))
-        data.playbin2.set_property("current-audio", index)
+        # If the input was a valid audio stream index, set the current audio stream
+        print("Setting current audio stream to %d" % index)
+        data.switcher.switch(index)
     return True
 
 
-data = CustomData()
+def main():
+    parser = argparse.ArgumentParser(description="Playbin usage")
+    parser.add_argument("uri", nargs="?",
+                        default="https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_cropped_multilingual.webm")
+    parser.add_argument("--slow-switch", action="store_true",
+                        help="leave playbin's audio selector at its defaults")
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    data = CustomData()
+
+    # Create the elements
+    data.playbin = Gst.ElementFactory.make("playbin", "playbin")
+    if not data.playbin:
+        print("Not all elements could be created.", file=sys.stderr)
+        exit(-1)
+    data.switcher = AudioSwitcher(data.playbin, fast=not args.slow_switch, on_switched=switched_cb)
 
-#Create the elements
-data.playbin2 = gst.element_factory_make("playbin2", "playbin2")
-if (not data.playbin2):
-    print >> sys.stderr , "Not all elements could be created"
-    exit(-1)
+    # Set the URI to play
+    data.playbin.set_property("uri", args.uri)
 
-#Set the URI to play
-data.playbin2.set_property("uri", "http://docs.gstreamer.com/media/sintel_cropped_multilingual.webm")
+    # Set flags to show Audio and Video but ignore Subtitles
+    flags = data.playbin.get_property("flags")
+    flags |= (GstPlayFlags.GST_PLAY_FLAG_VIDEO | GstPlayFlags.GST_PLAY_FLAG_AUDIO)
+    flags &= ~GstPlayFlags.GST_PLAY_FLAG_TEXT
+    data.playbin.set_property("flags", flags)
 
-#Set flags to show Audio and Video but ignore Subtitles
-flags = data.playbin2.get_property("flags")
-flags |= (GstPlayFlags.GST_PLAY_FLAG_VIDEO | GstPlayFlags.GST_PLAY_FLAG_AUDIO)
-flags &= ~GstPlayFlags.GST_PLAY_FLAG_TEXT
-data.playbin2.set_property("flags", flags)
+    # Set connection speed. This will affect some internal decisions of playbin
+    data.playbin.set_property("connection-speed", 56)
 
-#Set connection speed. This will affect some internal decisions of playbin2 
-data.playbin2.set_property("connection_speed", 56)
+    # Add a bus watch, so we get notified when a message arrives
+    bus = data.playbin.get_bus()
+    bus.add_watch(GLib.PRIORITY_DEFAULT, handle_message, data)
 
-#Add a bus watch, so we get notified when a message arrives
-bus = data.playbin2.get_bus()
-bus.add_watch(handle_message, data)
+    # Add a keyboard watch so we get notified of keystrokes
+    io_stdin = GLib.IOChannel.unix_new(sys.stdin.fileno())
+    GLib.io_add_watch(io_stdin, GLib.PRIORITY_DEFAULT, GLib.IOCondition.IN, handle_keyboard, data)
 
-#Add a keyboard watch so we get notified of keystrokes
-io_stdin = glib.IOChannel(sys.stdin.fileno())
-io_stdin.add_watch(glib.IO_IN, handle_keyboard, data)
+    # Start playing
+    ret = data.playbin.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        print("Unable to set the pipeline to the playing state.", file=sys.stderr)
+        exit(-1)
 
-#Start playing
-ret = data.playbin2.set_state(gst.STATE_PLAYING)
-if (ret == gst.STATE_CHANGE_FAILURE):
-    print >> sys.stderr, ("Unable to set pipeline to the playing state")
-    exit(-1)
+    # Create a GLib Main Loop and set it to run
+    data.main_loop = GLib.MainLoop.new(None, False)
+    data.main_loop.run()
 
-#Create a GLib Main Loop and set it to run 
-data.main_loop = gobject.MainLoop(None, False)
-data.main_loop.run()
+    # Free resources
+    data.switcher.account_cpu()
+    data.playbin.set_state(Gst.State.NULL)
+    print("Audio switching: %s" % data.switcher.stats)
 
-#Free resources
-data.playbin2.set_state(gst.STATE_NULL)
 
+if __name__ == '__main__':
+    main()
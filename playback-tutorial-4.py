@@ -1,135 +1,175 @@
-#!/usr/bin/env python
-# -*- coding:utf-8 -*-
+#!/usr/bin/env python3
 """
 Playback tutorial 4: Progressive streaming
-http://docs.gstreamer.com/display/GstSDK/Playback+tutorial+4%3A+Progressive+streaming
+https://gstreamer.freedesktop.org/documentation/tutorials/playback/progressive-streaming.html
+
+    playback-tutorial-4.py [URI] [--ring-buffer-max-size BYTES] [--cache DIR [--prefetch N]]
+
+--ring-buffer-max-size keeps the download in a fixed-size ring buffer file
+instead of growing a temporary file for the whole clip. --cache plays through
+a local proxy backed by a persistent range cache, so repeat plays and seeks
+into regions that were already fetched are served from disk. --prefetch
+additionally downloads the region ahead of the play position (or seek
+target) over N parallel connections.
 """
+
+import argparse
+import os
 import sys
-from array import array
-import gobject
-gobject.threads_init()
-import pygst
-pygst.require("0.10")
-import gst
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from buffering import BufferingController, BufferingRanges
+from rangecache import CachingProxy, RangeCache
 
 GRAPH_LENGTH = 80
 
+
 class GstPlayFlags:
-    GST_PLAY_FLAG_DOWNLOAD = 1 << 7 # Enable progressive download (on selected formats)
+    GST_PLAY_FLAG_DOWNLOAD = 1 << 7  # Enable progressive download (on selected formats)
+
 
 class CustomData:
-    is_live = False
-    pipeline = None
-    loop = None
-    buffering_level = 0
+    def __init__(self):
+        self.pipeline = None
+        self.loop = None
+        self.buffering = None
+        self.ranges = None
+
 
 def got_location(playbin, prop_object, prop):
-    location = prop_object.props.temp_location
-    print (">>>> Temporary file: {0}".format(location))
-    #Uncomment this line to keep the temporary file after the program exits
-    #prop_object.set_property("temp-remove", False)
+    location = prop_object.get_property("temp-location")
+    print(">>>> Temporary file: %s" % location)
+    # Uncomment this line to keep the temporary file after the program exits
+    # prop_object.set_property("temp-remove", False)
+
 
 def cb_message(bus, msg, data):
-    if (msg.type == gst.MESSAGE_ERROR):
-        err, debug = msg.parse_error()
-        print ("Error: {0}".format(err.message))
-        data.pipeline.set_state(gst.STATE_READY)
+    if msg.type == Gst.MessageType.ERROR:
+        err, debug_info = msg.parse_error()
+        print("Error: %s" % err)
+        data.pipeline.set_state(Gst.State.READY)
         data.loop.quit()
-    elif (msg.type == gst.MESSAGE_EOS):
-        #end-of-stream
-        pipeline.set_state(gst.STATE_READY)
+    elif msg.type == Gst.MessageType.EOS:
+        # end-of-stream
+        data.pipeline.set_state(Gst.State.READY)
         data.loop.quit()
-    elif (msg.type == gst.MESSAGE_BUFFERING):
-        #If the stream is live, we do not care about buffering.
-        if (data.is_live):
-            return
-
-        #Wait until buffering is complete before start/resume playing
-        data.buffering_level = msg.parse_buffering()
-        if (data.buffering_level < 100):
-            data.pipeline.set_state(gst.STATE_PAUSED)
-        else:
-            data.pipeline.set_state(gst.STATE_PLAYING)
-    elif (msg.type == gst.MESSAGE_CLOCK_LOST):
-        #Get a new clock
-        data.pipeline.set_state(gst.STATE_PAUSED)
-        data.pipeline.set_state(gst.STATE_PLAYING)
+    elif msg.type == Gst.MessageType.BUFFERING:
+        # Pause below the low watermark, resume once the queue is full again
+        data.buffering.handle_message(msg)
+        # The downloaded regions changed, refresh them on the next UI tick
+        data.ranges.handle_message(msg)
+    elif msg.type == Gst.MessageType.CLOCK_LOST:
+        # Get a new clock
+        data.pipeline.set_state(Gst.State.PAUSED)
+        data.pipeline.set_state(Gst.State.PLAYING)
     else:
-        #Unhandled message
+        # Unhandled message
         pass
 
+
 def refresh_ui(data):
-    query = gst.query_new_buffering(gst.FORMAT_PERCENT)
-    result = pipeline.query(query)
-    if (result):
-        graph = array('c', ' ' * GRAPH_LENGTH)
-        format = gst.FORMAT_TIME
-        position = 0
-        duration = 0
-        n_ranges = query.get_n_buffering_ranges()
-        fmt, start, stop, total = query.parse_buffering_range()  # no parse_nth_buffering_range method ?!
-        start = start / 10000
-        stop = stop / 10000
-        start = start * GRAPH_LENGTH / 100
-        stop = stop * GRAPH_LENGTH / 100
-
-        i = 0
-        for i in xrange(start, stop):
+    graph = [' '] * GRAPH_LENGTH
+
+    # Draw every downloaded region, not only the first one
+    for start, stop in data.ranges.refresh():
+        start = start * GRAPH_LENGTH // Gst.FORMAT_PERCENT_MAX
+        stop = stop * GRAPH_LENGTH // Gst.FORMAT_PERCENT_MAX
+        for i in range(start, min(stop, GRAPH_LENGTH)):
             graph[i] = '-'
 
-        try:
-            position = data.pipeline.query_position(format)[0]
-            if (position != gst.CLOCK_TIME_NONE):
-                duration = data.pipeline.query_duration(format)[0]
-                if (duration != gst.CLOCK_TIME_NONE):
-                    i = (int)(GRAPH_LENGTH * float(position) / float(duration + 1))
-        except:
-            pass
-
-        graph[i] = 'X' if (data.buffering_level < 100) else '>'
-        sys.stdout.write("\r[{0}]".format(graph.tostring()))
-        if (data.buffering_level < 100):
-            sys.stdout.write(" Buffering {0}%".format(data.buffering_level))
-        else:
-            sys.stdout.write("                ")
-        sys.stdout.write("\r")
+    i = 0
+    ret, position = data.pipeline.query_position(Gst.Format.TIME)
+    if ret and position != Gst.CLOCK_TIME_NONE:
+        ret, duration = data.pipeline.query_duration(Gst.Format.TIME)
+        if ret and duration != Gst.CLOCK_TIME_NONE:
+            i = int(GRAPH_LENGTH * position / (duration + 1))
+
+    buffering = data.buffering.is_buffering()
+    graph[i] = 'X' if buffering else '>'
+    sys.stdout.write("\r[%s]" % "".join(graph))
+    if buffering:
+        sys.stdout.write(" Buffering %d%%" % data.buffering.percent)
+    else:
+        sys.stdout.write("                ")
+    sys.stdout.write("\r")
+    sys.stdout.flush()
 
     return True
 
-#Initialize our data structure
-data = CustomData()
-
-#Build the pipeline
-pipeline = gst.parse_launch("playbin2 uri=http://docs.gstreamer.com/media/sintel_trailer-480p.webm")
-bus = pipeline.get_bus()
-
-#Set the download flag
-flags = pipeline.get_property("flags")
-flags |= GstPlayFlags.GST_PLAY_FLAG_DOWNLOAD
-pipeline.set_property("flags", flags)
-
-#Start playing
-ret = pipeline.set_state(gst.STATE_PLAYING)
-if (ret == gst.STATE_CHANGE_FAILURE):
-    print >> sys.stderr, "Unable to set pipeline to playing state"
-    exit(-1)
-elif (ret == gst.STATE_CHANGE_NO_PREROLL):
-    data.is_live = True
-
-main_loop = gobject.MainLoop(None, False)
-data.loop = main_loop
-data.pipeline = pipeline
-
-bus.add_signal_watch()
-bus.connect("message", cb_message, data)
-pipeline.connect("deep-notify::temp-location", got_location)
-
-#Register a function that GLib will call every second
-gobject.timeout_add_seconds(1, refresh_ui, data)
-main_loop.run()
-
-#Free resources
-pipeline.set_state(gst.STATE_NULL)
-print ""
-
 
+def main():
+    parser = argparse.ArgumentParser(description="Progressive streaming")
+    parser.add_argument("uri", nargs="?",
+                        default="https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_trailer-480p.webm")
+    parser.add_argument("--ring-buffer-max-size", type=int, default=0,
+                        help="cap the download buffer to this many bytes (0: whole file)")
+    parser.add_argument("--cache", metavar="DIR", help="persistent range cache directory")
+    parser.add_argument("--prefetch", metavar="N", type=int, default=0,
+                        help="parallel prefetch connections (requires --cache)")
+    args = parser.parse_args()
+    if args.prefetch and not args.cache:
+        parser.error("--prefetch requires --cache")
+
+    Gst.init(None)
+
+    # Initialize our data structure
+    data = CustomData()
+
+    # Serve the media through the range cache if requested
+    proxy = None
+    uri = args.uri
+    if args.cache:
+        proxy = CachingProxy(RangeCache(os.path.expanduser(args.cache)),
+                             prefetch_connections=args.prefetch)
+        proxy.start()
+        uri = proxy.uri(uri)
+
+    # Build the pipeline
+    data.pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    data.pipeline.set_property("uri", uri)
+    data.buffering = BufferingController(data.pipeline)
+    data.ranges = BufferingRanges(data.pipeline)
+
+    # Set the download flag
+    flags = data.pipeline.get_property("flags")
+    flags |= GstPlayFlags.GST_PLAY_FLAG_DOWNLOAD
+    data.pipeline.set_property("flags", flags)
+
+    # Make queue2 wrap around in a bounded file instead of keeping everything
+    if args.ring_buffer_max_size:
+        data.pipeline.set_property("ring-buffer-max-size", args.ring_buffer_max_size)
+
+    # Start playing
+    ret = data.pipeline.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        print("Unable to set the pipeline to the playing state.", file=sys.stderr)
+        exit(-1)
+    elif ret == Gst.StateChangeReturn.NO_PREROLL:
+        data.buffering.set_live(True)
+
+    data.loop = GLib.MainLoop.new(None, False)
+
+    bus = data.pipeline.get_bus()
+    bus.add_signal_watch()
+    bus.connect("message", cb_message, data)
+    data.pipeline.connect("deep-notify::temp-location", got_location)
+
+    # Register a function that GLib will call every second
+    GLib.timeout_add_seconds(1, refresh_ui, data)
+    data.loop.run()
+
+    # Free resources
+    data.pipeline.set_state(Gst.State.NULL)
+    print("")
+    print("Buffering: %s" % data.buffering.stats)
+    if proxy:
+        proxy.stop()
+        print("Cache: %s" % proxy.cache.stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,108 +1,97 @@
-#!/usr/bin/env python
-# -*- coding:utf-8 -*-
+#!/usr/bin/env python3
 """
 Playback tutorial 5: Color Balance
-http://docs.gstreamer.com/display/GstSDK/Playback+tutorial+5%3A+Color+Balance
+https://gstreamer.freedesktop.org/documentation/tutorials/playback/color-balance.html
+
+    playback-tutorial-5.py [URI]
+
+Changes go through ColorBalanceController, which ramps each channel to its
+new value and merges repeated key presses into the running ramp.
 """
+
 import sys
-import glib
-import gobject
-import pygst
-pygst.require("0.10")
-import gst
-from gst.interfaces import ColorBalance
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from colorbalance import ColorBalanceController
+
 
 class CustomData:
-    pipeline = None
-    loop = None
-
-def update_color_channel(channel_name, increase, cb):
-    #Retrieve the list of channels and locate the requested one
-    channel = None
-    channels = ColorBalance.list_colorbalance_channels(cb)  
-    for tmp in channels:
-        if (tmp.label == channel_name):
-            channel = tmp
-            break
-    
-    if (not channel):
-        return 
-
-    #Change the channel's value
-    step = 0.1 * (channel.max_value - channel.min_value)
-    value = cb.get_value(channel)
-    if (increase):
-        value = int(value + step)
-        if (value > channel.max_value):
-            value = channel.max_value
-    else:
-        value = int(value - step)
-        if (value < channel.min_value):
-            value = channel.min_value
-
-    cb.set_value(channel, value)
-
-def print_current_values(pipeline):
-    channels = pipeline.list_colorbalance_channels()
-
-    #for channel in channels:
-    #    value = pipeline.get_value(channel)
-    #    perc = 100 * (value - channel.min_value)/(channel.max_value - channel.min_value)
-    #    sys.stdout.write("{0}: {1:3}% ".format(channel.label, perc))
-
-    def mapper(c):
-        return ("{0}: {1:3}%".format(c.label, 100 * (pipeline.get_value(c) - c.min_value) / (c.max_value - c.min_value)))
-    out = map(mapper, channels)
-    print ("  ".join(out))
+    def __init__(self):
+        self.pipeline = None
+        self.balance = None
+        self.main_loop = None
+
+
+def print_current_values(data):
+    print("  ".join("%s: %3d%%" % (label, 100 * fraction)
+                    for label, fraction in data.balance.fractions()))
+
 
 def handle_keyboard(source, cond, data):
-    str = source.readline()
-    cmap = dict({'c': "CONTRAST",
-                 'b': "BRIGHTNESS",
-                 'h': "HUE",
-                 's': "SATURATION"
-                })
-    lc = str[0].lower()
-    if (lc == 'q'):
+    str = sys.stdin.readline()
+    cmap = {'c': "CONTRAST",
+            'b': "BRIGHTNESS",
+            'h': "HUE",
+            's': "SATURATION"}
+    if not str or str[0].lower() == 'q':
         data.main_loop.quit()
-    elif (lc in cmap.keys()):
-        update_color_channel(cmap[lc], str[0].isupper(), data.pipeline)
-    else:
-        pass
-
-    print_current_values(data.pipeline)
+        return True
+    # Every letter on the line counts, so "CCC" raises the contrast three steps in one ramp
+    for c in str.strip():
+        if c.lower() in cmap:
+            data.balance.nudge(cmap[c.lower()], 1 if c.isupper() else -1)
     return True
 
-#Initialize our data structure
-data = CustomData()
 
-#print usage map
-print ("USAGE: Choose one of the following options, then press enter:\n"
-    " 'C' to increase contrast, 'c' to decrease contrast\n"
-    " 'B' to increase brightness, 'b' to decrease brightness\n"
-    " 'H' to increase hue, 'h' to decrease hue\n"
-    " 'S' to increase saturation, 's' to decrease saturation\n"
-    " 'Q' to quit")
+def main():
+    uri = sys.argv[1] if len(sys.argv) > 1 else \
+        "https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_trailer-480p.webm"
+
+    Gst.init(None)
+
+    # Initialize our data structure
+    data = CustomData()
 
-#Build the pipeline
-data.pipeline = gst.parse_launch("playbin2 uri=http://docs.gstreamer.com/media/sintel_trailer-480p.webm")
+    # Print usage map
+    print("USAGE: Choose one of the following options, then press enter:\n"
+          " 'C' to increase contrast, 'c' to decrease contrast\n"
+          " 'B' to increase brightness, 'b' to decrease brightness\n"
+          " 'H' to increase hue, 'h' to decrease hue\n"
+          " 'S' to increase saturation, 's' to decrease saturation\n"
+          " 'Q' to quit")
 
-#Add a keyboard watch so we get notified of keystrokes
-io_stdin = gobject.IOChannel(sys.stdin.fileno())
-io_stdin.add_watch(glib.IO_IN, handle_keyboard, data)
+    # Build the pipeline. The URI is set as a property, so it may contain spaces
+    data.pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    data.pipeline.set_property("uri", uri)
+    data.balance = ColorBalanceController(data.pipeline, on_settled=lambda: print_current_values(data))
 
-ret = data.pipeline.set_state(gst.STATE_PLAYING)
-if (ret == gst.STATE_CHANGE_FAILURE):
-    print >> sys.stderr, "Unable to set the pipeline to the playing state."
-    exit(-1)
+    # Add a keyboard watch so we get notified of keystrokes
+    io_stdin = GLib.IOChannel.unix_new(sys.stdin.fileno())
+    GLib.io_add_watch(io_stdin, GLib.PRIORITY_DEFAULT, GLib.IOCondition.IN, handle_keyboard, data)
 
-print_current_values(data.pipeline)
+    # Start playing
+    ret = data.pipeline.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        print("Unable to set the pipeline to the playing state.", file=sys.stderr)
+        exit(-1)
 
-#Create a GLib Main loop and set it to run
-data.loop = gobject.MainLoop(None, False)
-data.loop.run()
+    # Wait for the video sink, which provides the color balance channels
+    data.pipeline.get_state(Gst.CLOCK_TIME_NONE)
+    print_current_values(data)
 
-data.pipeline.set_state(gst.STATE_NULL)
+    # Create a GLib Main Loop and set it to run
+    data.main_loop = GLib.MainLoop.new(None, False)
+    data.main_loop.run()
 
+    # Free resources
+    data.balance.stop()
+    data.pipeline.set_state(Gst.State.NULL)
+    print("Color balance: %s" % data.balance.stats)
 
 
+if __name__ == '__main__':
+    main()
@@ -1,66 +1,85 @@
-#!/usr/bin/env python
-# -*- coding:utf-8 -*-
+#!/usr/bin/env python3
 """
 Playback tutorial 6: Audio visualization
-http://docs.gstreamer.com/display/GstSDK/Playback+tutorial+6%3A+Audio+visualization
+https://gstreamer.freedesktop.org/documentation/tutorials/playback/audio-visualization.html
+
+    playback-tutorial-6.py [URI] [--budget PERCENT] [--width W] [--height H] [--fps N]
+
+The visualization is chosen by VisualizationSelector: the best-looking
+plugin whose measured cost at the given size and framerate fits the CPU
+budget (percent of one core).
 """
+
+import argparse
 import sys
-import pygst
-pygst.require("0.10")
-import gst
 
-#playbin2 flags
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from visselect import VisualizationSelector
+
+
+# playbin flags
 class GstPlayFlags:
-    GST_PLAY_FLAG_VIS = 1 << 3 # Enable rendering of visualizations when there is no video stream.
+    GST_PLAY_FLAG_VIS = 1 << 3  # Enable rendering of visualizations when there is no video stream.
 
-#Return TRUE if this is a Visualization element
-def filter_vis_features(f):
-    return (f.get_klass().find("Visualization") >= 0)
 
+def main():
+    parser = argparse.ArgumentParser(description="Audio visualization")
+    parser.add_argument("uri", nargs="?", default="http://radio.hbr1.com:19800/ambient.ogg")
+    parser.add_argument("--budget", type=float, default=25.0, help="CPU budget in percent of one core")
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--fps", type=int, default=25)
+    args = parser.parse_args()
 
+    Gst.init(None)
 
+    # Measure all visualization plugins (cached after the first run) and print their cost
+    selector = VisualizationSelector(args.width, args.height, args.fps)
+    for cost in selector.costs():
+        print("  %s" % cost)
+    selected_factory = selector.select(args.budget)
 
-selected_factory = None
+    # Don't use the factory if it's still empty
+    # e.g. no visualization plugins found
+    if not selected_factory:
+        print("No visualization plugins found!", file=sys.stderr)
+        exit(-1)
 
-#Get a list of all visualization plugins
-defreg = gst.registry_get_default()
-list = [f for f in defreg.get_feature_list(gst.ElementFactory) if filter_vis_features(f)]
+    # We have now selected a factory for the visualization element
+    print("Selected '%s'" % selected_factory.get_longname())
+    vis_plugin = selector.make_element(selected_factory)
+    if not vis_plugin:
+        exit(-1)
 
-#Print their names
-for factory in list:
-    name = factory.get_longname()
-    print ("  " + name)
-    if (not selected_factory or name.startswith("GOOM")):
-        selected_factory = factory
+    # Build the pipeline. The URI is set as a property, so it may contain spaces
+    pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    pipeline.set_property("uri", args.uri)
 
-#Don't use the factory if it's still empty 
-#e.g. no visualization plugins found 
-if (not selected_factory):
-    print >> sys.stderr, "No visualization plugins found!"
-    exit(-1)
-  
-#We have now selected a factory for the visualization element
-print ("Selected '{0}'".format(selected_factory.get_longname()))
-vis_plugin = selected_factory.create()
-if (not vis_plugin):
-    exit(-1)
+    # Set the visualization flag
+    flags = pipeline.get_property("flags")
+    flags |= GstPlayFlags.GST_PLAY_FLAG_VIS
+    pipeline.set_property("flags", flags)
 
-#Build the pipeline
-pipeline = gst.parse_launch("playbin2 uri=http://radio.hbr1.com:19800/ambient.ogg")
+    # Set vis plugin for playbin
+    pipeline.set_property("vis-plugin", vis_plugin)
 
-#Set the visualization flag
-flags = pipeline.get_property("flags")
-flags |= GstPlayFlags.GST_PLAY_FLAG_VIS
-pipeline.set_property("flags", flags)
+    # Start playing
+    ret = pipeline.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        print("Unable to set the pipeline to the playing state.", file=sys.stderr)
+        exit(-1)
 
-#Set vis plugin for playbin2
-pipeline.set_property("vis-plugin", vis_plugin)
+    # Wait until error or EOS
+    bus = pipeline.get_bus()
+    msg = bus.timed_pop_filtered(Gst.CLOCK_TIME_NONE, Gst.MessageType.ERROR | Gst.MessageType.EOS)
 
-#Start playing
-pipeline.set_state(gst.STATE_PLAYING)
-bus = pipeline.get_bus() 
-msg = bus.timed_pop_filtered(gst.CLOCK_TIME_NONE, gst.MESSAGE_ERROR | gst.MESSAGE_EOS)
+    # Free resources
+    pipeline.set_state(Gst.State.NULL)
 
-#Free resources
-pipeline.set_state(gst.STATE_NULL)
 
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,67 @@
-#!/usr/bin/env python
-# -*- coding:utf-8 -*-
+#!/usr/bin/env python3
 """
-Playback tutorial 7: Custom playbin2 sinks -- Exercise
-http://docs.gstreamer.com/display/GstSDK/Playback+tutorial+7%3A+Custom+playbin2+sinks
+Playback tutorial 7: Custom playbin sinks -- Exercise
+https://gstreamer.freedesktop.org/documentation/tutorials/playback/custom-playbin-sinks.html
+
+    playback-tutorial-7-exc.py [URI] [--profile single|threaded|direct]
+
+The effect chain is laid out by a VideoChainProfile (see videoprofile.py).
 """
-import sys, os
+
+import argparse
+import os
+import sys
+
 os.environ["GST_DEBUG"] = "2"
-import pygst
-pygst.require("0.10")
-import gst
 
-#Build the pipeline
-pipeline = gst.parse_launch("playbin2 uri=http://docs.gstreamer.com/media/sintel_trailer-480p.webm") 
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from sinkbins import SinkBinFactory
+from videoprofile import PROFILES
+
+# "solarize" works as an effect too
+EFFECT = "agingtv"
+EFFECT_PROPERTIES = {"scratch-lines": 19}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custom playbin sinks exercise")
+    parser.add_argument("uri", nargs="?",
+                        default="https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_trailer-480p.webm")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="direct",
+                        help="threading and conversion layout of the effect chain")
+    args = parser.parse_args()
+
+    Gst.init(None)
 
-#effect = gst.element_factory_make("solarize", "effect")
-effect = gst.element_factory_make("agingtv", "effect")
-videoconvert = gst.element_factory_make("ffmpegcolorspace", "videoconvert")
-videosink = gst.element_factory_make("autovideosink", "videosink")
+    # Build the pipeline. The URI is set as a property, so it may contain spaces
+    pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    pipeline.set_property("uri", args.uri)
 
-if (not effect or not videoconvert or not videosink):
-    print >> sys.stderr, "Not all elements could be created"
-    exit(-1)
+    try:
+        factory = SinkBinFactory("video_sink_bin", PROFILES[args.profile].chain(EFFECT, EFFECT_PROPERTIES))
+    except ValueError as e:
+        print("Not all elements could be created: %s" % e, file=sys.stderr)
+        exit(-1)
 
-bin = gst.Bin("video_sink_bin")
-bin.add_many(effect, videoconvert, videosink)
-gst.element_link_many(effect, videoconvert, videosink)
-pad = effect.get_static_pad("sink")
-ghost_pad = gst.GhostPad("sink", pad)
-ghost_pad.set_active(True)
-bin.add_pad(ghost_pad)
+    pipeline.set_property("video-sink", factory.build())
 
-effect.set_property("scratch-lines", 19)
+    # Start playing
+    ret = pipeline.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        print("Unable to set the pipeline to the playing state.", file=sys.stderr)
+        exit(-1)
 
-pipeline.set_property("video-sink", bin)
+    # Wait until error or EOS
+    bus = pipeline.get_bus()
+    msg = bus.timed_pop_filtered(Gst.CLOCK_TIME_NONE, Gst.MessageType.ERROR | Gst.MessageType.EOS)
 
-#Start playing
-pipeline.set_state(gst.STATE_PLAYING)
+    # Free resources
+    pipeline.set_state(Gst.State.NULL)
 
-#Wait until error or EOS
-bus = pipeline.get_bus()
-bus.timed_pop_filtered(gst.CLOCK_TIME_NONE, gst.MESSAGE_ERROR | gst.MESSAGE_EOS)
 
-#Free resources
-pipeline.set_state(gst.STATE_NULL)
+if __name__ == '__main__':
+    main()
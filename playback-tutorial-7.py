@@ -1,51 +1,63 @@
-#!/usr/bin/env python
-# -*- coding:utf-8 -*-
+#!/usr/bin/env python3
 """
-Playback tutorial 7: Custom playbin2 sinks
-http://docs.gstreamer.com/display/GstSDK/Playback+tutorial+7%3A+Custom+playbin2+sinks
+Playback tutorial 7: Custom playbin sinks
+https://gstreamer.freedesktop.org/documentation/tutorials/playback/custom-playbin-sinks.html
+
+    playback-tutorial-7.py [URI]
+
+The sink bin is described declaratively and built by SinkBinFactory.
 """
+
 import sys
-import pygst
-pygst.require("0.10")
-import gst
 
-#Build the pipeline
-pipeline = gst.parse_launch("playbin2 uri=http://docs.gstreamer.com/media/sintel_trailer-480p.webm") 
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from sinkbins import SinkBinFactory
+
+# The sink bin: an equalizer cutting the middle and high bands, then the audio sink
+AUDIO_SINK_BIN = [
+    ("equalizer-3bands", {"band1": -24.0, "band2": -24.0}),
+    ("audioconvert", {}),
+    ("autoaudiosink", {}),
+]
 
-#Create the elements inside the sink bin
-equalizer = gst.element_factory_make("equalizer-3bands", "equalizer")
-convert = gst.element_factory_make("audioconvert", "convert")
-sink = gst.element_factory_make("autoaudiosink", "audio_sink")
-if (not equalizer or not convert or not sink):
-    print >> sys.stderr, "Not all elements could be created"
-    exit(-1)
 
-#Create the sink bin, add the elements and link them
-bin = gst.Bin("audio_sink_bin")
-bin.add_many(equalizer, convert, sink)
-gst.element_link_many(equalizer, convert, sink)
-pad = equalizer.get_static_pad("sink")
-ghost_pad = gst.GhostPad("sink", pad)
-ghost_pad.set_active(True)
-bin.add_pad(ghost_pad)
+def main():
+    uri = sys.argv[1] if len(sys.argv) > 1 else \
+        "https://www.freedesktop.org/software/gstreamer-sdk/data/media/sintel_trailer-480p.webm"
 
-#COnfigure the equalizer
-equalizer.set_property("band1", -24.0)
-equalizer.set_property("band2", -24.0)
+    Gst.init(None)
 
-#Set playbin2's audio sink to be our sink
-pipeline.set_property("audio-sink", bin)
+    # Build the pipeline. The URI is set as a property, so it may contain spaces
+    pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    pipeline.set_property("uri", uri)
 
-#Start playing
-pipeline.set_state(gst.STATE_PLAYING)
+    # Check the description and build the sink bin
+    try:
+        factory = SinkBinFactory("audio_sink_bin", AUDIO_SINK_BIN)
+    except ValueError as e:
+        print("Not all elements could be created: %s" % e, file=sys.stderr)
+        exit(-1)
 
-#Wait until error or EOS
-bus = pipeline.get_bus()
-bus.timed_pop_filtered(gst.CLOCK_TIME_NONE, gst.MESSAGE_ERROR | gst.MESSAGE_EOS)
+    # Set playbin's audio sink to be our sink
+    pipeline.set_property("audio-sink", factory.build())
 
-#Free resources
-pipeline.set_state(gst.STATE_NULL)
+    # Start playing
+    ret = pipeline.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        print("Unable to set the pipeline to the playing state.", file=sys.stderr)
+        exit(-1)
 
+    # Wait until error or EOS
+    bus = pipeline.get_bus()
+    msg = bus.timed_pop_filtered(Gst.CLOCK_TIME_NONE, Gst.MessageType.ERROR | Gst.MessageType.EOS)
 
+    # Free resources
+    pipeline.set_state(Gst.State.NULL)
 
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Prefetch benchmark: reads a file through the caching proxy from the local
+throttled server, the first half sequentially and then the last quarter after
+a seek, with different numbers of parallel prefetch connections.
+
+    python3 prefetch-benchmark.py [--size BYTES] [--bandwidth BYTES] [--latency SECONDS]
+
+The reader consumes data at --read-rate bytes per second (0 for as fast as
+possible), roughly what a player with a full queue does.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import urllib.request
+
+from mediaserver import ThrottledMediaServer, parse_size
+from rangecache import CachingProxy, RangeCache
+
+CHUNK_SIZE = 64 * 1024
+
+
+# Read [start, stop) of uri at read_rate bytes/s, returns
+# (time to first byte, total time)
+def read(uri, start, stop, read_rate):
+    started = time.monotonic()
+    request = urllib.request.Request(uri, headers={"Range": "bytes=%d-%d" % (start, stop - 1)})
+    first_byte = None
+    received = 0
+    with urllib.request.urlopen(request) as response:
+        while True:
+            data = response.read(CHUNK_SIZE)
+            if not data:
+                break
+            if first_byte is None:
+                first_byte = time.monotonic() - started
+            received += len(data)
+            if read_rate:
+                ahead = received / read_rate - (time.monotonic() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+    return first_byte, time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel range prefetch benchmark")
+    parser.add_argument("--size", type=parse_size, default=parse_size("8M"))
+    parser.add_argument("--bandwidth", type=parse_size, default=parse_size("256k"),
+                        help="per-connection server bandwidth")
+    parser.add_argument("--latency", type=float, default=0.15)
+    parser.add_argument("--read-rate", type=parse_size, default=0)
+    parser.add_argument("--connections", type=int, nargs="+", default=[0, 1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media_dir = os.path.join(tmp, "media")
+        os.mkdir(media_dir)
+        with open(os.path.join(media_dir, "test.bin"), "wb") as f:
+            f.write(os.urandom(args.size))
+
+        print("%d bytes, %.0f KiB/s per connection, %.0f ms latency" %
+              (args.size, args.bandwidth / 1024, args.latency * 1000))
+        print("%-12s %12s %12s %12s %12s" %
+              ("connections", "first byte", "sequential", "seek ttfb", "after seek"))
+        for connections in args.connections:
+            cache_dir = os.path.join(tmp, "cache-%d" % connections)
+            with ThrottledMediaServer(media_dir, bandwidth=args.bandwidth,
+                                      latency=args.latency, seed=0) as server:
+                with CachingProxy(RangeCache(cache_dir),
+                                  prefetch_connections=connections) as proxy:
+                    uri = proxy.uri(server.uri("test.bin"))
+                    # Sequential playback of the first half, then a seek to 3/4
+                    ttfb, sequential = read(uri, 0, args.size // 2, args.read_rate)
+                    seek_ttfb, after_seek = read(uri, args.size * 3 // 4, args.size,
+                                                 args.read_rate)
+            print("%-12s %11.3fs %11.3fs %11.3fs %11.3fs" %
+                  (connections or "none", ttfb, sequential, seek_ttfb, after_seek))
+
+
+if __name__ == '__main__':
+    main()
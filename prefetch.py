@@ -0,0 +1,185 @@
+"""
+Parallel byte-range prefetcher for progressive HTTP playback
+
+Keeps a window of blocks ahead of the play position downloading over several
+pooled keep-alive HTTP connections and writes them into a rangecache entry.
+Blocks closest to the focus (the position being read, or the latest seek
+target) are always fetched first, so a seek immediately redirects every
+connection to the new region.
+
+    prefetcher = RangePrefetcher(entry, uri, connections=4)
+    prefetcher.start()
+    prefetcher.focus(offset)
+    entry.wait_for(offset, offset + 65536)
+"""
+
+import http.client
+import threading
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+from rangeset import RangeSet
+
+BLOCK_SIZE = 256 * 1024  # Bytes fetched by one range request
+LOOKAHEAD = 32  # Blocks kept downloading ahead of the focus
+
+
+class RangePrefetcher:
+    def __init__(self, entry, uri, connections=4, block_size=BLOCK_SIZE, lookahead=LOOKAHEAD,
+                 timeout=30):
+        self.entry = entry
+        self.uri = uri
+        self.connections = connections
+        self.block_size = block_size
+        self.lookahead = lookahead
+        self.timeout = timeout
+        self.fetched_bytes = 0
+        self.requests = 0
+        self._focus = 0
+        self._in_flight = set()
+        self._failed = set()
+        self._running = False
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads = []
+        self._preexisting = None
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._preexisting = RangeSet(self.entry.segments_covered())
+        for i in range(self.connections):
+            thread = threading.Thread(target=self._worker, name="prefetch-%d" % i, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        with self._lock:
+            self._running = False
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    # True if [start, stop) was cached before this prefetcher started, so
+    # serving it did not cost any network traffic
+    def was_cached(self, start, stop):
+        return self._preexisting is not None and self._preexisting.contains(start, stop)
+
+    # True if a block overlapping [start, stop) failed and will not be
+    # fetched again until the focus moves to another block. Does not take
+    # the lock, so it can be called while holding the entry's lock.
+    def failed(self, start, stop):
+        failed = self._failed
+        return any(block in failed for block in range(start // self.block_size,
+                                                      (stop - 1) // self.block_size + 1))
+
+    # Move the prefetch window to offset (current read position or seek target)
+    def focus(self, offset):
+        with self._lock:
+            if offset // self.block_size != self._focus // self.block_size:
+                self._failed.clear()
+            self._focus = offset
+            self._wakeup.notify_all()
+
+    # The first block of the window, nearest the focus, that is neither
+    # cached nor being fetched by another connection
+    def _next_block(self):
+        first = self._focus // self.block_size
+        last = min(first + self.lookahead, (self.entry.size - 1) // self.block_size + 1)
+        for block in range(first, last):
+            if block in self._in_flight or block in self._failed:
+                continue
+            start = block * self.block_size
+            stop = min(start + self.block_size, self.entry.size)
+            if not self.entry.contains(start, stop):
+                return block
+        return None
+
+    def _worker(self):
+        connection = None
+        while True:
+            with self._lock:
+                block = None
+                while self._running:
+                    block = self._next_block()
+                    if block is not None:
+                        break
+                    self._wakeup.wait()
+                if not self._running:
+                    break
+                self._in_flight.add(block)
+
+            try:
+                connection = self._fetch(connection, block)
+            except (OSError, http.client.HTTPException):
+                if connection:
+                    connection.close()
+                connection = None
+                with self._lock:
+                    self._failed.add(block)
+                # Readers waiting for this block fetch it themselves
+                self.entry.wake()
+            finally:
+                with self._lock:
+                    self._in_flight.discard(block)
+                    self._wakeup.notify_all()
+
+        if connection:
+            connection.close()
+
+    def _connect(self):
+        parts = urlsplit(self.uri)
+        if parts.scheme == "https":
+            return http.client.HTTPSConnection(parts.netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(parts.netloc, timeout=self.timeout)
+
+    # Fetch one block over a pooled connection, reconnecting once if the
+    # server closed the idle keep-alive connection under us
+    def _fetch(self, connection, block):
+        parts = urlsplit(self.uri)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        start = block * self.block_size
+        stop = min(start + self.block_size, self.entry.size)
+
+        for attempt in range(2):
+            if connection is None:
+                connection = self._connect()
+            try:
+                connection.request("GET", path, headers={"Range": "bytes=%d-%d" % (start, stop - 1)})
+                response = connection.getresponse()
+                break
+            except (ConnectionError, http.client.RemoteDisconnected):
+                connection.close()
+                connection = None
+                if attempt:
+                    raise
+
+        with self._lock:
+            self.requests += 1
+        if response.status != HTTPStatus.PARTIAL_CONTENT:
+            response.read()
+            raise http.client.HTTPException("range request answered with %d" % response.status)
+
+        offset = start
+        while offset < stop:
+            data = response.read(min(64 * 1024, stop - offset))
+            if not data:
+                raise http.client.IncompleteRead(b"", stop - offset)
+            self.entry.write(offset, data)
+            offset += len(data)
+            with self._lock:
+                self.fetched_bytes += len(data)
+            with self.entry.cache.stats.lock:
+                self.entry.cache.stats.miss_bytes += len(data)
+            if not self._wanted(block):
+                # A seek moved the window away, free the connection for it
+                connection.close()
+                return None
+        return connection
+
+    def _wanted(self, block):
+        first = self._focus // self.block_size
+        return first <= block < first + self.lookahead
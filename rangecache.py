@@ -0,0 +1,441 @@
+"""
+Persistent on-disk byte-range cache for progressive HTTP playback
+
+Every (URI, ETag) pair gets a sparse data file plus a small JSON index of the
+byte ranges already fetched. CachingProxy is a local HTTP server that sits
+between playbin and the origin: ranges that are in the cache are served from
+disk, the rest are fetched from the origin and written to the cache on the
+way through. Repeat plays and seeks into fetched regions never touch the
+network again.
+
+    cache = RangeCache(os.path.expanduser("~/.cache/gst-tutorials"))
+    with CachingProxy(cache) as proxy:
+        playbin.set_property("uri", proxy.uri(uri))
+    print(cache.stats)
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+import urllib.request
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+
+from prefetch import RangePrefetcher
+from rangeset import RangeSet
+
+CHUNK_SIZE = 64 * 1024  # Amount of bytes copied at once
+MAX_CACHE_SIZE = 1024 ** 3  # Default cap on the total size of cached data
+
+RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class CacheStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hit_bytes = 0
+        self.miss_bytes = 0
+
+    def hit_ratio(self):
+        total = self.hit_bytes + self.miss_bytes
+        return self.hit_bytes / total if total else 0.0
+
+    def __str__(self):
+        return ("%.1f%% hit ratio, %d bytes saved, %d bytes fetched" %
+                (100 * self.hit_ratio(), self.hit_bytes, self.miss_bytes))
+
+
+# Cached ranges of one version of one URI
+class CacheEntry:
+    def __init__(self, cache, key, uri, etag, size, content_type):
+        self.cache = cache
+        self.uri = uri
+        self.etag = etag
+        self.size = size
+        self.content_type = content_type
+        self.ranges = RangeSet()
+        self.data_path = os.path.join(cache.directory, key + ".data")
+        self.index_path = os.path.join(cache.directory, key + ".json")
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._dirty = False
+
+    def load(self):
+        try:
+            with open(self.index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if (index.get("uri") != self.uri or index.get("etag") != self.etag
+                or index.get("size") != self.size or not os.path.exists(self.data_path)):
+            return
+        for start, stop in index["ranges"]:
+            self.ranges.add(start, stop)
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            index = {"uri": self.uri, "etag": self.etag, "size": self.size,
+                     "content_type": self.content_type, "ranges": list(self.ranges)}
+            self._dirty = False
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp, self.index_path)
+
+    def segments(self, start, stop):
+        with self._lock:
+            return self.ranges.segments(start, stop)
+
+    def read(self, start, stop):
+        with open(self.data_path, "rb") as f:
+            f.seek(start)
+            return f.read(stop - start)
+
+    def write(self, offset, data):
+        with self._lock:
+            mode = "r+b" if os.path.exists(self.data_path) else "wb"
+            with open(self.data_path, mode) as f:
+                f.seek(offset)
+                f.write(data)
+            self.ranges.add(offset, offset + len(data))
+            self._dirty = True
+            self._changed.notify_all()
+
+    # Block until [start, stop) is cached. Returns False on timeout, or as
+    # soon as abandon() is true once a waiter is woken up.
+    def wait_for(self, start, stop, timeout=None, abandon=None):
+        with self._lock:
+            self._changed.wait_for(lambda: self.ranges.contains(start, stop) or
+                                   (abandon is not None and abandon()), timeout)
+            return self.ranges.contains(start, stop)
+
+    # Wake up the waiters, e.g. when the data they wait for will not come
+    def wake(self):
+        with self._lock:
+            self._changed.notify_all()
+
+    def contains(self, start, stop):
+        with self._lock:
+            return self.ranges.contains(start, stop)
+
+    # Snapshot of the cached (start, stop) ranges
+    def segments_covered(self):
+        with self._lock:
+            return list(self.ranges)
+
+    def cached_bytes(self):
+        with self._lock:
+            return self.ranges.total()
+
+
+class RangeCache:
+    def __init__(self, directory, max_size=MAX_CACHE_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.stats = CacheStats()
+        self._entries = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(uri, etag):
+        return hashlib.sha1(("%s\0%s" % (uri, etag)).encode("utf-8")).hexdigest()
+
+    # Get the entry for this version of uri, loading its index from disk
+    def entry(self, uri, etag, size, content_type="application/octet-stream"):
+        key = self.key(uri, etag)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.size != size:
+                entry = CacheEntry(self, key, uri, etag, size, content_type)
+                entry.load()
+                self._entries[key] = entry
+        return entry
+
+    def save(self):
+        with self._lock:
+            entries = list(self._entries.values())
+        for entry in entries:
+            entry.save()
+        self.evict()
+
+    # Drop least recently used entries until the cache fits in max_size
+    def evict(self):
+        with self._lock:
+            active = {entry.data_path for entry in self._entries.values()}
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".data"):
+                path = os.path.join(self.directory, name)
+                st = os.stat(path)
+                # Sparse files: count the blocks actually allocated
+                files.append((st.st_mtime, st.st_blocks * 512, path))
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in sorted(files):
+            if total <= self.max_size:
+                break
+            if path in active:
+                continue
+            for victim in (path, path[:-len(".data")] + ".json"):
+                try:
+                    os.remove(victim)
+                except OSError:
+                    pass
+            total -= size
+
+
+class CachingProxyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    chunked = False  # True while the body is sent with chunked encoding
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        upstream = unquote(self.path.lstrip("/"))
+        try:
+            entry, headers = self.server.lookup(upstream)
+        except OSError as e:
+            self.send_error(HTTPStatus.BAD_GATEWAY, str(e))
+            return
+
+        if entry is None and "Content-Length" not in headers:
+            self.pass_through(upstream, headers)
+            return
+
+        size = entry.size if entry else int(headers["Content-Length"])
+        start, stop = 0, size
+        status = HTTPStatus.OK
+        range_header = self.headers.get("Range")
+        if range_header:
+            match = RANGE_RE.match(range_header.strip())
+            if match and match.group(1):
+                start = int(match.group(1))
+                if match.group(2):
+                    stop = min(int(match.group(2)) + 1, size)
+            elif match and match.group(2):
+                start = max(0, size - int(match.group(2)))
+            if start >= size or start >= stop:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", "bytes */%d" % size)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = HTTPStatus.PARTIAL_CONTENT
+
+        self.send_response(status)
+        self.send_header("Content-Type", headers.get("Content-Type", "application/octet-stream"))
+        self.send_header("Content-Length", str(stop - start))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", "bytes %d-%d/%d" % (start, stop - 1, size))
+        self.end_headers()
+
+        try:
+            if entry is None:
+                # No validator: the response cannot be cached safely
+                self.copy_upstream(upstream, start, stop, None)
+                return
+            prefetcher = self.server.prefetcher(entry, upstream)
+            if prefetcher:
+                self.copy_prefetched(entry, prefetcher, upstream, start, stop)
+                return
+            for s, e, cached in entry.segments(start, stop):
+                if cached:
+                    self.copy_cached(entry, s, e)
+                elif not self.copy_upstream(upstream, s, e, entry):
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            if entry:
+                entry.save()
+
+    # The origin sent no length: without one there are no ranges to serve
+    # or cache, so the whole body is passed through with chunked encoding
+    def pass_through(self, upstream, headers):
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", headers.get("Content-Type", "application/octet-stream"))
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self.chunked = True
+        try:
+            if self.copy_upstream(upstream, 0, None, None):
+                self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def send_body(self, data):
+        if self.chunked:
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        else:
+            self.wfile.write(data)
+
+    def copy_cached(self, entry, start, stop):
+        stats = self.server.cache.stats
+        while start < stop:
+            data = entry.read(start, min(stop, start + CHUNK_SIZE))
+            self.send_body(data)
+            start += len(data)
+            with stats.lock:
+                stats.hit_bytes += len(data)
+
+    # Serve from the cache while the prefetcher fills it ahead of us. Every
+    # chunk moves the prefetch window along; a chunk that does not show up
+    # in time, or whose block the prefetcher failed to fetch, is fetched
+    # directly.
+    def copy_prefetched(self, entry, prefetcher, upstream, start, stop):
+        stats = self.server.cache.stats
+        while start < stop:
+            chunk_stop = min(stop, start + CHUNK_SIZE)
+            prefetcher.focus(start)
+            if prefetcher.was_cached(start, chunk_stop):
+                with stats.lock:
+                    stats.hit_bytes += chunk_stop - start
+            elif not entry.wait_for(start, chunk_stop, self.server.timeout,
+                                    lambda: prefetcher.failed(start, chunk_stop)):
+                if not self.copy_upstream(upstream, start, chunk_stop, entry):
+                    return
+                start = chunk_stop
+                continue
+            data = entry.read(start, chunk_stop)
+            self.send_body(data)
+            start += len(data)
+
+    # Copy [start, stop) from the origin (to its end if stop is None).
+    # Returns False if the origin failed or ended early: the headers are
+    # already sent, so the connection is closed to tell the client. The
+    # chunks received before that are complete and stay cached. Errors
+    # writing to the client are raised.
+    def copy_upstream(self, upstream, start, stop, entry):
+        stats = self.server.cache.stats
+        headers = {}
+        if start > 0 or stop is not None:
+            headers["Range"] = "bytes=%d-%s" % (start, "" if stop is None else stop - 1)
+        try:
+            response = urllib.request.urlopen(urllib.request.Request(upstream, headers=headers),
+                                              timeout=self.server.timeout)
+        except (OSError, http.client.HTTPException):
+            self.close_connection = True
+            return False
+        with response:
+            if response.status != HTTPStatus.PARTIAL_CONTENT and start > 0:
+                # Origin ignored the range, skip up to where we need to be
+                remaining = start
+                while remaining > 0:
+                    skipped = self.read_upstream(response, min(CHUNK_SIZE, remaining))
+                    if not skipped:
+                        self.close_connection = True
+                        return False
+                    remaining -= len(skipped)
+            while stop is None or start < stop:
+                data = self.read_upstream(response, CHUNK_SIZE if stop is None
+                                          else min(CHUNK_SIZE, stop - start))
+                if data is None or (not data and stop is not None):
+                    self.close_connection = True
+                    return False
+                if not data:
+                    break
+                if entry:
+                    entry.write(start, data)
+                self.send_body(data)
+                start += len(data)
+                with stats.lock:
+                    stats.miss_bytes += len(data)
+        return True
+
+    # Read from the origin; None if it failed
+    @staticmethod
+    def read_upstream(response, size):
+        try:
+            return response.read(size)
+        except (OSError, http.client.HTTPException):
+            return None
+
+
+class CachingProxy(ThreadingHTTPServer):
+    daemon_threads = True
+
+    # With prefetch_connections > 0, missing ranges are downloaded ahead of
+    # the reader by a RangePrefetcher over that many parallel connections.
+    def __init__(self, cache, host="127.0.0.1", port=0, timeout=30, revalidate=60,
+                 prefetch_connections=0):
+        super().__init__((host, port), CachingProxyHandler)
+        self.cache = cache
+        self.timeout = timeout
+        self.revalidate = revalidate
+        self.prefetch_connections = prefetch_connections
+        self._heads = {}
+        self._prefetchers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="cachingproxy", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            prefetchers = list(self._prefetchers.values())
+            self._prefetchers = {}
+        for prefetcher in prefetchers:
+            prefetcher.stop()
+        self.cache.save()
+
+    # The running prefetcher for entry, or None if prefetching is disabled
+    def prefetcher(self, entry, upstream):
+        if not self.prefetch_connections:
+            return None
+        with self._lock:
+            prefetcher = self._prefetchers.get(entry.data_path)
+            if prefetcher is None or prefetcher.entry is not entry:
+                prefetcher = RangePrefetcher(entry, upstream, self.prefetch_connections,
+                                             timeout=self.timeout)
+                prefetcher.start()
+                self._prefetchers[entry.data_path] = prefetcher
+        return prefetcher
+
+    # The local URI that serves uri through the cache
+    def uri(self, uri):
+        host, port = self.server_address[:2]
+        return "http://%s:%d/%s" % (host, port, quote(uri, safe=""))
+
+    # HEAD the origin (at most every revalidate seconds) to find the
+    # validator, and return the matching cache entry (None if uncacheable)
+    def lookup(self, upstream):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._heads.get(upstream)
+        if cached and now - cached[0] < self.revalidate:
+            headers = cached[1]
+        else:
+            request = urllib.request.Request(upstream, method="HEAD")
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                headers = dict(response.headers.items())
+            with self._lock:
+                self._heads[upstream] = (now, headers)
+
+        validator = headers.get("ETag") or headers.get("Last-Modified")
+        if not validator or "Content-Length" not in headers:
+            return None, headers
+        return self.cache.entry(upstream, validator, int(headers["Content-Length"]),
+                                headers.get("Content-Type", "application/octet-stream")), headers
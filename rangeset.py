@@ -0,0 +1,99 @@
+"""
+Sorted set of disjoint half-open byte (or time) ranges
+
+Adjacent and overlapping ranges are merged on insertion, so the set always
+holds the minimal list of [start, stop) intervals covering what was added.
+"""
+
+from bisect import bisect_left, bisect_right
+
+
+class RangeSet:
+    def __init__(self, ranges=()):
+        self._starts = []
+        self._stops = []
+        for start, stop in ranges:
+            self.add(start, stop)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return iter(zip(self._starts, self._stops))
+
+    def __repr__(self):
+        return "RangeSet(%r)" % list(self)
+
+    def __eq__(self, other):
+        return isinstance(other, RangeSet) and list(self) == list(other)
+
+    def clear(self):
+        self._starts = []
+        self._stops = []
+
+    def total(self):
+        return sum(stop - start for start, stop in self)
+
+    def add(self, start, stop):
+        if stop <= start:
+            return
+        # First range that ends at or after start, and first that begins after stop
+        lo = bisect_left(self._stops, start)
+        hi = bisect_right(self._starts, stop)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            stop = max(stop, self._stops[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._stops[lo:hi] = [stop]
+
+    def remove(self, start, stop):
+        if stop <= start:
+            return
+        lo = bisect_right(self._stops, start)
+        hi = bisect_left(self._starts, stop)
+        if lo >= hi:
+            return
+        keep = []
+        if self._starts[lo] < start:
+            keep.append((self._starts[lo], start))
+        if self._stops[hi - 1] > stop:
+            keep.append((stop, self._stops[hi - 1]))
+        self._starts[lo:hi] = [s for s, e in keep]
+        self._stops[lo:hi] = [e for s, e in keep]
+
+    # True if [start, stop) is entirely covered
+    def contains(self, start, stop):
+        i = bisect_right(self._starts, start) - 1
+        return i >= 0 and self._stops[i] >= stop
+
+    # The range containing position, or None
+    def find(self, position):
+        i = bisect_right(self._starts, position) - 1
+        if i >= 0 and position < self._stops[i]:
+            return self._starts[i], self._stops[i]
+        return None
+
+    # Split [start, stop) into (start, stop, covered) segments in order
+    def segments(self, start, stop):
+        result = []
+        i = max(0, bisect_right(self._starts, start) - 1)
+        position = start
+        while position < stop and i < len(self._starts):
+            s, e = self._starts[i], self._stops[i]
+            if e <= position:
+                i += 1
+                continue
+            if s > position:
+                result.append((position, min(s, stop), False))
+                position = min(s, stop)
+                continue
+            result.append((position, min(e, stop), True))
+            position = min(e, stop)
+            i += 1
+        if position < stop:
+            result.append((position, stop, False))
+        return result
+
+    # The uncovered parts of [start, stop)
+    def missing(self, start, stop):
+        return [(s, e) for s, e, covered in self.segments(start, stop) if not covered]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Rate-change benchmark: plays a clip and changes the forward rate a few times
+with each rate-change method of the trick-mode engine (flushing seek,
+non-flushing segment seek and instant rate change). For every change it
+records the longest gap between frames reaching the video sink in the second
+that follows, which is the visible stall.
+
+    python3 ratechange-benchmark.py [MEDIA_FILE]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from testmedia import make_test_media
+from trickmode import INSTANT_RATE_CHANGE, TrickModeEngine
+
+RATES = [1.5, 1.0, 0.5, 1.0, 1.25, 1.75, 1.0]  # Sequence of rates to switch to
+INTERVAL = 1.5  # Seconds between rate changes
+WINDOW = 1.0  # Seconds after a change in which we look for a stall
+
+
+def record_frame(pad, info, arrivals):
+    arrivals.append(time.monotonic())
+    return Gst.PadProbeReturn.OK
+
+
+def change_rate(data):
+    engine, rates, changes, loop = data
+    if not rates:
+        loop.quit()
+        return False
+    rate = rates.pop(0)
+    changes.append(time.monotonic())
+    engine.set_rate(rate)
+    return True
+
+
+# Returns the longest frame gap in ms after each change, and the method used
+def run(uri, method):
+    pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    pipeline.set_property("uri", uri)
+    video_sink = Gst.ElementFactory.make("fakesink", None)
+    video_sink.set_property("sync", True)
+    pipeline.set_property("video-sink", video_sink)
+    pipeline.set_property("audio-sink", Gst.ElementFactory.make("fakesink", None))
+    arrivals = []
+    video_sink.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, record_frame, arrivals)
+
+    engine = TrickModeEngine(pipeline, rate_change=method)
+    pipeline.set_state(Gst.State.PLAYING)
+    pipeline.get_state(Gst.CLOCK_TIME_NONE)
+
+    loop = GLib.MainLoop.new(None, False)
+    changes = []
+    GLib.timeout_add(int(INTERVAL * 1000), change_rate, (engine, list(RATES), changes, loop))
+    loop.run()
+    pipeline.set_state(Gst.State.NULL)
+
+    stalls = []
+    for changed in changes:
+        window = [changed] + [t for t in arrivals if changed < t <= changed + WINDOW]
+        gaps = [b - a for a, b in zip(window, window[1:])]
+        stalls.append(1000 * max(gaps) if gaps else 1000 * WINDOW)
+    return stalls, engine.last_change
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate-change stall benchmark")
+    parser.add_argument("media", nargs="?", help="media file to play (default: generate one)")
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = args.media
+        if not media:
+            media = os.path.join(tmp, "test.webm")
+            print("Generating test media %s" % media)
+            make_test_media(media, seconds=60, width=1280, height=720, framerate=30)
+        uri = Gst.filename_to_uri(os.path.abspath(media))
+
+        methods = [TrickModeEngine.CHANGE_FLUSH, TrickModeEngine.CHANGE_SEGMENT]
+        if INSTANT_RATE_CHANGE is not None:
+            methods.append(TrickModeEngine.CHANGE_INSTANT)
+        else:
+            print("Instant rate change needs GStreamer 1.18 or later, skipping it")
+
+        print("%-10s %14s %14s" % ("method", "average stall", "worst stall"))
+        for method in methods:
+            stalls, used = run(uri, method)
+            if used != method:
+                print("%-10s not supported by this pipeline" % method)
+                continue
+            print("%-10s %12.1fms %12.1fms" % (method, sum(stalls) / len(stalls), max(stalls)))
+
+
+if __name__ == '__main__':
+    main()
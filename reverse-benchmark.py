@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Reverse playback benchmark: plays a clip backwards from the end for a few
+seconds, once with a negative-rate seek on playbin (what basic-tutorial-13
+does for 'D') and once with the GOP-caching ReversePlayer, and reports
+frames per second and process CPU use. Both run unsynchronised, so the
+numbers show how fast each path can go.
+
+    python3 reverse-benchmark.py [MEDIA_FILE] [--seconds N]
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from reverse import ReversePlayer
+from testmedia import make_test_media
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def count_frame(pad, info, counter):
+    counter[0] += 1
+    return Gst.PadProbeReturn.OK
+
+
+def make_sink(counter):
+    sink = Gst.ElementFactory.make("fakesink", None)
+    sink.set_property("sync", False)
+    sink.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, count_frame, counter)
+    return sink
+
+
+def measure(seconds, counter):
+    loop = GLib.MainLoop.new(None, False)
+    GLib.timeout_add(int(seconds * 1000), loop.quit)
+    counter[0] = 0
+    cpu, wall = cpu_time(), time.monotonic()
+    loop.run()
+    cpu, wall = cpu_time() - cpu, time.monotonic() - wall
+    return counter[0] / wall, 100 * cpu / wall
+
+
+def run_playbin(uri, seconds):
+    counter = [0]
+    pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    pipeline.set_property("uri", uri)
+    pipeline.set_property("video-sink", make_sink(counter))
+    pipeline.set_property("audio-sink", Gst.ElementFactory.make("fakesink", None))
+    pipeline.set_state(Gst.State.PAUSED)
+    pipeline.get_state(Gst.CLOCK_TIME_NONE)
+    ret, duration = pipeline.query_duration(Gst.Format.TIME)
+    pipeline.seek(-1.0, Gst.Format.TIME, Gst.SeekFlags.FLUSH | Gst.SeekFlags.ACCURATE,
+                  Gst.SeekType.SET, 0, Gst.SeekType.SET, duration)
+    pipeline.set_state(Gst.State.PLAYING)
+    result = measure(seconds, counter)
+    pipeline.set_state(Gst.State.NULL)
+    return result
+
+
+def run_gop_cache(uri, seconds):
+    counter = [0]
+    player = ReversePlayer(uri, video_sink=make_sink(counter))
+    player.start()
+    result = measure(seconds, counter)
+    player.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reverse playback benchmark")
+    parser.add_argument("media", nargs="?", help="media file to play (default: generate one)")
+    parser.add_argument("--seconds", type=float, default=10.0, help="wall time per run")
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = args.media
+        if not media:
+            media = os.path.join(tmp, "test.webm")
+            print("Generating test media %s" % media)
+            make_test_media(media, seconds=60, width=1280, height=720, framerate=30,
+                            keyframe_interval=60)
+        uri = Gst.filename_to_uri(os.path.abspath(media))
+
+        print("%-16s %10s %10s" % ("path", "fps", "CPU"))
+        for name, run in (("negative rate", run_playbin), ("GOP cache", run_gop_cache)):
+            fps, cpu = run(uri, args.seconds)
+            print("%-16s %10.1f %9.1f%%" % (name, fps, cpu))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Reverse playback with a GOP cache
+
+Playing at a negative rate makes demuxers and decoders go back to the
+previous keyframe for every frame they output. ReversePlayer instead
+decodes one GOP forward, keeps its decoded frames in a memory-bounded cache
+and pushes them out in reverse order through an appsrc, then moves on to
+the GOP before it. Each frame is decoded once (GOPs larger than the cache
+are split, and only their earlier part is decoded again).
+
+    python3 reverse.py URI [START_SECONDS]
+"""
+
+import collections
+import sys
+import threading
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+MAX_CACHE_BYTES = 256 * 1024 * 1024  # Decoded frames kept per GOP
+PULL_TIMEOUT = 5 * Gst.SECOND
+
+
+class ReverseStats:
+    def __init__(self):
+        self.decoded_frames = 0
+        self.output_frames = 0
+        self.gops = 0
+        self.started = None
+        self.finished = None
+
+    def fps(self):
+        if self.started is None:
+            return 0.0
+        elapsed = (self.finished or time.monotonic()) - self.started
+        return self.output_frames / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        return ("%d frames out, %d decoded (%.2f per frame), %d GOP(s), %.1f fps" %
+                (self.output_frames, self.decoded_frames,
+                 self.decoded_frames / max(1, self.output_frames), self.gops, self.fps()))
+
+
+# Decodes [keyframe before stop, stop) of the video stream into raw frames
+class GopDecoder:
+    def __init__(self, uri, caps="video/x-raw,format=I420"):
+        self.pipeline = Gst.parse_launch(
+            "uridecodebin name=dec caps=video/x-raw uri=%s ! videoconvert ! %s ! "
+            "appsink name=sink sync=false max-buffers=8" % (uri, caps))
+        self.sink = self.pipeline.get_by_name("sink")
+        self.pipeline.set_state(Gst.State.PAUSED)
+        self.pipeline.get_state(Gst.CLOCK_TIME_NONE)
+        self.pipeline.set_state(Gst.State.PLAYING)
+
+    def duration(self):
+        ret, duration = self.pipeline.query_duration(Gst.Format.TIME)
+        return duration if ret else Gst.CLOCK_TIME_NONE
+
+    # Returns the caps and a list of samples ending before stop, oldest first.
+    # If the GOP does not fit in max_bytes, only its last part is kept.
+    def decode_window(self, stop, max_bytes, stats):
+        if stop <= 0:
+            return None, []
+        self.pipeline.seek(1.0, Gst.Format.TIME,
+                           Gst.SeekFlags.FLUSH | Gst.SeekFlags.KEY_UNIT | Gst.SeekFlags.SNAP_BEFORE,
+                           Gst.SeekType.SET, stop - 1, Gst.SeekType.SET, stop)
+        samples = []
+        size = 0
+        caps = None
+        while True:
+            sample = self.sink.emit("try-pull-sample", PULL_TIMEOUT)
+            if sample is None:
+                break
+            buffer = sample.get_buffer()
+            if buffer.pts == Gst.CLOCK_TIME_NONE or buffer.pts >= stop:
+                continue
+            stats.decoded_frames += 1
+            caps = sample.get_caps()
+            samples.append(sample)
+            size += buffer.get_size()
+            while size > max_bytes and len(samples) > 1:
+                size -= samples.pop(0).get_buffer().get_size()
+        return caps, samples
+
+    def close(self):
+        self.pipeline.set_state(Gst.State.NULL)
+
+
+class ReversePlayer:
+    def __init__(self, uri, video_sink=None, rate=1.0, max_bytes=MAX_CACHE_BYTES):
+        self.uri = uri
+        self.rate = abs(rate)
+        self.max_bytes = max_bytes
+        self.stats = ReverseStats()
+        self.decoder = GopDecoder(uri)
+        self.pipeline = Gst.Pipeline.new("reverse")
+        self.source = Gst.ElementFactory.make("appsrc", "source")
+        convert = Gst.ElementFactory.make("videoconvert", "convert")
+        self.sink = video_sink or Gst.ElementFactory.make("autovideosink", "sink")
+        self.source.set_property("format", Gst.Format.TIME)
+        self.source.set_property("block", True)
+        self.source.set_property("max-bytes", 16 * 1024 * 1024)
+        self.pipeline.add(self.source, convert, self.sink)
+        self.source.link(convert)
+        convert.link(self.sink)
+        self._thread = None
+        self._stopping = False
+        self._pushed = collections.deque()  # (output time, stream time) of each frame pushed
+
+    # The stream time of the frame being shown, or None before the first one
+    def position(self):
+        ret, out_time = self.pipeline.query_position(Gst.Format.TIME)
+        pushed = self._pushed
+        while ret and len(pushed) > 1 and pushed[1][0] <= out_time:
+            pushed.popleft()
+        return pushed[0][1] if pushed else None
+
+    def set_playing(self, playing):
+        self.pipeline.set_state(Gst.State.PLAYING if playing else Gst.State.PAUSED)
+
+    # Play backwards from position (default: the end of the stream)
+    def start(self, position=None):
+        if position is None:
+            position = self.decoder.duration()
+        self._stopping = False
+        self.stats.started = time.monotonic()
+        self.pipeline.set_state(Gst.State.PLAYING)
+        self._thread = threading.Thread(target=self._feed, args=(position,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping = True
+        self.pipeline.set_state(Gst.State.NULL)
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.decoder.close()
+
+    def _feed(self, position):
+        out_time = 0
+        while not self._stopping and position > 0:
+            caps, samples = self.decoder.decode_window(position, self.max_bytes, self.stats)
+            if not samples:
+                break
+            self.stats.gops += 1
+            if self.source.get_property("caps") is None:
+                self.source.set_property("caps", caps)
+
+            for sample in reversed(samples):
+                if self._stopping:
+                    return
+                buffer = sample.get_buffer().copy()
+                stream_time = buffer.pts
+                duration = buffer.duration
+                if duration == Gst.CLOCK_TIME_NONE:
+                    duration = Gst.SECOND // 25
+                buffer.pts = out_time
+                buffer.dts = Gst.CLOCK_TIME_NONE
+                buffer.duration = int(duration / self.rate)
+                self._pushed.append((out_time, stream_time))
+                out_time += buffer.duration
+                if self.source.emit("push-buffer", buffer) != Gst.FlowReturn.OK:
+                    return
+                self.stats.output_frames += 1
+
+            position = samples[0].get_buffer().pts
+            samples = None
+        self.stats.finished = time.monotonic()
+        self.source.emit("end-of-stream")
+
+
+def main():
+    Gst.init(None)
+
+    if len(sys.argv) < 2:
+        print("Usage: %s URI [START_SECONDS]" % sys.argv[0], file=sys.stderr)
+        exit(-1)
+    uri = sys.argv[1]
+    if not Gst.uri_is_valid(uri):
+        uri = Gst.filename_to_uri(uri)
+    position = int(float(sys.argv[2]) * Gst.SECOND) if len(sys.argv) > 2 else None
+
+    player = ReversePlayer(uri)
+    loop = GLib.MainLoop.new(None, False)
+    bus = player.pipeline.get_bus()
+    bus.add_signal_watch()
+    bus.connect("message::eos", lambda bus, msg: loop.quit())
+    bus.connect("message::error", lambda bus, msg: loop.quit())
+
+    player.start(position)
+    try:
+        loop.run()
+    except KeyboardInterrupt:
+        pass
+    player.stop()
+    print(player.stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Sink-bin benchmark: session start latency (new playbin to prerolled) with
+the audio sink bin of playback-tutorial-7 built for each session, and taken
+warm from a SinkBinPool. The pool is refilled between sessions, outside the
+measured time, as the main loop would do while idle.
+
+    python3 sinkbin-benchmark.py [MEDIA_FILE] [--sessions N] [--sink autoaudiosink]
+
+Without MEDIA_FILE a short clip is generated.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from sinkbins import SinkBinFactory, SinkBinPool
+from testmedia import make_test_media
+
+
+# Start a playbin with the given audio sink; returns seconds to preroll
+def start_session(uri, get_sink):
+    started = time.perf_counter()
+    playbin = Gst.ElementFactory.make("playbin", None)
+    playbin.set_property("uri", uri)
+    playbin.set_property("video-sink", Gst.ElementFactory.make("fakesink", None))
+    playbin.set_property("audio-sink", get_sink())
+    playbin.set_state(Gst.State.PAUSED)
+    ret, state, pending = playbin.get_state(10 * Gst.SECOND)
+    elapsed = time.perf_counter() - started
+    playbin.set_state(Gst.State.NULL)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        raise RuntimeError("session failed to preroll")
+    return elapsed
+
+
+def summary(latencies):
+    latencies = sorted(latencies)
+    return "%7.1fms median %7.1fms worst" % (1000 * latencies[len(latencies) // 2], 1000 * latencies[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sink-bin pool latency benchmark")
+    parser.add_argument("media", nargs="?", help="media file to play (default: generate one)")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--sink", default="autoaudiosink", help="sink at the end of the bin")
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    chain = [("equalizer-3bands", {"band1": -24.0, "band2": -24.0}),
+             ("audioconvert", {}),
+             (args.sink, {})]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = args.media
+        if not media:
+            media = os.path.join(tmp, "test.webm")
+            print("Generating test media %s" % media)
+            make_test_media(media, seconds=5)
+        uri = Gst.filename_to_uri(os.path.abspath(media))
+
+        # The description is checked once; without the pool each session builds its bin
+        factory = SinkBinFactory("audio_sink_bin", chain)
+        cold = [start_session(uri, factory.build) for i in range(args.sessions)]
+
+        pool = SinkBinPool(factory, size=2)
+        context = GLib.MainContext.default()
+        warm = []
+        for i in range(args.sessions):
+            warm.append(start_session(uri, pool.acquire))
+            while context.iteration(False):
+                pass
+        pool.close()
+
+        print("without pool: %s" % summary(cold))
+        print("with pool:    %s  (%s)" % (summary(warm), pool.stats))
+
+
+if __name__ == '__main__':
+    main()
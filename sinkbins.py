@@ -0,0 +1,160 @@
+"""
+Sink bins from declarative descriptions, with a pool of pre-warmed bins
+
+A SinkBinFactory is built from a description: a bin name and the chain of
+elements, each a factory name with its properties. The description is
+checked once, when the factory is made: every element factory must exist,
+every property must exist and accept its value, and each element's source
+pad template must be compatible with the next one's sink template. After
+that build() only creates, configures and links.
+
+SinkBinPool keeps a few bins already built and in READY (for sinks, READY is
+where devices are opened and auto sinks pick their real sink), so a session
+gets a warm bin and the pool builds a replacement while the main loop is
+idle. Programs that do not run the default main context between sessions
+call fill() when they have time.
+
+    factory = SinkBinFactory("audio_sink_bin", [
+        ("equalizer-3bands", {"band1": -24.0, "band2": -24.0}),
+        ("audioconvert", {}),
+        ("autoaudiosink", {}),
+    ])
+    pool = SinkBinPool(factory, size=2)
+    playbin.set_property("audio-sink", pool.acquire())
+"""
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+
+def pad_template_caps(factory, direction):
+    for template in factory.get_static_pad_templates():
+        if template.direction == direction and template.presence == Gst.PadPresence.ALWAYS:
+            return template.get_caps()
+    return None
+
+
+class SinkBinFactory:
+    # chain is a list of (factory name, {property: value}), source to sink.
+    # Raises ValueError if the description cannot work.
+    def __init__(self, name, chain):
+        self.name = name
+        self.chain = []
+        self._count = 0
+        for factory_name, properties in chain:
+            factory = Gst.ElementFactory.find(factory_name)
+            if factory is None:
+                raise ValueError("%s: no element factory '%s'" % (name, factory_name))
+            self._check_properties(factory, properties)
+            self.chain.append((factory, dict(properties)))
+        if not self.chain:
+            raise ValueError("%s: empty chain" % name)
+        if pad_template_caps(self.chain[0][0], Gst.PadDirection.SINK) is None:
+            raise ValueError("%s: %s has no sink pad" % (name, self.chain[0][0].get_name()))
+        for (upstream, _), (downstream, _) in zip(self.chain, self.chain[1:]):
+            src_caps = pad_template_caps(upstream, Gst.PadDirection.SRC)
+            sink_caps = pad_template_caps(downstream, Gst.PadDirection.SINK)
+            if src_caps is None or sink_caps is None or not src_caps.can_intersect(sink_caps):
+                raise ValueError("%s: %s cannot link to %s" %
+                                 (self.name, upstream.get_name(), downstream.get_name()))
+
+    def _check_properties(self, factory, properties):
+        element = factory.create(None)
+        if element is None:
+            raise ValueError("%s: could not create %s" % (self.name, factory.get_name()))
+        for prop, value in properties.items():
+            if element.find_property(prop) is None:
+                raise ValueError("%s: %s has no property '%s'" % (self.name, factory.get_name(), prop))
+            try:
+                element.set_property(prop, value)
+            except (TypeError, ValueError) as e:
+                raise ValueError("%s: %s.%s: %s" % (self.name, factory.get_name(), prop, e))
+
+    def build(self):
+        self._count += 1
+        bin = Gst.Bin.new("%s%d" % (self.name, self._count))
+        elements = []
+        for factory, properties in self.chain:
+            element = factory.create(None)
+            for prop, value in properties.items():
+                element.set_property(prop, value)
+            bin.add(element)
+            if elements:
+                elements[-1].link(element)
+            elements.append(element)
+        pad = elements[0].get_static_pad("sink")
+        ghost_pad = Gst.GhostPad.new("sink", pad)
+        ghost_pad.set_active(True)
+        bin.add_pad(ghost_pad)
+        return bin
+
+
+class PoolStats:
+    def __init__(self):
+        self.warm = 0
+        self.cold = 0
+        self.reused = 0
+
+    def __str__(self):
+        return "%d warm, %d cold, %d reused" % (self.warm, self.cold, self.reused)
+
+
+class SinkBinPool:
+    # Acquired bins are rebuilt from an idle callback on the default main
+    # context
+    def __init__(self, factory, size=2, state=Gst.State.READY):
+        self.factory = factory
+        self.size = size
+        self.state = state
+        self.stats = PoolStats()
+        self._bins = []
+        self._refill_id = None
+        self.fill()
+
+    def _warm(self, bin):
+        if bin.set_state(self.state) == Gst.StateChangeReturn.FAILURE:
+            bin.set_state(Gst.State.NULL)
+            return False
+        self._bins.append(bin)
+        return True
+
+    # Build bins until the pool is full
+    def fill(self):
+        while len(self._bins) < self.size:
+            if not self._warm(self.factory.build()):
+                break
+
+    def _refill(self):
+        # One bin per idle callback, so the main loop is never held up for long
+        if len(self._bins) < self.size and self._warm(self.factory.build()):
+            return len(self._bins) < self.size
+        self._refill_id = None
+        return False
+
+    def acquire(self):
+        if self._bins:
+            bin = self._bins.pop()
+            self.stats.warm += 1
+        else:
+            bin = self.factory.build()
+            self.stats.cold += 1
+        if self._refill_id is None:
+            self._refill_id = GLib.idle_add(self._refill)
+        return bin
+
+    # Return a bin once its pipeline is done with it. Bins still inside a
+    # pipeline are just shut down.
+    def release(self, bin):
+        bin.set_state(Gst.State.NULL)
+        if bin.get_parent() is None and len(self._bins) < self.size and self._warm(bin):
+            self.stats.reused += 1
+
+    def close(self):
+        if self._refill_id is not None:
+            GLib.source_remove(self._refill_id)
+            self._refill_id = None
+        for bin in self._bins:
+            bin.set_state(Gst.State.NULL)
+        self._bins = []
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Startup time: a profiler and lazily loaded GI namespaces
+
+Before a script does any work it imports gi, loads the typelib (and
+PyGObject overrides) of every namespace it names, and runs Gst.init(),
+which loads the plugin registry and checks every plugin file for changes,
+rescanning the ones that changed (all of them if there is no registry
+yet). The plugin of an element is only loaded when the first element of
+that factory is made.
+
+LazyNamespace stands in for a namespace and loads it, and runs its init,
+on first attribute access. That only saves time on a code path that never
+touches the namespace, e.g. a headless mode of a GUI script. It does not
+help basic-tutorial-5.py, whose startup uses Gst, Gtk and GstVideo alike,
+so that script still imports them up front.
+
+    from startup import LazyNamespace
+    Gst = LazyNamespace("Gst", "1.0", init=lambda Gst: Gst.init(None))
+    Gtk = LazyNamespace("Gtk", "3.0")
+
+The profiler runs jobs in fresh interpreters and breaks their startup
+down into phases, then reports the process time of the whole startup
+(interpreter, namespaces, Gst.init and making the elements) with a warm
+registry and a cold one (a new, empty registry file, so every plugin is
+scanned). The page cache is not dropped, so "cold" only concerns the
+registry. The lazy job only loads Gst, which is what a run that skips the
+other namespaces saves.
+
+    python3 startup.py [--namespaces Gst:1.0 GstVideo:1.0 Gtk:3.0] [--elements playbin] [--repeat 5]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+LOAD_TIMES = {}  # namespace -> seconds spent loading it through a LazyNamespace
+
+
+class LazyNamespace:
+    def __init__(self, name, version, init=None):
+        self.__dict__.update(_name=name, _version=version, _init=init, _module=None)
+
+    def _load(self):
+        if self._module is None:
+            started = time.perf_counter()
+            import gi
+            gi.require_version(self._name, self._version)
+            module = importlib.import_module("gi.repository." + self._name)
+            if self._init is not None:
+                self._init(module)
+            self.__dict__["_module"] = module
+            LOAD_TIMES[self._name] = time.perf_counter() - started
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return "<LazyNamespace %s-%s (%s)>" % (self._name, self._version, state)
+
+
+def init_gst(Gst):
+    Gst.init(None)
+
+
+# Runs in the child interpreter: load namespaces eagerly or lazily, make the
+# elements, and print the phases as JSON
+def child(mode, namespaces, elements):
+    phases = []
+
+    def timed(phase, function, *args):
+        started = time.perf_counter()
+        result = function(*args)
+        phases.append((phase, time.perf_counter() - started))
+        return result
+
+    timed("import gi", importlib.import_module, "gi")
+    if mode == "eager":
+        import gi
+        modules = {}
+        for name, version in namespaces:
+            timed("require_version %s" % name, gi.require_version, name, version)
+            modules[name] = timed("typelib %s" % name, importlib.import_module, "gi.repository." + name)
+        Gst = modules["Gst"]
+        timed("Gst.init", Gst.init, None)
+    else:
+        Gst = LazyNamespace("Gst", dict(namespaces)["Gst"], init=init_gst)
+    registry = Gst.Registry.get()
+    if mode == "lazy":
+        phases.append(("Gst (lazy)", LOAD_TIMES["Gst"]))
+    for element in elements:
+        timed("plugin for %s" % element, Gst.ElementFactory.make, element, None)
+    phases.append(("registry plugins", len(registry.get_plugin_list())))
+    print(json.dumps(phases))
+
+
+# Runs one child; returns (process wall seconds, [(phase, value)])
+def run_child(mode, namespaces, elements, env):
+    command = [sys.executable, os.path.abspath(__file__), "--child", mode,
+               "--namespaces"] + ["%s:%s" % namespace for namespace in namespaces]
+    if elements:
+        command += ["--elements"] + elements
+    started = time.perf_counter()
+    output = subprocess.run(command, env=env, check=True, stdout=subprocess.PIPE,
+                            universal_newlines=True).stdout
+    return time.perf_counter() - started, json.loads(output.splitlines()[-1])
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def parse_namespace(text):
+    name, _, version = text.partition(":")
+    return name, version or "1.0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GStreamer startup profiler")
+    parser.add_argument("--namespaces", nargs="+", type=parse_namespace,
+                        default=[("Gst", "1.0"), ("GstVideo", "1.0"), ("Gtk", "3.0")],
+                        help="NAME:VERSION loaded at startup, as basic-tutorial-5.py does")
+    parser.add_argument("--elements", nargs="*", default=["playbin"], help="elements the job makes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--child", choices=["eager", "lazy"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.namespaces, args.elements)
+        return
+
+    if "Gst" not in dict(args.namespaces):
+        args.namespaces.insert(0, ("Gst", "1.0"))
+
+    warm = dict(os.environ)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Registry only, without the check for changed plugins
+        cached = dict(warm, GST_REGISTRY_UPDATE="no")
+
+        walls, phases = [], {}
+        for i in range(args.repeat):
+            wall, child_phases = run_child("eager", args.namespaces, args.elements, warm)
+            walls.append(wall)
+            for phase, value in child_phases:
+                phases.setdefault(phase, []).append(value)
+        cached_init = median([dict(run_child("eager", args.namespaces, args.elements, cached)[1])["Gst.init"]
+                              for i in range(args.repeat)])
+        plugins = phases.pop("registry plugins")[0]
+        accounted = sum(median(values) for values in phases.values())
+
+        print("Eager startup, warm registry (%d plugins), median of %d:" % (plugins, args.repeat))
+        print("  %-28s %8.1fms" % ("interpreter and exit", 1000 * (median(walls) - accounted)))
+        for phase, values in phases.items():
+            if phase == "Gst.init":
+                init = median(values)
+                print("  %-28s %8.1fms" % ("Gst.init: registry load", 1000 * cached_init))
+                print("  %-28s %8.1fms" % ("Gst.init: plugin check", 1000 * max(init - cached_init, 0)))
+            else:
+                print("  %-28s %8.1fms" % (phase, 1000 * median(values)))
+
+        print("\n%-6s %14s %14s" % ("mode", "cold registry", "warm registry"))
+        for mode in ("eager", "lazy"):
+            cold = []
+            for i in range(args.repeat):
+                # A registry file that does not exist yet forces a full plugin scan
+                registry = os.path.join(tmp, "registry-%s-%d.bin" % (mode, i))
+                cold.append(run_child(mode, args.namespaces, args.elements,
+                                      dict(warm, GST_REGISTRY=registry))[0])
+            hot = [run_child(mode, args.namespaces, args.elements, warm)[0] for i in range(args.repeat)]
+            print("%-6s %12.1fms %12.1fms" % (mode, 1000 * median(cold), 1000 * median(hot)))
+
+
+if __name__ == '__main__':
+    main()
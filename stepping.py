@@ -0,0 +1,114 @@
+"""
+Frame stepping with STEP_DONE accounting
+
+FrameStepper sends step events to the video sink one at a time and waits for
+the matching STEP_DONE message before sending the next. Requests made while
+a step is in flight are merged into a single larger step, so holding down
+the "next frame" key never queues up a backlog of step events. Every step's
+latency, from the first request to STEP_DONE, is recorded.
+
+    stepper = FrameStepper(playbin)
+    bus.connect("message::step-done", lambda bus, msg: stepper.handle_message(msg))
+    stepper.step(5)
+"""
+
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+
+class StepStats:
+    def __init__(self):
+        self.requests = 0
+        self.steps = 0
+        self.frames = 0
+        self.latencies = []
+
+    def merged(self):
+        # Requests that were folded into another step instead of sent
+        return self.requests - self.steps
+
+    def average_latency(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def __str__(self):
+        return ("%d request(s) sent as %d step(s), %d frame(s), %.1fms average latency, "
+                "%.1fms worst" % (self.requests, self.steps, self.frames,
+                                  1000 * self.average_latency(),
+                                  1000 * max(self.latencies, default=0.0)))
+
+
+class FrameStepper:
+    # on_done(frames, latency) is called for each completed step
+    def __init__(self, pipeline, on_done=None, clock=time.monotonic):
+        self.pipeline = pipeline
+        self.on_done = on_done
+        self.clock = clock
+        self.stats = StepStats()
+        self.rate = 1.0
+        self._sink = None
+        self._pending = 0
+        self._pending_since = None
+        self._in_flight = 0
+        self._in_flight_since = None
+
+    # True while a step is in flight or merged steps are waiting to be sent
+    def busy(self):
+        return self._in_flight > 0 or self._pending > 0
+
+    # Returns False if the step event could not be sent
+    def step(self, count=1):
+        self.stats.requests += 1
+        if self._pending == 0:
+            self._pending_since = self.clock()
+        self._pending += count
+        if not self._in_flight:
+            return self._send()
+        return True
+
+    # Cancel steps that have not been sent yet
+    def cancel(self):
+        self._pending = 0
+        self._pending_since = None
+
+    def handle_message(self, msg):
+        if msg.type != Gst.MessageType.STEP_DONE or not self._in_flight:
+            return False
+        fmt, amount, rate, flush, intermediate, duration, eos = msg.parse_step_done()
+        if intermediate:
+            return True
+
+        latency = self.clock() - self._in_flight_since
+        self.stats.latencies.append(latency)
+        self.stats.frames += amount
+        frames = self._in_flight
+        self._in_flight = 0
+        self._in_flight_since = None
+        # Send the merged steps first, so busy() is right inside on_done
+        if eos:
+            self.cancel()
+        elif self._pending:
+            self._send()
+        if self.on_done:
+            self.on_done(frames, latency)
+        return True
+
+    def _send(self):
+        if self._sink is None:
+            # Step events go to the video sink; playbin creates it lazily
+            self._sink = self.pipeline.get_property("video-sink") or self.pipeline
+        count, since = self._pending, self._pending_since
+        self._pending = 0
+        self._pending_since = None
+        self._in_flight = count
+        self._in_flight_since = since
+        self.stats.steps += 1
+        if not self._sink.send_event(Gst.Event.new_step(Gst.Format.BUFFERS, count, abs(self.rate),
+                                                        True, False)):
+            self._in_flight = 0
+            self._in_flight_since = None
+            return False
+        return True
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Streaming benchmark: plays media from the local throttled HTTP server under a
+few network profiles and records startup time, rebuffer count and throughput.
+
+    python3 streaming-benchmark.py [MEDIA_FILE] [--profile NAME] [--duration SECONDS]
+    python3 streaming-benchmark.py --script basic-tutorial-12.py
+
+Without MEDIA_FILE a short WebM clip is generated first. With --script the
+given tutorial is run against the server instead (its URI is passed as the
+first argument). Startup time, rebuffers and stall time are then read from
+the "Buffering: ..." line the tutorial prints when it finishes, and shown as
+n/a for tutorials that print none or are stopped by --duration.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from buffering import BufferingController
+from mediaserver import ThrottledMediaServer
+from testmedia import make_test_media
+
+# The line BufferingStats prints at the end of a tutorial
+STATS_LINE = re.compile(r"^Buffering: startup (?:n/a|(?P<startup>[\d.]+)s), (?P<rebuffers>\d+) rebuffer\(s\), "
+                        r"(?P<stalled>[\d.]+)s stalled", re.MULTILINE)
+
+# name: (bandwidth in bytes/s, latency, jitter, [(stall offset, seconds)])
+PROFILES = {
+    "lan": (None, 0.0, 0.0, []),
+    "dsl": (512 * 1024, 0.03, 0.01, []),
+    "3g": (96 * 1024, 0.15, 0.05, []),
+    "flaky": (192 * 1024, 0.1, 0.08, [(512 * 1024, 2.0), (1536 * 1024, 3.0)]),
+}
+
+
+class RunResult:
+    def __init__(self):
+        self.startup_time = None
+        self.rebuffer_count = 0
+        self.stall_time = 0.0
+        self.wall_time = 0.0
+        self.throughput = 0.0
+        self.error = None
+
+
+def cb_message(bus, msg, pipeline, controller, result, loop):
+    if msg.type == Gst.MessageType.ERROR:
+        err, debug_info = msg.parse_error()
+        result.error = str(err)
+        loop.quit()
+    elif msg.type == Gst.MessageType.EOS:
+        loop.quit()
+    elif msg.type == Gst.MessageType.BUFFERING:
+        controller.handle_message(msg)
+    elif msg.type == Gst.MessageType.STATE_CHANGED and msg.src == pipeline:
+        old_state, new_state, pending_state = msg.parse_state_changed()
+        if new_state == Gst.State.PLAYING and result.startup_time is None:
+            result.startup_time = time.monotonic() - result.wall_time
+
+
+# Play uri through playbin with synchronised fake sinks, the way the
+# tutorials do, but without opening any windows
+def run_playbin(uri, max_duration):
+    result = RunResult()
+    pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    pipeline.set_property("uri", uri)
+    pipeline.set_property("video-sink", Gst.ElementFactory.make("fakesink", None))
+    pipeline.set_property("audio-sink", Gst.ElementFactory.make("fakesink", None))
+    controller = BufferingController(pipeline)
+    loop = GLib.MainLoop.new(None, False)
+
+    bus = pipeline.get_bus()
+    bus.add_signal_watch()
+    bus.connect("message", cb_message, pipeline, controller, result, loop)
+    GLib.timeout_add_seconds(max_duration, loop.quit)
+
+    result.wall_time = time.monotonic()
+    ret = pipeline.set_state(Gst.State.PLAYING)
+    if ret == Gst.StateChangeReturn.FAILURE:
+        result.error = "Unable to set the pipeline to the playing state."
+    else:
+        if ret == Gst.StateChangeReturn.NO_PREROLL:
+            controller.set_live(True)
+        loop.run()
+    result.wall_time = time.monotonic() - result.wall_time
+
+    pipeline.set_state(Gst.State.NULL)
+    bus.remove_signal_watch()
+
+    result.rebuffer_count = controller.stats.rebuffer_count
+    result.stall_time = controller.stats.total_stall_time
+    return result
+
+
+def run_script(script, uri, max_duration):
+    result = RunResult()
+    started = time.monotonic()
+    process = subprocess.Popen([sys.executable, script, uri], stdin=subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, universal_newlines=True)
+    try:
+        output = process.communicate(timeout=max_duration)[0]
+    except subprocess.TimeoutExpired:
+        # Stopped before it could print its stats
+        process.kill()
+        output = process.communicate()[0]
+    result.wall_time = time.monotonic() - started
+
+    match = STATS_LINE.search(output)
+    if match is None:
+        result.rebuffer_count = result.stall_time = None
+    else:
+        if match.group("startup"):
+            result.startup_time = float(match.group("startup"))
+        result.rebuffer_count = int(match.group("rebuffers"))
+        result.stall_time = float(match.group("stalled"))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming benchmark against a throttled local server")
+    parser.add_argument("media", nargs="?", help="media file to serve (default: generate one)")
+    parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                        help="network profile to run (repeatable, default: all)")
+    parser.add_argument("--duration", type=int, default=60, help="maximum seconds per run")
+    parser.add_argument("--script", help="tutorial script to run instead of the built-in player")
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = args.media
+        if not media:
+            media = os.path.join(tmp, "test.webm")
+            print("Generating test media %s" % media)
+            make_test_media(media)
+
+        print("%-8s %10s %10s %10s %10s %12s" %
+              ("profile", "startup", "rebuffers", "stalled", "wall", "throughput"))
+        for name in args.profile or sorted(PROFILES):
+            bandwidth, latency, jitter, stalls = PROFILES[name]
+            with ThrottledMediaServer(os.path.dirname(os.path.abspath(media)), bandwidth=bandwidth,
+                                      latency=latency, jitter=jitter, stalls=stalls,
+                                      seed=0) as server:
+                uri = server.uri(os.path.basename(media))
+                if args.script:
+                    result = run_script(args.script, uri, args.duration)
+                else:
+                    result = run_playbin(uri, args.duration)
+                result.throughput = server.stats.throughput()
+
+            if result.error:
+                print("%-8s error: %s" % (name, result.error), file=sys.stderr)
+                continue
+            startup = "n/a" if result.startup_time is None else "%.3fs" % result.startup_time
+            rebuffers = "n/a" if result.rebuffer_count is None else "%d" % result.rebuffer_count
+            stalled = "n/a" if result.stall_time is None else "%.3fs" % result.stall_time
+            print("%-8s %10s %10s %10s %9.3fs %7.1f KiB/s" %
+                  (name, startup, rebuffers, stalled, result.wall_time, result.throughput / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Indexed subtitle store
+
+Parses an SRT or WebVTT file once into a compact, array-backed interval
+index and saves it next to the subtitle file, so later runs (and seeks)
+never re-parse the text. The cues are sorted by start time and laid out as
+an implicit balanced interval tree: the middle cue of every slice is the
+node of that slice, and max_ends holds the latest end time of each node's
+subtree. "Which cues are active at t" is answered in O(log n + k).
+
+SubtitleFeeder pushes cues into an appsrc on demand, so playbin can show
+them through suburi="appsrc://" without parsing the file itself.
+
+    store = SubtitleStore.open("movie.en.srt")
+    for start, end, text in store.active_at(90 * Gst.SECOND):
+        ...
+"""
+
+import os
+import re
+import struct
+from array import array
+from bisect import bisect_right
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+INDEX_MAGIC = b"GSTSUBIX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<8sIqqI")  # magic, version, source size, source mtime, cue count
+
+TIMESTAMP_RE = re.compile(
+    r"(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{3})\s*-->\s*(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{3})")
+TAG_RE = re.compile(r"</?([a-zA-Z]+)[^>]*>")
+PANGO_TAGS = ("b", "i", "u", "s")
+
+
+def to_ns(hours, minutes, seconds, millis):
+    return (((int(hours or 0) * 60 + int(minutes)) * 60 + int(seconds)) * 1000 + int(millis)) * Gst.MSECOND
+
+
+# Escape text for Pango, keeping the simple styling tags both formats share
+def to_pango(text):
+    parts = []
+    position = 0
+    for match in TAG_RE.finditer(text):
+        parts.append(escape(text[position:match.start()]))
+        tag = match.group(1).lower()
+        if tag in PANGO_TAGS:
+            parts.append("</%s>" % tag if match.group(0).startswith("</") else "<%s>" % tag)
+        position = match.end()
+    parts.append(escape(text[position:]))
+    return "".join(parts)
+
+
+def escape(text):
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+# Parse SRT or WebVTT into (start, end, pango text) tuples. Both formats are
+# blocks separated by blank lines with a "start --> end" timing line.
+def parse_subtitles(text):
+    cues = []
+    for block in re.split(r"\n\s*\n", text.replace("\r\n", "\n").replace("\r", "\n")):
+        lines = block.strip("\n").split("\n")
+        for i, line in enumerate(lines):
+            match = TIMESTAMP_RE.search(line)
+            if match:
+                g = match.groups()
+                start, end = to_ns(*g[0:4]), to_ns(*g[4:8])
+                body = "\n".join(lines[i + 1:]).strip()
+                if body and end > start:
+                    cues.append((start, end, to_pango(body)))
+                break
+    return cues
+
+
+class SubtitleIndex:
+    def __init__(self, starts, ends, text_offsets, text_data):
+        self.starts = starts
+        self.ends = ends
+        self.text_offsets = text_offsets
+        self.text_data = text_data
+        self.max_ends = array('q', bytes(8 * len(starts)))
+        self._build(0, len(starts))
+
+    @classmethod
+    def from_cues(cls, cues):
+        cues = sorted(cues)
+        starts = array('q', (c[0] for c in cues))
+        ends = array('q', (c[1] for c in cues))
+        text_offsets = array('q', [0])
+        chunks = []
+        for c in cues:
+            encoded = c[2].encode("utf-8")
+            chunks.append(encoded)
+            text_offsets.append(text_offsets[-1] + len(encoded))
+        return cls(starts, ends, text_offsets, b"".join(chunks))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return -1
+        mid = (lo + hi) // 2
+        self.max_ends[mid] = max(self.ends[mid], self._build(lo, mid), self._build(mid + 1, hi))
+        return self.max_ends[mid]
+
+    def text(self, i):
+        return self.text_data[self.text_offsets[i]:self.text_offsets[i + 1]].decode("utf-8")
+
+    def cue(self, i):
+        return self.starts[i], self.ends[i], self.text(i)
+
+    # Indices of the cues active at t (start <= t < end), in start order
+    def active_indices(self, t):
+        result = []
+        stack = [(0, len(self.starts))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_ends[mid] <= t:
+                # Nothing in this subtree lasts until t
+                continue
+            if self.starts[mid] <= t:
+                if t < self.ends[mid]:
+                    result.append(mid)
+                stack.append((mid + 1, hi))
+            stack.append((lo, mid))
+        return sorted(result)
+
+    def active_at(self, t):
+        return [self.cue(i) for i in self.active_indices(t)]
+
+    # Index of the first cue starting after t
+    def next_after(self, t):
+        return bisect_right(self.starts, t)
+
+    def save(self, path, source_size, source_mtime):
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, source_size, source_mtime,
+                                      len(self.starts)))
+            self.starts.tofile(f)
+            self.ends.tofile(f)
+            self.text_offsets.tofile(f)
+            f.write(self.text_data)
+        os.replace(tmp, path)
+
+    # Load a saved index, or return None if it is missing or out of date
+    @classmethod
+    def load(cls, path, source_size, source_mtime):
+        try:
+            with open(path, "rb") as f:
+                magic, version, size, mtime, count = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                if (magic, version, size, mtime) != (INDEX_MAGIC, INDEX_VERSION, source_size, source_mtime):
+                    return None
+                starts, ends, text_offsets = array('q'), array('q'), array('q')
+                starts.fromfile(f, count)
+                ends.fromfile(f, count)
+                text_offsets.fromfile(f, count + 1)
+                text_data = f.read()
+        except (OSError, EOFError, struct.error):
+            return None
+        if len(text_data) != text_offsets[-1]:
+            return None
+        return cls(starts, ends, text_offsets, text_data)
+
+
+class SubtitleStore:
+    INDEX_SUFFIX = ".subidx"
+
+    # Open the index saved next to path, building (and saving) it if needed
+    @staticmethod
+    def open(path, index_path=None):
+        index_path = index_path or path + SubtitleStore.INDEX_SUFFIX
+        st = os.stat(path)
+        mtime = st.st_mtime_ns
+        index = SubtitleIndex.load(index_path, st.st_size, mtime)
+        if index is None:
+            with open(path, encoding="utf-8-sig", errors="replace") as f:
+                index = SubtitleIndex.from_cues(parse_subtitles(f.read()))
+            try:
+                index.save(index_path, st.st_size, mtime)
+            except OSError:
+                # Read-only location: keep the index in memory only
+                pass
+        return index
+
+
+# Feeds cues from a SubtitleIndex into an appsrc. After a seek it starts
+# with the cues active at the new position, so nothing is re-parsed.
+class SubtitleFeeder:
+    CAPS = "text/x-raw,format=pango-markup"
+
+    def __init__(self, appsrc, index):
+        self.appsrc = appsrc
+        self.index = index
+        self._active = []  # cues active at the seek position, still to be sent
+        self._next = 0  # first cue starting after it
+        appsrc.set_property("caps", Gst.Caps.from_string(self.CAPS))
+        appsrc.set_property("format", Gst.Format.TIME)
+        appsrc.set_property("stream-type", 1)  # GST_APP_STREAM_TYPE_SEEKABLE
+        appsrc.connect("need-data", self._need_data)
+        appsrc.connect("seek-data", self._seek_data)
+
+    def _seek_data(self, appsrc, position):
+        # Reversed, so they are sent in order by popping from the end
+        self._active = self.index.active_indices(position)[::-1]
+        self._next = self.index.next_after(position)
+        return True
+
+    def _need_data(self, appsrc, length):
+        if self._active:
+            i = self._active.pop()
+        elif self._next < len(self.index):
+            i = self._next
+            self._next += 1
+        else:
+            appsrc.emit("end-of-stream")
+            return
+        start, end, text = self.index.cue(i)
+        buffer = Gst.Buffer.new_wrapped(text.encode("utf-8"))
+        buffer.pts = start
+        buffer.duration = end - start
+        appsrc.emit("push-buffer", buffer)
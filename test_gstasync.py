@@ -0,0 +1,62 @@
+import asyncio
+import gc
+
+import pytest
+
+gi = pytest.importorskip("gi")
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from gstasync import AsyncPipeline, PipelineError
+
+Gst.init(None)
+
+
+def post_ticks(pipeline, count):
+    bus = pipeline.get_bus()
+    for i in range(count):
+        bus.post(Gst.Message.new_application(pipeline, Gst.Structure.new_empty("tick")))
+
+
+def test_break_unsubscribes():
+    async def run():
+        pipeline = Gst.Pipeline.new(None)
+        adapter = AsyncPipeline(pipeline, loop=asyncio.get_running_loop())
+        post_ticks(pipeline, 3)
+        async for msg in adapter.bus:
+            break
+        gc.collect()
+        assert len(adapter.bus) == 0
+        adapter.close()
+
+    asyncio.run(run())
+
+
+def test_subscription_context_closes():
+    async def run():
+        pipeline = Gst.Pipeline.new(None)
+        adapter = AsyncPipeline(pipeline, loop=asyncio.get_running_loop())
+        post_ticks(pipeline, 2)
+        async with adapter.bus.subscribe() as messages:
+            assert len(adapter.bus) == 1
+            msg = await messages.__anext__()
+            assert msg.type == Gst.MessageType.APPLICATION
+        assert len(adapter.bus) == 0
+        adapter.close()
+
+    asyncio.run(run())
+
+
+def test_failed_state_change_keeps_other_messages():
+    async def run():
+        pipeline = Gst.parse_launch("filesrc location=/nonexistent/file ! fakesink")
+        adapter = AsyncPipeline(pipeline, loop=asyncio.get_running_loop())
+        post_ticks(pipeline, 1)
+        messages = adapter.bus.subscribe()
+        with pytest.raises(PipelineError):
+            await adapter.set_state_async(Gst.State.PAUSED)
+        msg = await messages.__anext__()
+        assert msg.type == Gst.MessageType.APPLICATION
+        adapter.close()
+
+    asyncio.run(run())
@@ -0,0 +1,43 @@
+import pytest
+
+gi = pytest.importorskip("gi")
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from pipelinetemplate import PipelineTemplate, fill, placeholders, tokenize
+
+Gst.init(None)
+
+
+def test_caps_list_is_not_a_placeholder():
+    assert placeholders("video/x-raw,format={I420,NV12}") == set()
+    assert placeholders("video/x-raw,format={ I420, NV12 },width={width}") == {"width"}
+    assert fill("video/x-raw,format={I420,NV12},width={width}", {"width": 320}) == \
+        "video/x-raw,format={I420,NV12},width=320"
+
+
+def test_template_with_caps_list():
+    template = PipelineTemplate("videotestsrc num-buffers={buffers} ! "
+                                "video/x-raw,format={I420,NV12} ! fakesink")
+    assert template.placeholders == {"buffers"}
+    pipeline = template.instantiate(buffers=1)
+    capsfilter = [element for element in pipeline.iterate_elements()
+                  if element.get_factory().get_name() == "capsfilter"][0]
+    caps = capsfilter.get_property("caps").to_string()
+    assert "I420" in caps and "NV12" in caps
+
+
+def test_tokenize_like_gst_launch():
+    assert tokenize("a!b") == ["a", "!", "b"]
+    assert tokenize("videotestsrc ! video/x-raw, format=I420 ! fakesink") == \
+        ["videotestsrc", "!", "video/x-raw, format=I420", "!", "fakesink"]
+    assert tokenize('filesrc location="a b.webm"') == ["filesrc", "location=a b.webm"]
+    with pytest.raises(ValueError):
+        tokenize('filesrc location="a b.webm')
+
+
+def test_caps_with_spaces():
+    pipeline = PipelineTemplate("videotestsrc num-buffers=1!video/x-raw, format=I420!fakesink").instantiate()
+    capsfilter = [element for element in pipeline.iterate_elements()
+                  if element.get_factory().get_name() == "capsfilter"][0]
+    assert "I420" in capsfilter.get_property("caps").to_string()
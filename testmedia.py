@@ -0,0 +1,33 @@
+"""
+Test media generation for the benchmarks
+
+Encodes videotestsrc/audiotestsrc into a WebM (VP8/Vorbis) file, so the
+benchmarks can run offline against content with known properties.
+"""
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+
+# Encode a clip of the given length. keyframe_interval is in frames.
+def make_test_media(path, seconds=20, width=854, height=480, framerate=24,
+                    keyframe_interval=48, bitrate=1500000, audio=True):
+    description = (
+        "videotestsrc num-buffers=%d pattern=ball ! video/x-raw,width=%d,height=%d,framerate=%d/1 ! "
+        "vp8enc deadline=1 keyframe-max-dist=%d target-bitrate=%d ! "
+        "webmmux name=mux ! filesink location=%s" %
+        (seconds * framerate, width, height, framerate, keyframe_interval, bitrate, path))
+    if audio:
+        description += (" audiotestsrc num-buffers=%d ! audioconvert ! vorbisenc ! mux." %
+                        (seconds * 44100 // 1024))
+
+    pipeline = Gst.parse_launch(description)
+    pipeline.set_state(Gst.State.PLAYING)
+    msg = pipeline.get_bus().timed_pop_filtered(Gst.CLOCK_TIME_NONE,
+                                                Gst.MessageType.ERROR | Gst.MessageType.EOS)
+    pipeline.set_state(Gst.State.NULL)
+    if msg.type == Gst.MessageType.ERROR:
+        err, debug_info = msg.parse_error()
+        raise RuntimeError("Could not create test media: %s" % err)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Trick-mode benchmark: plays a clip at several rates, once with the plain
+flushing accurate seek of basic-tutorial-13 and once through the trick-mode
+engine, and reports process CPU use and frames reaching the video sink.
+
+    python3 trickmode-benchmark.py [MEDIA_FILE] [--seconds N] [--rates 1 2 4 8 16 32]
+
+Without MEDIA_FILE a 1080p clip with a keyframe every 2 seconds is generated.
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+from testmedia import make_test_media
+from trickmode import TrickModeEngine
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def count_frame(pad, info, counter):
+    counter[0] += 1
+    return Gst.PadProbeReturn.OK
+
+
+# Play uri at rate for the given wall time, returns (CPU %, frames per second)
+def run(uri, rate, seconds, use_engine):
+    pipeline = Gst.ElementFactory.make("playbin", "playbin")
+    pipeline.set_property("uri", uri)
+    video_sink = Gst.ElementFactory.make("fakesink", None)
+    video_sink.set_property("sync", True)
+    pipeline.set_property("video-sink", video_sink)
+    pipeline.set_property("audio-sink", Gst.ElementFactory.make("fakesink", None))
+    counter = [0]
+    video_sink.get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER, count_frame, counter)
+
+    pipeline.set_state(Gst.State.PAUSED)
+    pipeline.get_state(Gst.CLOCK_TIME_NONE)
+    engine = TrickModeEngine(pipeline)
+    if use_engine:
+        engine.set_rate(rate)
+    else:
+        pipeline.send_event(Gst.Event.new_seek(rate, Gst.Format.TIME,
+                                               Gst.SeekFlags.FLUSH | Gst.SeekFlags.ACCURATE,
+                                               Gst.SeekType.SET, 0, Gst.SeekType.END, 0))
+        pipeline.set_state(Gst.State.PLAYING)
+    pipeline.get_state(Gst.CLOCK_TIME_NONE)
+
+    loop = GLib.MainLoop.new(None, False)
+    GLib.timeout_add(int(seconds * 1000), loop.quit)
+    counter[0] = 0
+    cpu, wall = cpu_time(), time.monotonic()
+    loop.run()
+    cpu, wall = cpu_time() - cpu, time.monotonic() - wall
+
+    engine.stop()
+    pipeline.set_state(Gst.State.NULL)
+    return 100 * cpu / wall, counter[0] / wall, engine.mode if use_engine else "accurate"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trick-mode CPU benchmark")
+    parser.add_argument("media", nargs="?", help="media file to play (default: generate one)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="wall time per run")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        media = args.media
+        if not media:
+            media = os.path.join(tmp, "test.webm")
+            print("Generating test media %s" % media)
+            make_test_media(media, seconds=120, width=1920, height=1080, framerate=30,
+                            keyframe_interval=60, bitrate=4000000)
+        uri = Gst.filename_to_uri(os.path.abspath(media))
+
+        print("%6s  %-10s %8s %8s   %-10s %8s %8s" %
+              ("rate", "plain", "CPU", "fps", "engine", "CPU", "fps"))
+        for rate in args.rates:
+            plain = run(uri, rate, args.seconds, False)
+            engine = run(uri, rate, args.seconds, True)
+            print("%6g  %-10s %7.1f%% %8.1f   %-10s %7.1f%% %8.1f" %
+                  (rate, plain[2], plain[0], plain[1], engine[2], engine[0], engine[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Trick-mode engine for fast-forward and rewind
+
+Picks the cheapest way to play at a given rate so decode load stays bounded:
+
+  normal     |rate| < key_unit_rate: flushing accurate seek, every frame
+             is decoded (what the tutorials do at any rate)
+  key-units  key_unit_rate <= |rate| < scrub_rate: TRICKMODE_KEY_UNITS and
+             TRICKMODE_NO_AUDIO, only keyframes are decoded and no audio
+  scrub      |rate| >= scrub_rate: the pipeline stays PAUSED and we jump
+             from keyframe to keyframe scrub_fps times per second, so the
+             decoder sees at most scrub_fps frames per second no matter
+             how fast we go
+
+Forward rate changes that stay in normal mode are applied without a flush:
+with an instant-rate-change seek where GStreamer supports it (1.18 and
+later), otherwise with a non-flushing seek that takes effect once the data
+already queued has played out. That seek starts where the queued data
+ends, as reported by a position query sent upstream from each sink (the
+demuxer answers with the last timestamp it pushed), so nothing is played
+twice. With audio and video queued to different points it starts from
+the furthest one, and the other stream skips the difference.
+
+    engine = TrickModeEngine(playbin)
+    engine.set_rate(16.0)
+"""
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+KEY_UNIT_RATE = 2.0  # From this speed on, only decode keyframes
+SCRUB_RATE = 8.0  # From this speed on, step through keyframes ourselves
+SCRUB_FPS = 4  # Keyframes shown per second while scrubbing
+
+TRICKMODE_FLAGS = (Gst.SeekFlags.TRICKMODE | Gst.SeekFlags.TRICKMODE_KEY_UNITS |
+                   Gst.SeekFlags.TRICKMODE_NO_AUDIO)
+
+# Only available from GStreamer 1.18 on
+INSTANT_RATE_CHANGE = getattr(Gst.SeekFlags, "INSTANT_RATE_CHANGE", None)
+
+
+# The sink elements of bin at any depth. A bin holding sinks is flagged as
+# a sink itself, so only those bins are entered.
+def sink_elements(bin):
+    for element in bin.iterate_sinks():
+        if isinstance(element, Gst.Bin):
+            yield from sink_elements(element)
+        else:
+            yield element
+
+
+class TrickModeEngine:
+    MODE_NORMAL = "normal"
+    MODE_KEY_UNITS = "key-units"
+    MODE_SCRUB = "scrub"
+
+    # How the last rate change was applied
+    CHANGE_FLUSH = "flush"
+    CHANGE_SEGMENT = "segment"
+    CHANGE_INSTANT = "instant"
+    CHANGE_SCRUB = "scrub"  # keyframe seeks on a timer, see _scrub_step()
+
+    # rate_change picks how normal-mode rate changes are applied: None for
+    # the cheapest available method, or one of the CHANGE_* values
+    def __init__(self, pipeline, key_unit_rate=KEY_UNIT_RATE, scrub_rate=SCRUB_RATE,
+                 scrub_fps=SCRUB_FPS, rate_change=None):
+        self.pipeline = pipeline
+        self.key_unit_rate = key_unit_rate
+        self.scrub_rate = scrub_rate
+        self.scrub_fps = scrub_fps
+        self.rate_change = rate_change
+        self.last_change = None
+        self.rate = 1.0
+        self.mode = self.MODE_NORMAL
+        self.playing = True
+        self._scrub_source = 0
+        self._scrub_position = 0
+
+    def mode_for_rate(self, rate):
+        if abs(rate) >= self.scrub_rate:
+            return self.MODE_SCRUB
+        if abs(rate) >= self.key_unit_rate:
+            return self.MODE_KEY_UNITS
+        return self.MODE_NORMAL
+
+    def query_position(self):
+        if self.mode == self.MODE_SCRUB:
+            # The pipeline position lags behind our own while scrubbing
+            return True, self._scrub_position
+        return self.pipeline.query_position(Gst.Format.TIME)
+
+    # Continues from position if given (always with a flushing seek),
+    # otherwise from the current position
+    def set_rate(self, rate, position=None):
+        moved = position is not None
+        if not moved:
+            ret, position = self.query_position()
+            if not ret:
+                return False
+
+        old_rate, old_mode = self.rate, self.mode
+        self.rate = rate
+        mode = self.mode_for_rate(rate)
+        if mode == self.MODE_SCRUB:
+            self._start_scrub(position)
+            self.last_change = self.CHANGE_SCRUB
+            return True
+
+        # Staying in normal mode in the same direction: no need to throw away
+        # what is already decoded and queued
+        if (mode == old_mode == self.MODE_NORMAL and (rate > 0) == (old_rate > 0)
+                and self.rate_change != self.CHANGE_FLUSH and not moved):
+            method = self._change_rate_without_flush(rate, position)
+            if method:
+                self.last_change = method
+                if self.playing:
+                    self.pipeline.set_state(Gst.State.PLAYING)
+                return True
+
+        self._stop_scrub()
+        self.mode = mode
+        flags = Gst.SeekFlags.FLUSH
+        if mode == self.MODE_KEY_UNITS:
+            flags |= TRICKMODE_FLAGS
+        else:
+            flags |= Gst.SeekFlags.ACCURATE
+        if not self._seek(rate, flags, position):
+            return False
+        self.last_change = self.CHANGE_FLUSH
+        if self.playing:
+            self.pipeline.set_state(Gst.State.PLAYING)
+        return True
+
+    def _change_rate_without_flush(self, rate, position):
+        if INSTANT_RATE_CHANGE is not None and self.rate_change in (None, self.CHANGE_INSTANT):
+            event = Gst.Event.new_seek(rate, Gst.Format.TIME, INSTANT_RATE_CHANGE,
+                                       Gst.SeekType.NONE, 0, Gst.SeekType.NONE, 0)
+            if self.pipeline.send_event(event):
+                return self.CHANGE_INSTANT
+        if self.rate_change in (None, self.CHANGE_SEGMENT):
+            # A non-flushing seek: the new segment follows the queued data
+            if self._seek(rate, Gst.SeekFlags.NONE, self._queued_position(rate, position)):
+                return self.CHANGE_SEGMENT
+        return None
+
+    # Where the data already queued between the demuxer and the sinks ends
+    # in the playback direction, or position if upstream cannot tell. The
+    # sinks are looked for at any depth: playbin's only direct sink child
+    # is playsink, whose sink pads are request pads.
+    def _queued_position(self, rate, position):
+        queued = []
+        for sink in sink_elements(self.pipeline):
+            pad = sink.get_static_pad("sink")
+            if pad is None:
+                continue
+            ret, upstream = pad.peer_query_position(Gst.Format.TIME)
+            if ret and upstream >= 0:
+                queued.append(upstream)
+        if rate > 0:
+            return max(queued + [position])
+        return min(queued + [position])
+
+    def set_playing(self, playing):
+        self.playing = playing
+        if self.mode == self.MODE_SCRUB:
+            if playing and self._scrub_source == 0:
+                self._scrub_source = GLib.timeout_add(1000 // self.scrub_fps, self._scrub_step)
+            elif not playing:
+                self._cancel_scrub_timer()
+            return
+        self.pipeline.set_state(Gst.State.PLAYING if playing else Gst.State.PAUSED)
+
+    def stop(self):
+        self._stop_scrub()
+
+    def _seek(self, rate, flags, position):
+        if rate > 0:
+            event = Gst.Event.new_seek(rate, Gst.Format.TIME, flags,
+                                       Gst.SeekType.SET, position, Gst.SeekType.END, 0)
+        else:
+            event = Gst.Event.new_seek(rate, Gst.Format.TIME, flags,
+                                       Gst.SeekType.SET, 0, Gst.SeekType.SET, position)
+        return self.pipeline.send_event(event)
+
+    def _start_scrub(self, position):
+        self._scrub_position = position
+        if self.mode != self.MODE_SCRUB:
+            self.mode = self.MODE_SCRUB
+            # Decoding stops here, we only preroll the keyframes we seek to
+            self.pipeline.set_state(Gst.State.PAUSED)
+        if self.playing and self._scrub_source == 0:
+            self._scrub_source = GLib.timeout_add(1000 // self.scrub_fps, self._scrub_step)
+
+    def _stop_scrub(self):
+        self._cancel_scrub_timer()
+        if self.mode == self.MODE_SCRUB:
+            self.mode = self.MODE_NORMAL
+
+    def _cancel_scrub_timer(self):
+        if self._scrub_source != 0:
+            GLib.source_remove(self._scrub_source)
+            self._scrub_source = 0
+
+    def _scrub_step(self):
+        # Skip this tick if the previous keyframe has not prerolled yet, so
+        # slow decoders never get a backlog of seeks
+        ret, state, pending = self.pipeline.get_state(0)
+        if ret == Gst.StateChangeReturn.ASYNC:
+            return True
+
+        ret, duration = self.pipeline.query_duration(Gst.Format.TIME)
+        self._scrub_position += int(self.rate * Gst.SECOND / self.scrub_fps)
+        if self._scrub_position <= 0 or (ret and self._scrub_position >= duration):
+            # Reached either end, stay paused on the first/last keyframe
+            self._scrub_position = max(0, min(self._scrub_position, duration if ret else 0))
+            self._scrub_source = 0
+            return False
+
+        snap = Gst.SeekFlags.SNAP_AFTER if self.rate > 0 else Gst.SeekFlags.SNAP_BEFORE
+        self.pipeline.seek_simple(Gst.Format.TIME,
+                                  Gst.SeekFlags.FLUSH | Gst.SeekFlags.KEY_UNIT | snap,
+                                  self._scrub_position)
+        return True
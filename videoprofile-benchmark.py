@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Video chain profile benchmark: 1080p frames per second through the
+agingtv chain of playback-tutorial-7-exc and the wavescope branch of
+basic-tutorial-7, laid out by each profile in videoprofile.py. The display
+sink is stood in for by a fakesink that only accepts one format, so the
+conversion work matches a YUV (I420) or an RGB (BGRx) display.
+
+    python3 videoprofile-benchmark.py [--seconds N] [--formats I420 BGRx]
+"""
+
+import argparse
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from sinkbins import SinkBinFactory
+from videoprofile import PROFILES
+
+WIDTH, HEIGHT, FRAMERATE = 1920, 1080, 30
+SAMPLES_PER_BUFFER = 1024
+
+
+def count_frame(pad, info, counter):
+    counter[0] += 1
+    return Gst.PadProbeReturn.OK
+
+
+def display(format):
+    caps = "video/x-raw,format=%s,width=%d,height=%d" % (format, WIDTH, HEIGHT)
+    return [("capsfilter", {"caps": Gst.Caps.from_string(caps)}),
+            ("fakesink", {"name": "display", "sync": False})]
+
+
+# Frames per second through chain, fed by source (a launch description)
+def run(source, chain):
+    pipeline = Gst.parse_launch(source)
+    bin = SinkBinFactory("chain", chain).build()
+    pipeline.add(bin)
+    pipeline.get_by_name("feed").link(bin)
+    counter = [0]
+    bin.get_by_name("display").get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER,
+                                                                count_frame, counter)
+    started = time.perf_counter()
+    pipeline.set_state(Gst.State.PLAYING)
+    msg = pipeline.get_bus().timed_pop_filtered(Gst.CLOCK_TIME_NONE,
+                                                Gst.MessageType.ERROR | Gst.MessageType.EOS)
+    elapsed = time.perf_counter() - started
+    pipeline.set_state(Gst.State.NULL)
+    if msg.type == Gst.MessageType.ERROR:
+        err, debug_info = msg.parse_error()
+        raise RuntimeError(str(err))
+    return counter[0] / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Video chain profile benchmark")
+    parser.add_argument("--seconds", type=float, default=10.0, help="stream length per run")
+    parser.add_argument("--formats", nargs="+", default=["I420", "BGRx"], help="display formats")
+    args = parser.parse_args()
+
+    Gst.init(None)
+
+    frames = int(args.seconds * FRAMERATE)
+    # Decoded video arrives as I420; playbin converts it for the sink bin on one thread
+    video = ("videotestsrc num-buffers=%d pattern=ball ! "
+             "video/x-raw,format=I420,width=%d,height=%d,framerate=%d/1 ! "
+             "videoconvert name=feed" % (frames, WIDTH, HEIGHT, FRAMERATE))
+    audio = ("audiotestsrc num-buffers=%d samplesperbuffer=%d ! audioconvert name=feed" %
+             (int(args.seconds * 44100 / SAMPLES_PER_BUFFER), SAMPLES_PER_BUFFER))
+
+    print("%-8s %-6s %12s %12s" % ("profile", "sink", "agingtv", "wavescope"))
+    for format in args.formats:
+        for name, profile in PROFILES.items():
+            effect = run(video, profile.chain("agingtv", {"scratch-lines": 19}, sink=display(format)))
+            visual = run(audio, profile.chain("wavescope", {"shader": 0, "style": 1},
+                                              sink=display(format), visualization=True))
+            print("%-8s %-6s %8.1f fps %8.1f fps" % (name, format, effect, visual))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""
+Threading and conversion profiles for video effect chains
+
+A VideoChainProfile turns "effect, then sink" into a chain description for
+SinkBinFactory (see sinkbins.py):
+
+  - threads sets n-threads on the converter and scaler (0 means one per
+    CPU; videoscale only has the property from GStreamer 1.20 on),
+  - queues puts a queue between the conversion, effect and sink stages, so
+    each runs on its own streaming thread,
+  - direct picks a format both the effect and the sink handle. The
+    conversion then happens once, into that format, ahead of the effect, and
+    the effect output goes to the sink as is. Without it the effect gets
+    what playbin converts to, and a second conversion follows it.
+
+A visualization (audio in, video out) has nothing to convert ahead of it;
+with direct it is asked to draw in the sink's format.
+
+    profile = PROFILES["direct"]
+    factory = SinkBinFactory("video_sink_bin", profile.chain("agingtv", {"scratch-lines": 19}))
+"""
+
+import os
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst
+
+from sinkbins import SinkBinFactory, pad_template_caps
+
+QUEUE = ("queue", {"max-size-buffers": 3, "max-size-bytes": 0, "max-size-time": 0})
+DEFAULT_SINK = [("autovideosink", {})]
+
+
+_sink_caps = {}  # sink chain description -> caps
+_has_threads = {}  # factory name -> True if it has n-threads
+
+
+# The video caps a sink chain accepts. A single sink with specific template
+# caps is taken at its word; otherwise (auto sinks and the like have ANY
+# caps) the chain is opened once and the answer kept for that description.
+def sink_caps(sink):
+    key = tuple((name, tuple(sorted((prop, str(value)) for prop, value in properties.items())))
+                for name, properties in sink)
+    caps = _sink_caps.get(key)
+    if caps is not None:
+        return caps
+    if len(sink) == 1:
+        factory = Gst.ElementFactory.find(sink[0][0])
+        caps = pad_template_caps(factory, Gst.PadDirection.SINK) if factory else None
+    if caps is None or caps.is_any():
+        bin = SinkBinFactory("probe", sink).build()
+        bin.set_state(Gst.State.READY)
+        caps = bin.get_static_pad("sink").query_caps(None)
+        bin.set_state(Gst.State.NULL)
+    _sink_caps[key] = caps
+    return caps
+
+
+def has_threads(factory_name):
+    if factory_name not in _has_threads:
+        element = Gst.ElementFactory.make(factory_name, None)
+        _has_threads[factory_name] = element is not None and element.find_property("n-threads") is not None
+    return _has_threads[factory_name]
+
+
+class VideoChainProfile:
+    def __init__(self, threads=0, queues=True, direct=True):
+        self.threads = threads or os.cpu_count() or 1
+        self.queues = queues
+        self.direct = direct
+
+    # Colorspace conversion and scaling, each with n-threads where it has it
+    def convert(self):
+        return [(name, {"n-threads": self.threads} if has_threads(name) else {})
+                for name in ("videoconvert", "videoscale")]
+
+    # A raw video format that the effect can output and the sink accepts.
+    # The format is fixed ahead of the effect, so unless it is a
+    # visualization the effect must also take it as input.
+    def common_format(self, effect, sink, visualization=False):
+        factory = Gst.ElementFactory.find(effect)
+        effect_caps = pad_template_caps(factory, Gst.PadDirection.SRC) if factory else None
+        if effect_caps is None:
+            return None
+        if not visualization:
+            input_caps = pad_template_caps(factory, Gst.PadDirection.SINK)
+            if input_caps is None:
+                return None
+            effect_caps = effect_caps.intersect(input_caps)
+        common = effect_caps.intersect(sink_caps(sink))
+        for i in range(common.get_size()):
+            structure = common.get_structure(i)
+            if structure.get_name() == "video/x-raw" and structure.has_field("format"):
+                caps = Gst.Caps.new_empty()
+                caps.append_structure(structure.copy())
+                return caps.fixate().get_structure(0).get_string("format")
+        return None
+
+    # Chain description: effect with its properties, then sink (itself a
+    # chain). visualization=True for elements that take audio.
+    def chain(self, effect, properties=None, sink=DEFAULT_SINK, visualization=False):
+        properties = dict(properties or {})
+        queue = [QUEUE] if self.queues else []
+        format = self.common_format(effect, sink, visualization) if self.direct else None
+
+        if format is None:
+            # Convert whatever the effect produces for the sink, on its own thread
+            return [(effect, properties)] + queue + self.convert() + queue + list(sink)
+
+        fix_format = ("capsfilter", {"caps": Gst.Caps.from_string("video/x-raw,format=%s" % format)})
+        if visualization:
+            return [(effect, properties), fix_format] + queue + list(sink)
+        return self.convert() + [fix_format] + queue + [(effect, properties)] + queue + list(sink)
+
+
+PROFILES = {
+    "single": VideoChainProfile(threads=1, queues=False, direct=False),
+    "threaded": VideoChainProfile(queues=True, direct=False),
+    "direct": VideoChainProfile(queues=True, direct=True),
+}
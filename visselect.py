@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Visualization selection by measured cost
+
+Measures every Visualization element in the registry offline: audiotestsrc
+pink noise is rendered at the given resolution and framerate as fast as
+possible, and the process CPU time is divided by the length of the audio.
+That gives the share of one CPU the plugin needs to keep up in real time.
+Results are cached per plugin version, resolution and framerate, so only new
+or upgraded plugins are measured again.
+
+select() returns the best-looking plugin (by PREFERENCE) within a CPU
+budget.
+
+    selector = VisualizationSelector(320, 240, 25)
+    factory = selector.select(budget=25)
+    playbin.set_property("vis-plugin", selector.make_element(factory))
+
+    python3 visselect.py [--width W] [--height H] [--fps N] [--budget PERCENT]
+"""
+
+import argparse
+import json
+import os
+import resource
+import time
+
+import gi
+
+gi.require_version('Gst', '1.0')
+from gi.repository import Gst, GLib
+
+# Best-looking first; plugins not listed come after these, by registry rank
+PREFERENCE = ["goom", "libvisual_infinite", "libvisual_corona", "libvisual_jess",
+              "libvisual_oinksie", "libvisual_bumpscope", "goom2k1", "synaescope",
+              "spectrascope", "spacescope", "wavescope", "monoscope",
+              "libvisual_lv_analyzer", "libvisual_lv_scope"]
+SAMPLES_PER_BUFFER = 1024
+SAMPLE_RATE = 44100
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def count_frame(pad, info, counter):
+    counter[0] += 1
+    return Gst.PadProbeReturn.OK
+
+
+# Return True if this is a Visualization element
+def is_visualization(feature):
+    return (isinstance(feature, Gst.ElementFactory) and
+            "Visualization" in (feature.get_metadata(Gst.ELEMENT_METADATA_KLASS) or ""))
+
+
+def list_visualizations():
+    return [f for f in Gst.Registry.get().get_feature_list(Gst.ElementFactory) if is_visualization(f)]
+
+
+def preference(factory):
+    name = factory.get_name()
+    if name in PREFERENCE:
+        return (0, PREFERENCE.index(name))
+    return (1, -factory.get_rank())
+
+
+class VisualizationCost:
+    def __init__(self, name, longname, cpu_percent, fps):
+        self.name = name
+        self.longname = longname
+        self.cpu_percent = cpu_percent  # None if the plugin failed to run
+        self.fps = fps  # Frames rendered per second of CPU-unbounded run
+
+    def __str__(self):
+        if self.cpu_percent is None:
+            return "%-24s failed" % self.name
+        return "%-24s %6.1f%% CPU  %7.1f fps max" % (self.name, self.cpu_percent, self.fps)
+
+
+class VisualizationSelector:
+    def __init__(self, width=320, height=240, framerate=25, seconds=2.0, cache_path=None):
+        self.width = width
+        self.height = height
+        self.framerate = framerate
+        self.seconds = seconds
+        self.cache_path = cache_path or os.path.join(GLib.get_user_cache_dir(),
+                                                     "gst-python-tutorials", "visualizations.json")
+        self._cache = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp = self.cache_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self._cache, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.cache_path)
+
+    def caps(self):
+        return "video/x-raw,width=%d,height=%d,framerate=%d/1" % (self.width, self.height, self.framerate)
+
+    def _key(self, factory):
+        plugin = factory.get_plugin()
+        version = plugin.get_version() if plugin else "?"
+        return "%s|%s|%dx%d@%d" % (factory.get_name(), version, self.width, self.height, self.framerate)
+
+    # The visualization, fixed to the measured resolution and framerate
+    def make_element(self, factory):
+        return Gst.parse_bin_from_description("%s ! %s" % (factory.get_name(), self.caps()), True)
+
+    def measure(self, factory):
+        buffers = int(self.seconds * SAMPLE_RATE / SAMPLES_PER_BUFFER) + 1
+        try:
+            pipeline = Gst.parse_launch(
+                "audiotestsrc wave=pink-noise num-buffers=%d samplesperbuffer=%d ! "
+                "audio/x-raw,rate=%d,channels=2 ! audioconvert ! %s ! %s ! "
+                "fakesink name=sink sync=false" %
+                (buffers, SAMPLES_PER_BUFFER, SAMPLE_RATE, factory.get_name(), self.caps()))
+        except GLib.Error:
+            return None, 0.0
+        frames = [0]
+        pipeline.get_by_name("sink").get_static_pad("sink").add_probe(Gst.PadProbeType.BUFFER,
+                                                                      count_frame, frames)
+
+        started = cpu_time()
+        wall = time.monotonic()
+        pipeline.set_state(Gst.State.PLAYING)
+        msg = pipeline.get_bus().timed_pop_filtered(30 * Gst.SECOND, Gst.MessageType.ERROR | Gst.MessageType.EOS)
+        cpu = cpu_time() - started
+        wall = time.monotonic() - wall
+        pipeline.set_state(Gst.State.NULL)
+        if msg is None or msg.type == Gst.MessageType.ERROR or not frames[0]:
+            return None, 0.0
+        audio_seconds = buffers * SAMPLES_PER_BUFFER / SAMPLE_RATE
+        return 100 * cpu / audio_seconds, frames[0] / wall
+
+    # Measured cost of every visualization, best-looking first
+    def costs(self):
+        changed = False
+        result = []
+        for factory in sorted(list_visualizations(), key=preference):
+            key = self._key(factory)
+            if key not in self._cache:
+                self._cache[key] = self.measure(factory)
+                changed = True
+            cpu_percent, fps = self._cache[key]
+            result.append(VisualizationCost(factory.get_name(), factory.get_longname(), cpu_percent, fps))
+        if changed:
+            try:
+                self._save()
+            except OSError:
+                pass
+        return result
+
+    # The best-looking plugin within budget (percent of one CPU); if none
+    # fits, the cheapest one
+    def select(self, budget):
+        costs = [c for c in self.costs() if c.cpu_percent is not None]
+        if not costs:
+            return None
+        fitting = [c for c in costs if c.cpu_percent <= budget]
+        chosen = fitting[0] if fitting else min(costs, key=lambda c: c.cpu_percent)
+        return Gst.ElementFactory.find(chosen.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure visualization plugins")
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--budget", type=float, default=25.0, help="CPU budget in percent of one core")
+    args = parser.parse_args()
+
+    Gst.init(None)
+    selector = VisualizationSelector(args.width, args.height, args.fps)
+    for cost in selector.costs():
+        print("  %s" % cost)
+    factory = selector.select(args.budget)
+    print("Selected: %s" % (factory.get_name() if factory else "none"))
+
+
+if __name__ == '__main__':
+    main()